@@ -25,12 +25,51 @@ document.addEventListener('DOMContentLoaded', () => {
     const btnLimparBase = document.getElementById('btn-limpar-base');
     const gerenciamentoMessageBox = document.getElementById('gerenciamento-message-box');
     const gerenciamentoMessageBoxSpan = gerenciamentoMessageBox.querySelector('span');
+    const gerenciamentoProgresso = document.getElementById('gerenciamento-progresso');
+    const gerenciamentoProgressoBarra = document.getElementById('gerenciamento-progresso-barra');
+    const gerenciamentoProgressoTexto = document.getElementById('gerenciamento-progresso-texto');
 
-    // Variáveis de controle de paginação
-    let currentPage = 1;
+    // Paginação feita no servidor: o navegador só pede (e guarda) a página exibida
     const itemsPerPage = 10; // Número de itens por página
+    // Espera após o último clique na paginação antes de pedir a página: cliques rápidos viram uma só requisição
+    const DEBOUNCE_PAGINACAO_MS = 250;
+    let currentPage = 1; // Página marcada na paginação (a escolhida, mesmo enquanto carrega)
+    let paginaExibida = 1; // Página cujas linhas estão na tabela
     let totalPages = 0;
-    let currentData = []; // Armazena os dados brutos da consulta
+    let totalRegistros = null; // Total da consulta atual, contado só na primeira página
+    let currentData = []; // Linhas da página exibida
+    let filtrosConsulta = new URLSearchParams(); // Filtros da consulta atual
+    let cursores = new Map(); // página -> cursor (next_cursor da página anterior), para pedir a página por keyset
+    let controleConsulta = null; // AbortController da requisição de página em andamento
+    let controleMunicipios = null; // AbortController da requisição de municípios em andamento
+    let timerPaginacao = null;
+
+    // Cópias locais das respostas GET (com a ETag), revalidadas via If-None-Match:
+    // se os dados não mudaram, o backend responde 304 sem corpo e a cópia é reaproveitada.
+    const respostasLocais = new Map();
+    const MAX_RESPOSTAS_LOCAIS = 32;
+
+    async function fetchJsonCondicional(url, { signal } = {}) {
+        const guardada = respostasLocais.get(url);
+        const headers = guardada ? { 'If-None-Match': guardada.etag } : {};
+        const response = await fetch(url, { headers, signal });
+        if (response.status === 304 && guardada) {
+            return guardada.dados;
+        }
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        const dados = await response.json();
+        const etag = response.headers.get('ETag');
+        if (etag) {
+            respostasLocais.delete(url);
+            if (respostasLocais.size >= MAX_RESPOSTAS_LOCAIS) {
+                respostasLocais.delete(respostasLocais.keys().next().value);
+            }
+            respostasLocais.set(url, { etag, dados });
+        }
+        return dados;
+    }
 
     // Função para mostrar mensagens ao usuário
     function showMessage(box, span, message, type = 'info') {
@@ -50,6 +89,69 @@ document.addEventListener('DOMContentLoaded', () => {
         }, 5000); // Esconde a mensagem após 5 segundos
     }
 
+    // Importação, atualização e limpeza rodam como jobs no backend: a requisição só registra
+    // o job (resposta 202 com job_id) e o andamento é consultado em /api/jobs/<id> até o fim.
+    const JOB_POLL_INTERVAL_MS = 500;
+    const NOMES_FASES = {
+        leitura: 'Lendo o arquivo',
+        indices: 'Criando índices',
+        resumos: 'Calculando resumos',
+        compactacao: 'Compactando a base',
+        troca: 'Ativando os novos dados',
+        comparacao: 'Comparando com a base',
+        revisao: 'Revisando datas alteradas',
+        gravacao: 'Gravando alterações',
+        limpeza: 'Limpando a base'
+    };
+
+    function mostrarProgresso(job) {
+        gerenciamentoProgressoBarra.style.width = `${Math.round(job.progresso * 100)}%`;
+        if (job.status === 'na_fila') {
+            gerenciamentoProgressoTexto.textContent = 'Aguardando na fila do servidor...';
+            return;
+        }
+        let texto = `${NOMES_FASES[job.fase] || job.fase || 'Iniciando'}: ${job.linhas.toLocaleString('pt-BR')} linhas`;
+        if (job.linhas_por_segundo) {
+            texto += ` (${Math.round(job.linhas_por_segundo).toLocaleString('pt-BR')} linhas/s)`;
+        }
+        if (job.eta_segundos !== null) {
+            texto += ` - cerca de ${Math.round(job.eta_segundos)}s restantes`;
+        }
+        gerenciamentoProgressoTexto.textContent = texto;
+    }
+
+    async function executarJob(url, opcoes, mensagemErro) {
+        const response = await fetch(url, opcoes);
+        const result = await response.json();
+        if (!response.ok) {
+            throw new Error(result.message || mensagemErro);
+        }
+        if (result.status !== 'accepted') {
+            return result;
+        }
+        gerenciamentoProgressoBarra.style.width = '0%';
+        gerenciamentoProgresso.classList.remove('hidden');
+        try {
+            while (true) {
+                const jobResponse = await fetch(`/api/jobs/${result.job_id}`);
+                const job = await jobResponse.json();
+                if (!jobResponse.ok) {
+                    throw new Error(job.message || mensagemErro);
+                }
+                mostrarProgresso(job);
+                if (job.status === 'concluido') {
+                    return job.resultado;
+                }
+                if (job.status === 'erro') {
+                    throw new Error(job.erro || mensagemErro);
+                }
+                await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+            }
+        } finally {
+            gerenciamentoProgresso.classList.add('hidden');
+        }
+    }
+
     // Função para alternar entre as seções
     function showSection(sectionId) {
         if (sectionId === 'consulta-dados') {
@@ -72,20 +174,16 @@ document.addEventListener('DOMContentLoaded', () => {
     // COMENTÁRIO_PARA_BACKEND: Função para preencher dinamicamente os estados no dropdown.
     // ENDPOINT: /api/estados
     // MÉTODO: GET
-    // RESPOSTA ESPERADA: JSON Array de objetos { sigla: 'SP', nome: 'São Paulo' }
+    // RESPOSTA ESPERADA: JSON { "states": ["AC", "AL", ...] } com as siglas dos estados
     async function preencherEstados() {
         try {
-            const response = await fetch('/api/estados'); // COMENTÁRIO_PARA_BACKEND: URL do endpoint para buscar estados.
-            if (!response.ok) {
-                throw new Error(`HTTP error! status: ${response.status}`);
-            }
-            const estados = await response.json();
+            const { states } = await fetchJsonCondicional('/api/estados'); // COMENTÁRIO_PARA_BACKEND: URL do endpoint para buscar estados.
 
             filtroEstadoSelect.innerHTML = '<option value="">Selecione um Estado</option>';
-            estados.forEach(estado => {
+            states.forEach(sigla => {
                 const option = document.createElement('option');
-                option.value = estado.sigla;
-                option.textContent = estado.nome;
+                option.value = sigla;
+                option.textContent = sigla;
                 filtroEstadoSelect.appendChild(option);
             });
         } catch (error) {
@@ -97,21 +195,24 @@ document.addEventListener('DOMContentLoaded', () => {
     // COMENTÁRIO_PARA_BACKEND: Função para preencher dinamicamente os municípios com base no estado selecionado.
     // ENDPOINT: /api/municipios?estado=<sigla_estado>
     // MÉTODO: GET
-    // RESPOSTA ESPERADA: JSON Array de strings com nomes de municípios.
+    // RESPOSTA ESPERADA: JSON { "cities": [...] } com os nomes dos municípios.
     async function preencherMunicipios(estadoSigla) {
+        // Cancela a busca dos municípios de um estado selecionado antes
+        if (controleMunicipios) {
+            controleMunicipios.abort();
+            controleMunicipios = null;
+        }
         filtroMunicipioSelect.innerHTML = '<option value="">Selecione um Município</option>';
         filtroMunicipioSelect.disabled = true;
         if (!estadoSigla) {
             return;
         }
+        const controle = new AbortController();
+        controleMunicipios = controle;
         try {
-            const response = await fetch(`/api/municipios?estado=${estadoSigla}`); // COMENTÁRIO_PARA_BACKEND: URL do endpoint para buscar municípios.
-            if (!response.ok) {
-                throw new Error(`HTTP error! status: ${response.status}`);
-            }
-            const municipios = await response.json();
+            const { cities } = await fetchJsonCondicional(`/api/municipios?estado=${encodeURIComponent(estadoSigla)}`, { signal: controle.signal }); // COMENTÁRIO_PARA_BACKEND: URL do endpoint para buscar municípios.
 
-            municipios.forEach(municipio => {
+            cities.forEach(municipio => {
                 const option = document.createElement('option');
                 option.value = municipio;
                 option.textContent = municipio;
@@ -119,6 +220,9 @@ document.addEventListener('DOMContentLoaded', () => {
             });
             filtroMunicipioSelect.disabled = false;
         } catch (error) {
+            if (error.name === 'AbortError') {
+                return;
+            }
             console.error('Erro ao buscar municípios:', error);
             showMessage(messageBox, messageBoxSpan, 'Erro ao carregar municípios. Tente novamente.', 'error');
         }
@@ -129,7 +233,7 @@ document.addEventListener('DOMContentLoaded', () => {
         preencherMunicipios(event.target.value);
     });
 
-    // COMENTÁRIO_PARA_BACKEND: Função para renderizar os dados na tabela.
+    // COMENTÁRIO_PARA_BACKEND: Função para renderizar os dados na tabela (a página recebida do backend).
     function renderTable(data) {
         tabelaBody.innerHTML = ''; // Limpa a tabela
         if (data.length === 0) {
@@ -141,11 +245,7 @@ document.addEventListener('DOMContentLoaded', () => {
             return;
         }
 
-        const startIndex = (currentPage - 1) * itemsPerPage;
-        const endIndex = startIndex + itemsPerPage;
-        const pageData = data.slice(startIndex, endIndex);
-
-        pageData.forEach(dado => {
+        data.forEach(dado => {
             const row = document.createElement('tr');
             row.classList.add('border-b', 'border-gray-200', 'hover:bg-gray-100');
             row.innerHTML = `
@@ -164,7 +264,6 @@ document.addEventListener('DOMContentLoaded', () => {
     // COMENTÁRIO_PARA_BACKEND: Função para renderizar os botões de paginação.
     function renderPagination() {
         paginacaoDiv.innerHTML = '';
-        totalPages = Math.ceil(currentData.length / itemsPerPage);
 
         if (totalPages <= 1) {
             return; // Não mostra paginação se houver apenas 1 página ou menos
@@ -180,11 +279,7 @@ document.addEventListener('DOMContentLoaded', () => {
             if (isDisabled) {
                 button.disabled = true;
             }
-            button.addEventListener('click', () => {
-                currentPage = page;
-                renderTable(currentData);
-                renderPagination();
-            });
+            button.addEventListener('click', () => irParaPagina(page));
             return button;
         };
 
@@ -211,15 +306,83 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
 
+    // COMENTÁRIO_PARA_BACKEND: Busca uma página da consulta atual.
+    // ENDPOINT: /api/consulta_dados
+    // PARÂMETROS: os filtros, per_page e 'cursor' (keyset, quando a página anterior já foi vista)
+    // ou 'page'; depois da primeira página, count=none dispensa a recontagem do total.
+    // RESPOSTA ESPERADA: JSON { "data": [...], "total_records": N, "next_cursor": "..." }
+    // Uma nova requisição cancela a anterior (AbortController), cuja resposta não chega à tabela.
+    async function carregarPagina(pagina) {
+        if (controleConsulta) {
+            controleConsulta.abort();
+        }
+        const controle = new AbortController();
+        controleConsulta = controle;
+
+        const params = new URLSearchParams(filtrosConsulta);
+        params.set('per_page', itemsPerPage);
+        if (cursores.has(pagina)) {
+            params.set('cursor', cursores.get(pagina));
+        } else {
+            params.set('page', pagina);
+        }
+        if (totalRegistros !== null) {
+            params.set('count', 'none');
+        }
+
+        loadingSpinner.classList.remove('hidden');
+        try {
+            const resposta = await fetchJsonCondicional(`/api/consulta_dados?${params.toString()}`, { signal: controle.signal });
+            if (resposta.total_records !== null && resposta.total_records !== undefined) {
+                totalRegistros = resposta.total_records;
+            }
+            if (resposta.next_cursor) {
+                cursores.set(pagina + 1, resposta.next_cursor);
+            }
+            currentPage = pagina;
+            paginaExibida = pagina;
+            currentData = resposta.data;
+            totalPages = Math.ceil(totalRegistros / itemsPerPage);
+            renderTable(currentData);
+            renderPagination();
+        } finally {
+            if (controleConsulta === controle) {
+                controleConsulta = null;
+                loadingSpinner.classList.add('hidden');
+            }
+        }
+    }
+
+    // Troca de página pelos botões da paginação, com debounce
+    function irParaPagina(pagina) {
+        currentPage = pagina;
+        renderPagination(); // Marca a página escolhida enquanto ela é carregada
+        clearTimeout(timerPaginacao);
+        timerPaginacao = setTimeout(async () => {
+            try {
+                await carregarPagina(pagina);
+            } catch (error) {
+                if (error.name === 'AbortError') {
+                    return;
+                }
+                console.error('Erro ao consultar dados:', error);
+                // A tabela continua com as linhas da página anterior: a paginação volta a marcá-la
+                currentPage = paginaExibida;
+                renderPagination();
+                showMessage(messageBox, messageBoxSpan, 'Erro ao carregar a página. Tente novamente.', 'error');
+            }
+        }, DEBOUNCE_PAGINACAO_MS);
+    }
+
     // COMENTÁRIO_PARA_BACKEND: Event Listener para o formulário de filtros (consulta).
     // ENDPOINT: /api/consulta_dados
-    // MÉTODO: GET (ou POST, dependendo da complexidade dos filtros)
+    // MÉTODO: GET
     // PARÂMETROS: data_inicial, data_final (YYYY-MM-DD), estado (sigla), municipio (nome)
-    // RESPOSTA ESPERADA: JSON Array de objetos com os dados da COVID-19.
+    // RESPOSTA ESPERADA: a primeira página da consulta (ver carregarPagina).
     formFiltros.addEventListener('submit', async (event) => {
         event.preventDefault(); // Previne o recarregamento da página
 
-        loadingSpinner.classList.remove('hidden');
+        clearTimeout(timerPaginacao);
         messageBox.classList.add('hidden');
         tabelaBody.innerHTML = ''; // Limpa a tabela antes de carregar novos dados
         paginacaoDiv.innerHTML = ''; // Limpa a paginação
@@ -230,29 +393,25 @@ document.addEventListener('DOMContentLoaded', () => {
         if (filtroEstadoSelect.value) params.append('estado', filtroEstadoSelect.value);
         if (filtroMunicipioSelect.value) params.append('municipio', filtroMunicipioSelect.value);
 
-        // COMENTÁRIO_PARA_BACKEND: Construção da URL para a requisição.
-        const url = `/api/consulta_dados?${params.toString()}`;
+        // Nova consulta: cursores e total da consulta anterior não valem mais
+        filtrosConsulta = params;
+        cursores = new Map();
+        totalRegistros = null;
 
         try {
-            const response = await fetch(url);
-            if (!response.ok) {
-                throw new Error(`HTTP error! status: ${response.status}`);
-            }
-            currentData = await response.json(); // Armazena os dados brutos
-            currentPage = 1; // Reseta a página para a primeira
-            renderTable(currentData);
-            renderPagination();
-            if (currentData.length === 0) {
+            await carregarPagina(1);
+            if (totalRegistros === 0) {
                 showMessage(messageBox, messageBoxSpan, 'Nenhum dado encontrado para os filtros selecionados.', 'info');
             } else {
-                showMessage(messageBox, messageBoxSpan, `Consulta realizada com sucesso! Foram encontrados ${currentData.length} registros.`, 'success');
+                showMessage(messageBox, messageBoxSpan, `Consulta realizada com sucesso! Foram encontrados ${totalRegistros.toLocaleString('pt-BR')} registros.`, 'success');
             }
 
         } catch (error) {
+            if (error.name === 'AbortError') {
+                return; // Substituída por uma consulta mais recente
+            }
             console.error('Erro ao consultar dados:', error);
             showMessage(messageBox, messageBoxSpan, 'Erro ao consultar dados. Verifique os filtros e tente novamente.', 'error');
-        } finally {
-            loadingSpinner.classList.add('hidden');
         }
     });
 
@@ -260,7 +419,7 @@ document.addEventListener('DOMContentLoaded', () => {
     // ENDPOINT: /api/importar_dataset
     // MÉTODO: POST
     // CORPO DA REQUISIÇÃO: Pode ser vazio ou conter um path/URL para o dataset, se aplicável.
-    // RESPOSTA ESPERADA: JSON com { "status": "success", "message": "Dataset importado com sucesso." }
+    // RESPOSTA ESPERADA: 202 com { "status": "accepted", "job_id": "..." }; o resultado vem de /api/jobs/<job_id>
     btnImportarDataset.addEventListener('click', async () => {
         if (!confirm('Tem certeza que deseja importar um novo dataset? Isso pode levar algum tempo.')) {
             return;
@@ -269,20 +428,14 @@ document.addEventListener('DOMContentLoaded', () => {
         showMessage(gerenciamentoMessageBox, gerenciamentoMessageBoxSpan, 'Importando novo dataset... Por favor, aguarde.', 'info');
 
         try {
-            const response = await fetch('/api/importar_dataset', {
+            const result = await executarJob('/api/importar_dataset', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json'
                 },
                 body: JSON.stringify({}) // Pode enviar dados adicionais se necessário
-            });
-
-            const result = await response.json();
-            if (response.ok) {
-                showMessage(gerenciamentoMessageBox, gerenciamentoMessageBoxSpan, result.message, 'success');
-            } else {
-                throw new Error(result.message || 'Erro ao importar dataset.');
-            }
+            }, 'Erro ao importar dataset.');
+            showMessage(gerenciamentoMessageBox, gerenciamentoMessageBoxSpan, result.message, 'success');
         } catch (error) {
             console.error('Erro ao importar dataset:', error);
             showMessage(gerenciamentoMessageBox, gerenciamentoMessageBoxSpan, `Erro: ${error.message}`, 'error');
@@ -293,7 +446,7 @@ document.addEventListener('DOMContentLoaded', () => {
     // ENDPOINT: /api/atualizar_dados
     // MÉTODO: PUT
     // CORPO DA REQUISIÇÃO: Pode ser vazio ou conter critérios de atualização.
-    // RESPOSTA ESPERADA: JSON com { "status": "success", "message": "Dados atualizados com sucesso." }
+    // RESPOSTA ESPERADA: 202 com { "status": "accepted", "job_id": "..." }; o resultado vem de /api/jobs/<job_id>
     btnAtualizarDados.addEventListener('click', async () => {
         if (!confirm('Tem certeza que deseja atualizar os dados existentes?')) {
             return;
@@ -302,20 +455,14 @@ document.addEventListener('DOMContentLoaded', () => {
         showMessage(gerenciamentoMessageBox, gerenciamentoMessageBoxSpan, 'Atualizando dados existentes... Por favor, aguarde.', 'info');
 
         try {
-            const response = await fetch('/api/atualizar_dados', {
+            const result = await executarJob('/api/atualizar_dados', {
                 method: 'PUT',
                 headers: {
                     'Content-Type': 'application/json'
                 },
                 body: JSON.stringify({}) // Pode enviar dados adicionais se necessário
-            });
-
-            const result = await response.json();
-            if (response.ok) {
-                showMessage(gerenciamentoMessageBox, gerenciamentoMessageBoxSpan, result.message, 'success');
-            } else {
-                throw new Error(result.message || 'Erro ao atualizar dados.');
-            }
+            }, 'Erro ao atualizar dados.');
+            showMessage(gerenciamentoMessageBox, gerenciamentoMessageBoxSpan, result.message, 'success');
         } catch (error) {
             console.error('Erro ao atualizar dados:', error);
             showMessage(gerenciamentoMessageBox, gerenciamentoMessageBoxSpan, `Erro: ${error.message}`, 'error');
@@ -326,7 +473,7 @@ document.addEventListener('DOMContentLoaded', () => {
     // ENDPOINT: /api/limpar_base
     // MÉTODO: DELETE
     // CORPO DA REQUISIÇÃO: Vazio ou com confirmação.
-    // RESPOSTA ESPERADA: JSON com { "status": "success", "message": "Base de dados limpa com sucesso." }
+    // RESPOSTA ESPERADA: 202 com { "status": "accepted", "job_id": "..." }; o resultado vem de /api/jobs/<job_id>
     btnLimparBase.addEventListener('click', async () => {
         if (!confirm('ATENÇÃO: Tem certeza que deseja LIMPAR TODA a base de dados? Esta ação é irreversível!')) {
             return;
@@ -335,23 +482,24 @@ document.addEventListener('DOMContentLoaded', () => {
         showMessage(gerenciamentoMessageBox, gerenciamentoMessageBoxSpan, 'Limpando base de dados... Por favor, aguarde.', 'info');
 
         try {
-            const response = await fetch('/api/limpar_base', {
+            const result = await executarJob('/api/limpar_base', {
                 method: 'DELETE',
                 headers: {
                     'Content-Type': 'application/json'
                 }
-            });
-
-            const result = await response.json();
-            if (response.ok) {
-                showMessage(gerenciamentoMessageBox, gerenciamentoMessageBoxSpan, result.message, 'success');
-                // Após limpar, talvez seja bom recarregar a seção de consulta ou exibir uma mensagem
-                currentData = [];
-                renderTable(currentData);
-                renderPagination();
-            } else {
-                throw new Error(result.message || 'Erro ao limpar base de dados.');
+            }, 'Erro ao limpar base de dados.');
+            showMessage(gerenciamentoMessageBox, gerenciamentoMessageBoxSpan, result.message, 'success');
+            // Após limpar, descarta a consulta exibida (e a que estiver em andamento)
+            clearTimeout(timerPaginacao);
+            if (controleConsulta) {
+                controleConsulta.abort();
             }
+            currentData = [];
+            totalRegistros = null;
+            totalPages = 0;
+            cursores = new Map();
+            renderTable(currentData);
+            renderPagination();
         } catch (error) {
             console.error('Erro ao limpar base de dados:', error);
             showMessage(gerenciamentoMessageBox, gerenciamentoMessageBoxSpan, `Erro: ${error.message}`, 'error');
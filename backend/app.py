@@ -1,45 +1,59 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
-import sqlite3
 import os
-import pandas as pd
-from datetime import datetime
+import json
+import base64
+import binascii
+import threading
+import importlib.util
+
+from banco import data_version, query_db, read_connection
+from cache import ResponseCache, cached_response, conditional_get
+from compacto import (
+    CITY_FILTER_SQL, DAY_FROM_DATE_SQL, LAYOUTS, PLACE_FILTER_SQL, PLACE_ID_SQL, PLACES_TABLE, STATE_FILTER_SQL,
+)
+from exportacao import (
+    EXPORT_FETCH_SIZE, FORMATOS_EXPORTACAO, MIMETYPES, PARQUET_ROW_GROUP_SIZE, csv_chunks, fetch_batches, gzip_chunks,
+    ndjson_chunks, parquet_chunks,
+)
+from ingestao import (
+    CSV_PATH, NATIONAL_ROLLUP_TABLE, STATE_ROLLUP_TABLE, UPDATE_MODES, clear_database, reload_dataset, update_dataset,
+)
+from jobs import NO_PROGRESS, JobManager
+from series import FORMATOS, MIN_POINTS, PERIODOS, encode_columnar, pivot, reduce_series, to_lists
 
 app = Flask(__name__)
-CORS(app)
-
-# Caminho absoluto para o banco de dados
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(BASE_DIR, 'dados_covid.db')
-# Caminho para o dataset CSV original (usado para atualização)
-CSV_PATH = os.path.join(BASE_DIR, 'data', 'dados_covid.csv') # Assumindo que o CSV está em 'data' dentro da pasta do backend
-
-def query_db(query, args=(), one=False):
-    """Função auxiliar para executar consultas SQL no banco de dados."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cur = conn.execute(query, args)
-    rv = cur.fetchall()
-    conn.close()
-    return (rv[0] if rv else None) if one else rv
-
-def process_dataframe_for_db(df):
-    """
-    Processa o DataFrame do pandas para garantir a compatibilidade com o SQLite.
-    Aplica as mesmas lógicas de tratamento de nulos e tipos do criar_db.py.
-    """
-    for col in ['state', 'city']:
-        if col in df.columns:
-            df[col] = df[col].fillna('Desconhecido')
-
-    for col in ['last_available_confirmed', 'last_available_deaths', 'new_confirmed', 'new_deaths']:
-        if col in df.columns:
-            df[col] = df[col].fillna(0).astype(int)
+# ETag e X-Data-Version precisam ser expostos para que o app web os leia (GET condicional);
+# Content-Disposition traz o nome do arquivo do /api/exportar
+CORS(app, expose_headers=['ETag', 'X-Data-Version', 'Content-Disposition'])
+
+# Respostas de /api/estados, /api/municipios e /api/covid_data_for_plot, válidas até a próxima
+# mudança na versão dos dados (ver cache.py)
+response_cache = ResponseCache()
+
+# Importação, atualização e limpeza rodam como jobs num processo de trabalho (ver jobs.py)
+job_manager = JobManager()
+
+# Modos de contagem do /api/consulta_dados e limite de totais guardados em cache
+COUNT_MODES = ('exact', 'estimate', 'none')
+COUNT_CACHE_SIZE = 1024
+# Métricas de ordenação do 'top_n' do /api/covid_data_for_plot (total no período) e rótulo
+# da série que soma os demais estados/municípios
+RANKING_METRICS = {'casos': 'new_confirmed', 'obitos': 'new_deaths'}
+OTHERS_LABEL = 'Outros'
+
+def rollups_available():
+    """Indica se os resumos pré-agregados existem (bases antigas podem não tê-los)."""
+    row = query_db(
+        "SELECT COUNT(*) AS n FROM sqlite_master WHERE type = 'table' AND name IN (?, ?)",
+        (STATE_ROLLUP_TABLE, NATIONAL_ROLLUP_TABLE), one=True,
+    )
+    return row['n'] == 2
 
-    if 'date' in df.columns:
-        df['date'] = pd.to_datetime(df['date'], errors='coerce').dt.strftime('%Y-%m-%d')
-        df['date'] = df['date'].fillna('1970-01-01')
-    return df
+def compact_layout():
+    """Indica se a base ativa usa o layout compacto (ver compacto.py)."""
+    row = query_db("SELECT type FROM sqlite_master WHERE name = 'dados_covid'", one=True)
+    return row is not None and row['type'] == 'view'
 
 @app.route('/api/login', methods=['POST'])
 def login():
@@ -59,14 +73,26 @@ def login():
     else:
         return jsonify({"status": "error", "message": "Credenciais inválidas"}), 401 # 401 Unauthorized
 
+# Listas de locais: o DISTINCT sobre o prefixo de um índice iniciado por estado salta de um
+# valor distinto para o próximo, sem ler as linhas de cada local.
+ESTADOS_SQL = 'SELECT DISTINCT state FROM dados_covid ORDER BY state'
+MUNICIPIOS_SQL = 'SELECT DISTINCT city FROM dados_covid WHERE state = ? ORDER BY city'
+# No layout compacto, as listas vêm direto da tabela de locais
+COMPACT_ESTADOS_SQL = f'SELECT DISTINCT state FROM {PLACES_TABLE} ORDER BY state'
+COMPACT_MUNICIPIOS_SQL = f'SELECT city FROM {PLACES_TABLE} WHERE state = ? ORDER BY city'
+
 @app.route('/api/estados', methods=['GET'])
+@conditional_get
+@cached_response(response_cache)
 def get_estados():
     # Retorna uma lista de estados distintos da base de dados.
-    rows = query_db('SELECT DISTINCT state FROM dados_covid ORDER BY state')
+    rows = query_db(COMPACT_ESTADOS_SQL if compact_layout() else ESTADOS_SQL)
     estados = [row['state'] for row in rows]
     return jsonify({"states": estados})
 
 @app.route('/api/municipios', methods=['GET'])
+@conditional_get
+@cached_response(response_cache)
 def get_municipios():
     """
     Retorna uma lista de municípios distintos para um dado estado.
@@ -76,26 +102,139 @@ def get_municipios():
     if not estado:
         return jsonify({"cities": []})
 
-    rows = query_db(
-        'SELECT DISTINCT city FROM dados_covid WHERE state = ? ORDER BY city', (estado,)
-    )
+    rows = query_db(COMPACT_MUNICIPIOS_SQL if compact_layout() else MUNICIPIOS_SQL, (estado,))
     municipios = [row['city'] for row in rows]
     return jsonify({"cities": municipios})
 
-@app.route('/api/consulta_dados', methods=['GET'])
-def consulta_dados():
+def parse_filters(args):
+    """Filtros de data, estado e município da query string, sem os valores de placeholder da GUI."""
+    estado = args.get('estado')
+    municipio = args.get('municipio')
+    return {
+        'data_inicial': args.get('data_inicial') or None,
+        'data_final': args.get('data_final') or None,
+        'estado': estado if estado and estado != "Nenhum estado encontrado" else None,
+        'municipio': municipio if municipio and municipio != "Nenhum município encontrado" else None,
+    }
+
+def build_where(filtros, incluir_local=True, compacto=False, por_data=False, por_local=False):
     """
-    Endpoint para consulta paginada de dados da COVID-19.
-    Aceita filtros por data, estado e município.
+    Cláusulas WHERE e parâmetros para `filtros`; sem estado/município se `incluir_local` for falso.
+    Com `compacto`, as condições usam as colunas 'dia' e 'local_id' da visão do layout compacto,
+    que casam com os índices das tabelas reais. `por_data` indica uma leitura na ordem das datas
+    (paginação): o filtro por estado então deixa a chave primária de lado, para que o índice
+    (dia, local_id) entregue as linhas já ordenadas. `por_local` indica uma leitura na ordem
+    (city, date) (exportação): com estado e sem município, o filtro de datas deixa de escolher
+    o índice, para que o (state, city, date) ou a chave primária (local_id, dia) seja usado.
     """
-    data_inicial = request.args.get('data_inicial')
-    data_final = request.args.get('data_final')
-    estado = request.args.get('estado')
-    municipio = request.args.get('municipio')
-    page = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 20))
-
-    query = '''
+    where_clauses = ['1=1']
+    params = []
+    data = ('dia {} ' + DAY_FROM_DATE_SQL.format('?')) if compacto else 'date {} ?'
+    if por_local and not filtros['municipio']:
+        data = '+' + data
+    if filtros['data_inicial']:
+        where_clauses.append(data.format('>='))
+        params.append(filtros['data_inicial'])
+    if filtros['data_final']:
+        where_clauses.append(data.format('<='))
+        params.append(filtros['data_final'])
+    if not incluir_local:
+        return where_clauses, params
+    if compacto:
+        if filtros['municipio'] and filtros['estado']:
+            where_clauses.append(PLACE_FILTER_SQL)
+            params.extend([filtros['estado'], filtros['municipio']])
+        elif filtros['municipio']:
+            where_clauses.append(CITY_FILTER_SQL)
+            params.append(filtros['municipio'])
+        elif filtros['estado']:
+            where_clauses.append(('+' if por_data else '') + STATE_FILTER_SQL)
+            params.extend([filtros['estado'], filtros['estado']])
+        return where_clauses, params
+    if filtros['estado']:
+        where_clauses.append('state = ?')
+        params.append(filtros['estado'])
+    if filtros['municipio']:
+        where_clauses.append('city = ?')
+        params.append(filtros['municipio'])
+    return where_clauses, params
+
+_count_cache = {}
+_count_cache_version = None
+_count_cache_lock = threading.Lock()
+
+def build_count_query(filtros, modo, usar_resumos, compacto=False):
+    """
+    SQL da contagem de registros para `filtros`. Retorna (query, params, estimado).
+    Sem filtro de município, a soma de 'registros' nos resumos dá o total exato sem tocar
+    na tabela municipal. Com município, 'estimate' usa o número de datas do intervalo
+    (cada local tem no máximo uma linha por data) e 'exact' faz o COUNT(*) pelo índice.
+    """
+    if usar_resumos:
+        if not filtros['municipio']:
+            fonte = STATE_ROLLUP_TABLE if filtros['estado'] else NATIONAL_ROLLUP_TABLE
+            where_clauses, params = build_where(filtros)
+            query = f"SELECT COALESCE(SUM(registros), 0) AS total FROM {fonte} WHERE {' AND '.join(where_clauses)}"
+            return query, params, False
+        if modo == 'estimate':
+            where_clauses, params = build_where(filtros, incluir_local=False)
+            query = f"SELECT COUNT(*) AS total FROM {NATIONAL_ROLLUP_TABLE} WHERE {' AND '.join(where_clauses)}"
+            return query, params, True
+    where_clauses, params = build_where(filtros, compacto=compacto)
+    query = f"SELECT COUNT(*) as total FROM dados_covid WHERE {' AND '.join(where_clauses)}"
+    return query, params, False
+
+def _count_for_filters(filtros, modo):
+    """Conta os registros de 'dados_covid' que atendem a `filtros`. Retorna (total, estimado)."""
+    query, params, estimado = build_count_query(filtros, modo, rollups_available(), compact_layout())
+    return query_db(query, params, one=True)['total'], estimado
+
+
+def count_records(filtros, modo='exact'):
+    """
+    Total de registros para `filtros`, guardado em cache até a próxima mudança de versão
+    dos dados. Retorna (total, estimado); no modo 'none' não conta nada e retorna (None, False).
+    """
+    global _count_cache_version
+    if modo == 'none':
+        return None, False
+
+    versao = data_version()
+    chave = (modo, tuple(sorted(filtros.items())))
+    with _count_cache_lock:
+        if _count_cache_version != versao:
+            _count_cache.clear()
+            _count_cache_version = versao
+        if chave in _count_cache:
+            return _count_cache[chave]
+
+    resultado = _count_for_filters(filtros, modo)
+    with _count_cache_lock:
+        if _count_cache_version == versao:
+            if len(_count_cache) >= COUNT_CACHE_SIZE:
+                _count_cache.pop(next(iter(_count_cache)))
+            _count_cache[chave] = resultado
+    return resultado
+
+def encode_cursor(row):
+    """Cursor opaco (base64 url-safe) com a posição (date, state, city) de uma linha."""
+    posicao = [row['date'], row['state'], row['city']]
+    return base64.urlsafe_b64encode(json.dumps(posicao).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    """Decodifica um cursor gerado por encode_cursor. Levanta ValueError se for inválido."""
+    try:
+        date, state, city = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, TypeError, binascii.Error):
+        raise ValueError('Cursor inválido.')
+    if not all(isinstance(v, str) for v in (date, state, city)):
+        raise ValueError('Cursor inválido.')
+    return {'date': date, 'state': state, 'city': city}
+
+# Colunas do /api/consulta_dados e do /api/exportar, e o tipo de cada uma no Parquet
+EXPORT_COLUMNS = ['date', 'state', 'city', 'confirmed_cases', 'deaths', 'new_cases', 'new_deaths']
+EXPORT_TYPES = ['data', 'texto', 'texto', 'inteiro', 'inteiro', 'inteiro', 'inteiro']
+CONSULTA_SELECT_SQL = '''
         SELECT
             date,
             state,
@@ -105,110 +244,222 @@ def consulta_dados():
             new_confirmed AS new_cases,
             new_deaths AS new_deaths
         FROM dados_covid
-        WHERE 1=1
+'''
+
+def consulta_order(filtros, compacto=False):
+    """
+    Ordem total (date, state, city) das linhas para `filtros`, como uma lista de
+    (coluna de ordenação, expressão do valor no cursor, campos do cursor usados na expressão).
+    O índice único 'idx_chave' garante uma linha por chave. Colunas fixadas por igualdade
+    saem da ordenação e do cursor, para que o filtro case com o índice composto certo.
+    """
+    sort_columns = ['date', 'state', 'city']
+    if filtros['estado']:
+        sort_columns.remove('state')
+    if filtros['municipio']:
+        sort_columns.remove('city')
+
+    if compacto:
+        # No layout compacto, (dia, local_id) segue a mesma ordem de (date, state, city)
+        ordem = [('dia', DAY_FROM_DATE_SQL.format('?'), ['date'])]
+        if len(sort_columns) > 1:
+            ordem.append(('local_id', PLACE_ID_SQL, ['state', 'city']))
+        return ordem
+    return [(col, '?', [col]) for col in sort_columns]
+
+def build_consulta_query(filtros, per_page, page=1, posicao=None, compacto=False):
+    """
+    SQL de uma página do /api/consulta_dados, em ordem decrescente: a partir da `posicao`
+    de um cursor (keyset) ou, sem cursor, por LIMIT/OFFSET conforme `page`. Retorna (query, params).
+    """
+    where_clauses, params = build_where(filtros, compacto=compacto, por_data=True)
+    ordem = consulta_order(filtros, compacto)
+
+    if posicao:
+        where_clauses.append('({}) < ({})'.format(
+            ', '.join(col for col, _, _ in ordem), ', '.join(valor for _, valor, _ in ordem)
+        ))
+        for _, _, campos in ordem:
+            params.extend(posicao[campo] for campo in campos)
+
+    query = f'''{CONSULTA_SELECT_SQL}
+        WHERE {' AND '.join(where_clauses)}
+        ORDER BY {', '.join(f'{col} DESC' for col, _, _ in ordem)}
+        LIMIT ?
     '''
-    params = []
+    params.append(per_page)
+    if not posicao:
+        query += ' OFFSET ?'
+        params.append((page - 1) * per_page)
+    return query, params
 
-    if data_inicial:
-        query += ' AND date >= ?'
-        params.append(data_inicial)
-    if data_final:
-        query += ' AND date <= ?'
-        params.append(data_final)
-    if estado and estado != "Nenhum estado encontrado":
-        query += ' AND state = ?'
-        params.append(estado)
-    if municipio and municipio != "Nenhum município encontrado":
-        query += ' AND city = ?'
-        params.append(municipio)
-
-    query += ' ORDER BY date DESC LIMIT ? OFFSET ?'
-    params.extend([per_page, (page - 1) * per_page])
+@app.route('/api/consulta_dados', methods=['GET'])
+@conditional_get
+def consulta_dados():
+    """
+    Endpoint para consulta paginada de dados da COVID-19.
+    Aceita filtros por data, estado e município.
+    A paginação pode ser por 'page' (LIMIT/OFFSET, mantida por compatibilidade) ou por
+    'cursor' (keyset): cada resposta traz 'next_cursor', que posiciona a próxima página
+    direto no índice, com custo constante independentemente da profundidade.
+    O parâmetro 'count' (exact | estimate | none) controla o cálculo de 'total_records';
+    clientes que só avançam por cursor podem usar 'none' e dispensar a contagem.
+    """
+    filtros = parse_filters(request.args)
+    page = int(request.args.get('page', 1))
+    per_page = int(request.args.get('per_page', 20))
+    cursor = request.args.get('cursor')
+    count_mode = request.args.get('count', 'exact')
+    if count_mode not in COUNT_MODES:
+        return jsonify({'status': 'error', 'message': "Modo de contagem inválido. Use 'exact', 'estimate' ou 'none'."}), 400
 
+    posicao = None
+    try:
+        if per_page < 1:
+            raise ValueError("O parâmetro 'per_page' deve ser maior que zero.")
+        if cursor:
+            posicao = decode_cursor(cursor)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+    query, params = build_consulta_query(filtros, per_page, page, posicao, compact_layout())
     rows = query_db(query, params)
 
-    count_query = '''
-        SELECT COUNT(*) as total
-        FROM dados_covid
-        WHERE 1=1
-    '''
-    count_params = []
-    # Reconstruir count_params com base nos mesmos filtros
-    if data_inicial:
-        count_query += ' AND date >= ?'
-        count_params.append(data_inicial)
-    if data_final:
-        count_query += ' AND date <= ?'
-        count_params.append(data_final)
-    if estado and estado != "Nenhum estado encontrado":
-        count_query += ' AND state = ?'
-        count_params.append(estado)
-    if municipio and municipio != "Nenhum município encontrado":
-        count_query += ' AND city = ?'
-        count_params.append(municipio)
-
-
-    total = query_db(count_query, count_params, one=True)['total']
+    total, estimado = count_records(filtros, count_mode)
 
     dados = [dict(row) for row in rows]
+    next_cursor = encode_cursor(dados[-1]) if dados and len(dados) == per_page else None
 
     return jsonify({
         "data": dados,
-        "total_records": total
+        "total_records": total,
+        "total_estimated": estimado,
+        "next_cursor": next_cursor
     })
 
-@app.route('/api/covid_data_for_plot', methods=['GET'])
-def covid_data_for_plot():
+def build_export_query(filtros, compacto=False):
     """
-    Endpoint para obter dados para gráficos dinâmicos.
-    Aceita filtros, tipo de gráfico e agregação.
+    SQL de todas as linhas de `filtros` para o /api/exportar, numa ordem que um índice já
+    entrega pronta, sem ordenação temporária, para que o resultado possa ser lido aos poucos:
+    com filtro de estado, por município e data (índice (state, city, date) no layout padrão,
+    chave primária (local_id, dia) no compacto); sem ele, por (date, state, city), como na
+    paginação. Retorna (query, params).
     """
-    data_inicial = request.args.get('data_inicial')
-    data_final = request.args.get('data_final')
-    estado = request.args.get('estado')
-    municipio = request.args.get('municipio')
-    chart_type = request.args.get('chart_type', 'Casos Diários vs. Óbitos Diários')
-    aggregation = request.args.get('aggregation', 'Nenhum') # 'Estado', 'Cidade', 'Nenhum'
-
-    base_query = ""
-    params = []
+    por_local = bool(filtros['estado'])
+    where_clauses, params = build_where(filtros, compacto=compacto, por_data=not por_local, por_local=por_local)
+    if por_local:
+        ordem = ['local_id', 'dia'] if compacto else ['city', 'date']
+    else:
+        ordem = [col for col, _, _ in consulta_order(filtros, compacto)]
+    query = f'''{CONSULTA_SELECT_SQL}
+        WHERE {' AND '.join(where_clauses)}
+        ORDER BY {', '.join(ordem)}
+    '''
+    return query, params
 
-    # Construir a parte WHERE da query
-    where_clauses = ["1=1"]
-    if data_inicial:
-        where_clauses.append('date >= ?')
-        params.append(data_inicial)
-    if data_final:
-        where_clauses.append('date <= ?')
-        params.append(data_final)
+@app.route('/api/exportar', methods=['GET'])
+def exportar():
+    """
+    Exporta, sem paginação, todas as linhas que atendem aos filtros do /api/consulta_dados
+    (data_inicial, data_final, estado, municipio), em ordem crescente de data ou, com filtro de
+    estado, de município e data (ver build_export_query).
+    'formato' escolhe csv (padrão), ndjson ou parquet (requer pyarrow no servidor), e
+    'gzip=1' comprime CSV e NDJSON. A resposta é enviada em partes (chunked), à medida que
+    as linhas são lidas do cursor do SQLite, com memória constante no servidor.
+    """
+    filtros = parse_filters(request.args)
+    formato = request.args.get('formato', 'csv')
+    comprimir = request.args.get('gzip', '0')
+    if formato not in FORMATOS_EXPORTACAO:
+        return jsonify({'status': 'error', 'message': "Formato inválido. Use 'csv', 'ndjson' ou 'parquet'."}), 400
+    if comprimir not in ('0', '1'):
+        return jsonify({'status': 'error', 'message': "'gzip' deve ser 0 ou 1."}), 400
+    comprimir = comprimir == '1'
+    if formato == 'parquet':
+        if comprimir:
+            return jsonify({'status': 'error', 'message': 'O gzip vale só para CSV e NDJSON; o Parquet já é comprimido.'}), 400
+        if importlib.util.find_spec('pyarrow') is None:
+            return jsonify({'status': 'error', 'message': 'Exportação em Parquet indisponível: o servidor não tem o pacote pyarrow.'}), 501
+
+    query, params = build_export_query(filtros, compact_layout())
+    versao = data_version()
+
+    def gerar():
+        # Uma única consulta: no modo WAL, o cursor lê um retrato consistente da base do início
+        # ao fim, mesmo que uma carga termine durante a exportação
+        with read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            try:
+                cursor.execute(query, params)
+                if formato == 'parquet':
+                    partes = parquet_chunks(
+                        EXPORT_COLUMNS, EXPORT_TYPES, fetch_batches(cursor, PARQUET_ROW_GROUP_SIZE)
+                    )
+                elif formato == 'ndjson':
+                    partes = ndjson_chunks(EXPORT_COLUMNS, EXPORT_TYPES, fetch_batches(cursor, EXPORT_FETCH_SIZE))
+                else:
+                    partes = csv_chunks(EXPORT_COLUMNS, fetch_batches(cursor, EXPORT_FETCH_SIZE))
+                yield from gzip_chunks(partes) if comprimir else partes
+            finally:
+                cursor.close()
+
+    nome = f"dados_covid.{formato}{'.gz' if comprimir else ''}"
+    resposta = Response(gerar(), content_type='application/gzip' if comprimir else MIMETYPES[formato])
+    resposta.headers['Content-Disposition'] = f'attachment; filename="{nome}"'
+    resposta.headers['X-Data-Version'] = str(versao)
+    return resposta
+
+def build_plot_query(filtros, chart_type, aggregation, usar_resumos, compacto=False, top_n=None, ranking='casos'):
+    """
+    SQL das séries do /api/covid_data_for_plot para `filtros`, tipo de gráfico e agregação
+    ('Estado', 'Cidade' ou 'Nenhum'). Com `usar_resumos`, séries nacionais e estaduais vêm
+    dos resumos pré-agregados. Com `top_n`, a agregação por estado ou cidade mantém só os
+    `top_n` locais com maior total de `ranking` no período; os demais são somados numa
+    única série, com state e city nulos. Retorna (query, params).
+    """
+    # Menor tabela que atende ao filtro
+    por_cidade = aggregation == 'Cidade' or (aggregation not in ('Estado', 'Cidade') and filtros['municipio'])
+    if por_cidade or not usar_resumos:
+        fonte = 'dados_covid'
+    elif aggregation == 'Estado' or filtros['estado']:
+        fonte = STATE_ROLLUP_TABLE
+    else:
+        fonte = NATIONAL_ROLLUP_TABLE
+    # Os resumos guardam a data em texto em qualquer layout
+    compacto = compacto and fonte == 'dados_covid'
 
-    # Lógica de agregação e filtros específicos para estado/município
-    group_by_clause = "GROUP BY date" # Padrão para gráficos de tempo
+    # Na agregação por estado o município é ignorado; nas demais, estado e município filtram
+    if aggregation == 'Estado':
+        filtros = dict(filtros, municipio=None)
+    where_clauses, params = build_where(filtros, compacto=compacto)
+    where_sql = " AND ".join(where_clauses)
 
+    # Lógica de agregação: no layout compacto, agrupa pelas colunas inteiras (dia, local_id)
+    coluna_data = 'dia' if compacto else 'date'
+    group_by_clause = f"GROUP BY {coluna_data}" # Padrão para gráficos de tempo
     if aggregation == 'Estado':
-        group_by_clause += ', state'
-        if estado and estado != "Nenhum estado encontrado":
-            where_clauses.append('state = ?')
-            params.append(estado)
-        # Se não houver estado específico, agregará por todos os estados
+        chave, grupos, rotulos = 'state', ['state'], ['state']
     elif aggregation == 'Cidade':
-        group_by_clause += ', state, city'
-        if estado and estado != "Nenhum estado encontrado": # Cidade só faz sentido se um estado for selecionado
-            where_clauses.append('state = ?')
-            params.append(estado)
-        if municipio and municipio != "Nenhum município encontrado":
-            where_clauses.append('city = ?')
-            params.append(municipio)
-        # Se não houver município específico, agregará por todas as cidades no estado (ou nacionalmente)
-    else: # aggregation == 'Nenhum' (nacional ou filtro por um único local)
-        if estado and estado != "Nenhum estado encontrado":
-            where_clauses.append('state = ?')
-            params.append(estado)
-        if municipio and municipio != "Nenhum município encontrado":
-            where_clauses.append('city = ?')
-            params.append(municipio)
-
-    where_sql = " AND ".join(where_clauses)
+        chave = 'local_id' if compacto else 'state, city'
+        grupos, rotulos = ['local_id'] if compacto else ['state', 'city'], ['state', 'city']
+    else:
+        chave, grupos, rotulos = None, [], []
+
+    # Top N: o ranking é calculado numa CTE com os mesmos filtros; fora dele, as colunas de
+    # agrupamento viram NULL e todos os demais locais caem no mesmo grupo
+    with_clause = ''
+    if top_n and chave:
+        with_clause = (
+            f"WITH ranking AS (SELECT {chave} FROM {fonte} WHERE {where_sql} GROUP BY {chave} "
+            f"ORDER BY SUM({RANKING_METRICS[ranking]}) DESC, {chave} LIMIT ?) "
+        )
+        params = params + [top_n] + params
+        no_topo = f"({chave}) IN (SELECT {chave} FROM ranking)"
+        grupos = [f"CASE WHEN {no_topo} THEN {col} END" for col in grupos]
+        rotulos = [f"CASE WHEN {no_topo} THEN {col} END AS {col}" for col in rotulos]
+    if grupos:
+        group_by_clause += ', ' + ', '.join(grupos)
 
     # Seleção de colunas baseada no tipo de gráfico
     if chart_type == 'Casos Diários vs. Óbitos Diários':
@@ -220,79 +471,156 @@ def covid_data_for_plot():
         select_cols = 'date, SUM(new_confirmed) as cases, SUM(new_deaths) as deaths'
 
     # Adiciona colunas de agregação se aplicável
-    if aggregation == 'Estado':
-        select_cols += ', state'
-    elif aggregation == 'Cidade':
-        select_cols += ', state, city'
+    if rotulos:
+        select_cols += ', ' + ', '.join(rotulos)
 
+    query = f"{with_clause}SELECT {select_cols} FROM {fonte} WHERE {where_sql} {group_by_clause} ORDER BY {coluna_data} ASC"
+    return query, params
 
-    query = f"SELECT {select_cols} FROM dados_covid WHERE {where_sql} {group_by_clause} ORDER BY date ASC"
+@app.route('/api/covid_data_for_plot', methods=['GET'])
+@conditional_get
+@cached_response(response_cache)
+def covid_data_for_plot():
+    """
+    Endpoint para obter dados para gráficos dinâmicos.
+    Aceita filtros, tipo de gráfico e agregação.
+    Séries nacionais e estaduais são lidas dos resumos pré-agregados; a tabela municipal
+    só é consultada quando o filtro ou a agregação envolve cidades.
+    Nas agregações por estado ou cidade, 'top_n' mantém só as N séries com maior total no
+    período segundo 'ranking' (casos | obitos) e soma as demais na série 'Outros'.
+    Para limitar o tamanho da resposta, 'resample' (diario | semanal | mensal) reagrupa as
+    séries por período e 'max_points' reduz cada série a no máximo esse número de datas,
+    preservando a forma das curvas (LTTB, ver series.py).
+    'formato=colunar' devolve as séries como matrizes rótulos × datas em base64, para
+    leitura direta com numpy (ver series.encode_columnar).
+    """
+    filtros = parse_filters(request.args)
+    chart_type = request.args.get('chart_type', 'Casos Diários vs. Óbitos Diários')
+    aggregation = request.args.get('aggregation', 'Nenhum') # 'Estado', 'Cidade', 'Nenhum'
+    periodo = request.args.get('resample', 'diario')
+    if periodo not in PERIODOS:
+        return jsonify({'status': 'error', 'message': "Reamostragem inválida. Use 'diario', 'semanal' ou 'mensal'."}), 400
+    formato = request.args.get('formato', 'listas')
+    if formato not in FORMATOS:
+        return jsonify({'status': 'error', 'message': "Formato inválido. Use 'listas' ou 'colunar'."}), 400
+    max_points = request.args.get('max_points')
+    if max_points is not None:
+        try:
+            max_points = int(max_points)
+        except ValueError:
+            max_points = 0
+        if max_points < MIN_POINTS:
+            return jsonify({'status': 'error', 'message': f"'max_points' deve ser um inteiro maior ou igual a {MIN_POINTS}."}), 400
+
+    top_n = request.args.get('top_n')
+    if top_n is not None:
+        try:
+            top_n = int(top_n)
+        except ValueError:
+            top_n = 0
+        if top_n < 1:
+            return jsonify({'status': 'error', 'message': "'top_n' deve ser um inteiro positivo."}), 400
+    ranking = request.args.get('ranking', 'casos')
+    if ranking not in RANKING_METRICS:
+        return jsonify({'status': 'error', 'message': "Ranking inválido. Use 'casos' ou 'obitos'."}), 400
+
+    query, params = build_plot_query(
+        filtros, chart_type, aggregation, rollups_available(), compact_layout(), top_n, ranking
+    )
 
     rows = query_db(query, params)
 
-    # Formatar a resposta para o frontend
+    # Pivota as linhas em matrizes rótulos × datas (uma única linha para série única)
+    serie_unica = aggregation == 'Nenhum' or (aggregation == 'Estado' and filtros['estado']) or (aggregation == 'Cidade' and filtros['municipio'])
+    if serie_unica:
+        rotulos = None
+    elif aggregation == 'Estado':
+        rotulos = [row['state'] or OTHERS_LABEL for row in rows]
+    else:
+        # Include state for city label
+        rotulos = [f"{row['city']} ({row['state']})" if row['state'] else OTHERS_LABEL for row in rows]
+    dias, labels, matrizes = pivot(
+        [row['date'] for row in rows], rotulos,
+        {'cases': [row['cases'] for row in rows], 'deaths': [row['deaths'] for row in rows]},
+        por_ultimo=OTHERS_LABEL if top_n else None,
+    )
+    acumulado = chart_type == 'Casos Acumulados vs. Óbitos Acumulados'
+    dias, matrizes = reduce_series(dias, matrizes, periodo, max_points, acumulado)
+
+    if formato == 'colunar':
+        return jsonify(encode_columnar(dias, labels, matrizes))
+
+    # Formato original: uma lista por série, com None nas datas sem valor para o rótulo
     response_data = {
-        "dates": [],
+        "dates": dias.astype(str).tolist(),
         "cases": [],
         "deaths": [],
-        "labels": [] # Para agregação, para identificar as séries
+        "labels": labels # Para agregação, para identificar as séries
     }
-
-    if aggregation == 'Nenhum' or (aggregation == 'Estado' and estado) or (aggregation == 'Cidade' and municipio):
-        # Um único conjunto de séries de dados
-        response_data["dates"] = [row['date'] for row in rows]
-        response_data["cases"] = [row['cases'] for row in rows]
-        response_data["deaths"] = [row['deaths'] for row in rows]
+    casos, obitos = to_lists(matrizes['cases']), to_lists(matrizes['deaths'])
+    if serie_unica:
+        response_data["cases"], response_data["deaths"] = casos[0], obitos[0]
     else:
-        # Múltiplas séries de dados (por estado ou cidade)
-        # Reestruturar dados para facilitar o plot de múltiplas linhas
-        # Ex: {"2020-03-01": {"SP": {"cases": 10, "deaths": 0}, "RJ": {"cases": 5, "deaths": 0}}}
-        grouped_data = {}
-        for row in rows:
-            date = row['date']
-            label = ""
-            if aggregation == 'Estado':
-                label = row['state']
-            elif aggregation == 'Cidade':
-                label = f"{row['city']} ({row['state']})" # Include state for city label
-            
-            if date not in grouped_data:
-                grouped_data[date] = {}
-            if label not in grouped_data[date]:
-                grouped_data[date][label] = {"cases": 0, "deaths": 0}
-            
-            grouped_data[date][label]["cases"] = row['cases']
-            grouped_data[date][label]["deaths"] = row['deaths']
-
-        # Preencher os dados para o gráfico
-        all_dates = sorted(list(grouped_data.keys()))
-        all_labels = sorted(list(set(label for date_data in grouped_data.values() for label in date_data.keys())))
-
-        response_data["dates"] = all_dates
-        response_data["labels"] = all_labels
-        
-        # Inicializar listas para cada label
-        for label in all_labels:
-            response_data[f"cases_{label}"] = []
-            response_data[f"deaths_{label}"] = []
-
-        for date in all_dates:
-            for label in all_labels:
-                data_point = grouped_data.get(date, {}).get(label, {"cases": None, "deaths": None})
-                response_data[f"cases_{label}"].append(data_point["cases"])
-                response_data[f"deaths_{label}"].append(data_point["deaths"])
-        
+        for label, cases, deaths in zip(labels, casos, obitos):
+            response_data[f"cases_{label}"] = cases
+            response_data[f"deaths_{label}"] = deaths
     return jsonify(response_data)
 
 
+def import_job(file_path, layout=None, progresso=NO_PROGRESS):
+    """Job de importação (ver importar_dataset): recarrega a base a partir de `file_path`."""
+    total, segundos = reload_dataset(file_path, layout=layout, progresso=progresso)
+    rows_per_second = total / segundos if segundos > 0 else float(total)
+    return {
+        'message': f'Dataset importado com sucesso de {file_path}: {total} registros em {segundos:.1f}s ({rows_per_second:.0f} registros/s).',
+        'rows': total,
+        'seconds': round(segundos, 3),
+        'rows_per_second': round(rows_per_second, 1),
+    }
+
+def update_job(file_path, modo='incremental', progresso=NO_PROGRESS):
+    """Job de atualização (ver atualizar_dados): incremental sempre que possível, senão recarga completa."""
+    resultado = update_dataset(file_path, modo, progresso=progresso)
+    if resultado['modo'] == 'completo':
+        resultado['message'] = (
+            f"Dados atualizados com sucesso (recarga completa de {resultado['rows']} registros em {resultado['seconds']:.1f}s)."
+        )
+    else:
+        resultado['message'] = (
+            f"Dados atualizados com sucesso: {resultado['inserted']} inseridos, "
+            f"{resultado['updated']} alterados, {resultado['deleted']} removidos, "
+            f"{resultado['unchanged']} inalterados ({resultado['seconds']:.1f}s)."
+        )
+    return resultado
+
+def clear_job(progresso=NO_PROGRESS):
+    """Job de limpeza (ver limpar_base): apaga os registros e os resumos."""
+    clear_database(progresso)
+    return {'message': 'Base de dados limpa com sucesso.'}
+
+def job_accepted(job_id, message):
+    """Resposta 202 dos endpoints de gerenciamento: o job foi registrado e será executado."""
+    return jsonify({
+        'status': 'accepted',
+        'message': message,
+        'job_id': job_id,
+        'status_url': f'/api/jobs/{job_id}',
+    }), 202
+
 @app.route('/api/importar_dataset', methods=['POST'])
 def importar_dataset():
     """
     Importa um novo dataset a partir de um caminho de arquivo CSV/CSV.GZ.
-    Substitui os dados existentes na tabela 'dados_covid'.
+    Substitui os dados existentes na tabela 'dados_covid' (via tabela de staging, ver reload_dataset).
+    O arquivo é lido e gravado em blocos (streaming), com memória limitada pelo CHUNK_SIZE.
+    O campo opcional 'layout' ('padrao' ou 'compacto') escolhe o armazenamento; sem ele,
+    o layout atual da base é mantido.
+    A importação roda em segundo plano: a resposta (202) traz o 'job_id', cujo andamento
+    e resultado são consultados em /api/jobs/<job_id>.
     """
     data = request.get_json()
     file_path = data.get('file_path')
+    layout = data.get('layout')
 
     if not file_path:
         return jsonify({'status': 'error', 'message': 'Caminho do arquivo não fornecido.'}), 400
@@ -300,82 +628,64 @@ def importar_dataset():
     if not os.path.exists(file_path):
         return jsonify({'status': 'error', 'message': f'Arquivo não encontrado: {file_path}'}), 404
 
-    try:
-        if file_path.endswith('.csv.gz'):
-            df = pd.read_csv(file_path, compression='gzip')
-        elif file_path.endswith('.csv'):
-            df = pd.read_csv(file_path)
-        else:
-            return jsonify({'status': 'error', 'message': 'Formato de arquivo não suportado. Use .csv ou .csv.gz.'}), 400
-
-        df = process_dataframe_for_db(df)
-
-        conn = sqlite3.connect(DB_PATH)
-        df.to_sql('dados_covid', conn, if_exists='replace', index=False)
-
-        # Recriar índices para performance
-        cursor = conn.cursor()
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_state ON dados_covid(state);')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_city ON dados_covid(city);')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_date ON dados_covid(date);')
-        conn.commit()
-        conn.close()
-
-        return jsonify({'status': 'success', 'message': f'Dataset importado com sucesso de {file_path}.'})
-    except Exception as e:
-        return jsonify({'status': 'error', 'message': f'Erro ao processar e importar dataset: {str(e)}'}), 500
+    if not file_path.endswith(('.csv', '.csv.gz')):
+        return jsonify({'status': 'error', 'message': 'Formato de arquivo não suportado. Use .csv ou .csv.gz.'}), 400
+
+    if layout is not None and layout not in LAYOUTS:
+        return jsonify({'status': 'error', 'message': "Layout inválido. Use 'padrao' ou 'compacto'."}), 400
+
+    job_id = job_manager.submit('importacao', 'app.import_job', file_path=os.path.abspath(file_path), layout=layout)
+    return job_accepted(job_id, f'Importação de {file_path} iniciada.')
 
 @app.route('/api/atualizar_dados', methods=['PUT'])
 def atualizar_dados():
     """
     Atualiza os dados existentes na base de dados.
     Para este MVP, simula a re-importação do dataset original ou de uma fonte definida.
+    Por padrão a atualização é incremental (apenas linhas novas ou alteradas são gravadas);
+    envie {"modo": "completo"} para forçar a recarga completa.
+    Roda em segundo plano, como a importação (ver /api/jobs/<job_id>).
     """
     # Para simplicidade e seguindo a sugestão do prompt, vamos re-processar o CSV_PATH
     # em um cenário real, isso poderia envolver baixar um CSV mais recente de brasil.io
     # ou de outra fonte.
-    try:
-        # Supondo que CSV_PATH aponta para a fonte "original" que deve ser re-importada
-        if not os.path.exists(CSV_PATH):
-            return jsonify({'status': 'error', 'message': f'Dataset original para atualização não encontrado em {CSV_PATH}.'}), 404
-
-        if CSV_PATH.endswith('.csv.gz'):
-            df = pd.read_csv(CSV_PATH, compression='gzip')
-        elif CSV_PATH.endswith('.csv'):
-            df = pd.read_csv(CSV_PATH)
-        else:
-            return jsonify({'status': 'error', 'message': 'Formato de arquivo original para atualização não suportado. Use .csv ou .csv.gz.'}), 400
-
-        df = process_dataframe_for_db(df)
-
-        conn = sqlite3.connect(DB_PATH)
-        # Estratégia: Substituir se existir, ou adicionar (via replace)
-        df.to_sql('dados_covid', conn, if_exists='replace', index=False)
-
-        # Recriar índices para performance
-        cursor = conn.cursor()
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_state ON dados_covid(state);')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_city ON dados_covid(city);')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_date ON dados_covid(date);')
-        conn.commit()
-        conn.close()
-
-        return jsonify({'status': 'success', 'message': 'Dados atualizados com sucesso.'})
-    except Exception as e:
-        return jsonify({'status': 'error', 'message': f'Erro ao atualizar dados: {str(e)}'}), 500
+    data = request.get_json(silent=True) or {}
+    modo = data.get('modo', 'incremental')
+    if modo not in UPDATE_MODES:
+        return jsonify({'status': 'error', 'message': "Modo de atualização inválido. Use 'incremental' ou 'completo'."}), 400
+
+    # Supondo que CSV_PATH aponta para a fonte "original" que deve ser re-importada
+    if not os.path.exists(CSV_PATH):
+        return jsonify({'status': 'error', 'message': f'Dataset original para atualização não encontrado em {CSV_PATH}.'}), 404
+
+    if not CSV_PATH.endswith(('.csv', '.csv.gz')):
+        return jsonify({'status': 'error', 'message': 'Formato de arquivo original para atualização não suportado. Use .csv ou .csv.gz.'}), 400
+
+    job_id = job_manager.submit('atualizacao', 'app.update_job', file_path=CSV_PATH, modo=modo)
+    return job_accepted(job_id, 'Atualização dos dados iniciada.')
 
 @app.route('/api/limpar_base', methods=['DELETE'])
 def limpar_base():
-    """Limpa todos os registros da tabela 'dados_covid'."""
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM dados_covid')
-        conn.commit()
-        conn.close()
-        return jsonify({'status': 'success', 'message': 'Base de dados limpa com sucesso.'})
-    except Exception as e:
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+    """Limpa todos os registros da tabela 'dados_covid' (em segundo plano, ver /api/jobs/<job_id>)."""
+    job_id = job_manager.submit('limpeza', 'app.clear_job')
+    return job_accepted(job_id, 'Limpeza da base iniciada.')
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def consultar_job(job_id):
+    """
+    Andamento de um job de gerenciamento: 'status' (na_fila | executando | concluido | erro),
+    'fase', 'linhas' processadas, 'progresso' (0 a 1), 'linhas_por_segundo', 'eta_segundos'
+    e, ao final, 'resultado' (a resposta da operação) ou 'erro'.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Job não encontrado.'}), 404
+    return jsonify(job)
+
+@app.route('/api/estatisticas_cache', methods=['GET'])
+def estatisticas_cache():
+    """Contadores do cache de respostas (acertos, falhas, descartes) e sua ocupação atual."""
+    return jsonify(response_cache.stats())
 
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,132 @@
+"""
+Acesso ao banco SQLite do ALERTA-19.
+
+Leituras usam um pool de conexões somente leitura, reaproveitadas entre requisições,
+já configuradas para o modo WAL e com cache/mmap ajustados. Escritas (importação,
+atualização e limpeza) usam uma conexão própria, serializada por um lock, para que
+nunca haja duas cargas disputando o banco dentro do mesmo processo.
+"""
+import os
+import pathlib
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# Caminho absoluto para o banco de dados
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.join(BASE_DIR, 'dados_covid.db')
+
+# Número máximo de conexões de leitura mantidas abertas para reuso
+READ_POOL_SIZE = 8
+# Páginas do banco mapeadas em memória por conexão (bytes)
+MMAP_SIZE = 256 * 1024 * 1024
+# Cache de páginas por conexão (KiB; o PRAGMA recebe o valor negativo)
+CACHE_SIZE_KIB = 64 * 1024
+# Tempo máximo de espera por um lock do SQLite (segundos)
+BUSY_TIMEOUT = 30
+# Tabela chave/valor com metadados da base (ex.: versão dos dados)
+METADATA_TABLE = 'metadados'
+
+_read_pool = queue.LifoQueue(maxsize=READ_POOL_SIZE)
+_write_lock = threading.RLock()
+
+
+def _apply_pragmas(conn):
+    """Ajustes de desempenho comuns às conexões de leitura e de escrita."""
+    conn.execute(f'PRAGMA mmap_size={MMAP_SIZE}')
+    conn.execute(f'PRAGMA cache_size=-{CACHE_SIZE_KIB}')
+    conn.execute('PRAGMA temp_store=MEMORY')
+
+
+def _open_reader():
+    """Abre uma conexão somente leitura (URI mode=ro), que pode ser usada por qualquer thread."""
+    uri = pathlib.Path(DB_PATH).as_uri() + '?mode=ro'
+    conn = sqlite3.connect(uri, uri=True, timeout=BUSY_TIMEOUT, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    _apply_pragmas(conn)
+    conn.execute('PRAGMA query_only=1')
+    return conn
+
+
+@contextmanager
+def read_connection():
+    """
+    Empresta uma conexão de leitura do pool (ou abre uma nova, se o pool estiver vazio)
+    e a devolve ao final. Conexões que falharam são descartadas em vez de devolvidas;
+    outras exceções (ex.: uma resposta em fluxo interrompida pelo cliente) não invalidam
+    a conexão, desde que quem a usou feche os cursores ainda abertos.
+    """
+    try:
+        conn = _read_pool.get_nowait()
+    except queue.Empty:
+        conn = _open_reader()
+    valida = True
+    try:
+        yield conn
+    except sqlite3.Error:
+        valida = False
+        raise
+    finally:
+        if valida:
+            try:
+                _read_pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+        else:
+            conn.close()
+
+
+@contextmanager
+def write_connection():
+    """
+    Abre a conexão usada pelas operações de escrita, serializadas pelo lock do módulo.
+    O modo WAL permite que os leitores continuem consultando a versão anterior dos dados
+    enquanto uma carga longa está em andamento.
+    """
+    with _write_lock:
+        conn = sqlite3.connect(DB_PATH, timeout=BUSY_TIMEOUT)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            _apply_pragmas(conn)
+            yield conn
+        finally:
+            conn.close()
+
+
+def query_db(query, args=(), one=False):
+    """Função auxiliar para executar consultas SQL no banco de dados."""
+    with read_connection() as conn:
+        rv = conn.execute(query, args).fetchall()
+    return (rv[0] if rv else None) if one else rv
+
+
+def data_version():
+    """
+    Versão atual dos dados, incrementada a cada importação, atualização ou limpeza.
+    Caches de leitura usam esse valor para saber quando foram invalidados.
+    """
+    try:
+        row = query_db(f"SELECT valor FROM {METADATA_TABLE} WHERE chave = 'versao_dados'", one=True)
+    except sqlite3.OperationalError:
+        # Base criada antes da tabela de metadados
+        return 0
+    return row['valor'] if row else 0
+
+
+def bump_data_version(conn):
+    """
+    Incrementa a versão dos dados na transação de escrita corrente de `conn`.
+    A primeira versão parte do relógio, para que uma base recriada do zero não repita
+    versões já vistas pelos caches.
+    """
+    conn.execute(f'CREATE TABLE IF NOT EXISTS {METADATA_TABLE} (chave TEXT PRIMARY KEY, valor)')
+    conn.execute(
+        f"""
+        INSERT INTO {METADATA_TABLE} (chave, valor) VALUES ('versao_dados', ?)
+        ON CONFLICT(chave) DO UPDATE SET valor = valor + 1
+        """,
+        (int(time.time()),),
+    )
@@ -0,0 +1,162 @@
+"""
+Cache em memória das respostas dos endpoints de leitura do ALERTA-19.
+
+As respostas de /api/estados, /api/municipios e /api/covid_data_for_plot só mudam quando
+os dados mudam. O cache guarda o corpo JSON já serializado, indexado pelo endpoint e pelos
+parâmetros da query string normalizados, e é esvaziado sempre que a versão dos dados
+(banco.data_version) muda — o que acontece a cada importação, atualização ou limpeza.
+O espaço é limitado em bytes (LRU) e cada entrada expira após um tempo máximo (TTL).
+
+Os mesmos endpoints (e o /api/consulta_dados) respondem a GETs condicionais: a ETag forte
+deriva da versão dos dados e dos parâmetros, então um If-None-Match que ainda bate é
+respondido com 304 sem consultar nada além da versão.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, g, request
+
+from banco import data_version
+
+# Tamanho máximo somado dos corpos guardados (bytes) e validade de cada entrada (segundos)
+MAX_BYTES = 64 * 1024 * 1024
+TTL = 600
+
+
+class ResponseCache:
+    """LRU limitado em bytes, com TTL por entrada e invalidação pela versão dos dados."""
+
+    def __init__(self, max_bytes=MAX_BYTES, ttl=TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # chave -> (corpo, instante de gravação)
+        self._bytes = 0
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    def _check_version(self, versao):
+        if versao != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._bytes = 0
+            self._version = versao
+
+    def get(self, chave, versao):
+        """Corpo guardado para `chave` na `versao` dos dados, ou None."""
+        with self._lock:
+            self._check_version(versao)
+            entrada = self._entries.get(chave)
+            if entrada is not None and time.monotonic() - entrada[1] > self.ttl:
+                del self._entries[chave]
+                self._bytes -= len(entrada[0])
+                self.expirations += 1
+                entrada = None
+            if entrada is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(chave)
+            self.hits += 1
+            return entrada[0]
+
+    def put(self, chave, versao, corpo):
+        """Guarda `corpo` (bytes), descartando as entradas menos usadas até caber no limite."""
+        if len(corpo) > self.max_bytes:
+            return
+        with self._lock:
+            self._check_version(versao)
+            anterior = self._entries.pop(chave, None)
+            if anterior is not None:
+                self._bytes -= len(anterior[0])
+            while self._entries and self._bytes + len(corpo) > self.max_bytes:
+                _, (descartado, _) = self._entries.popitem(last=False)
+                self._bytes -= len(descartado)
+                self.evictions += 1
+            self._entries[chave] = (corpo, time.monotonic())
+            self._bytes += len(corpo)
+
+    def stats(self):
+        """Contadores e ocupação atual do cache."""
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / consultas, 4) if consultas else None,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl,
+                'data_version': self._version,
+            }
+
+
+def request_version():
+    """Versão dos dados, lida uma única vez por requisição (compartilhada pelos decoradores)."""
+    if 'data_version' not in g:
+        g.data_version = data_version()
+    return g.data_version
+
+
+def cache_key(endpoint, args):
+    """Chave do cache: endpoint e parâmetros não vazios, em ordem, independente da ordem na URL."""
+    return (endpoint,) + tuple(sorted((k, v) for k, v in args.items(multi=True) if v != ''))
+
+
+def cached_response(cache):
+    """
+    Decorador para endpoints GET que retornam JSON: responde do `cache` quando possível e
+    guarda as respostas 200 geradas pelo endpoint.
+    """
+    def decorador(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # Versão lida antes da consulta: se os dados mudarem no meio, a entrada nasce
+            # numa versão já superada e é descartada na próxima requisição.
+            versao = request_version()
+            chave = cache_key(request.endpoint, request.args)
+            corpo = cache.get(chave, versao)
+            if corpo is not None:
+                return Response(corpo, mimetype='application/json')
+            resposta = view(*args, **kwargs)
+            if isinstance(resposta, Response) and resposta.status_code == 200:
+                cache.put(chave, versao, resposta.get_data())
+            return resposta
+        return wrapper
+    return decorador
+
+
+def make_etag(chave, versao):
+    """ETag forte (sem aspas) para a resposta de `chave` na `versao` dos dados."""
+    return f'{versao}-' + hashlib.sha1(repr(chave).encode('utf-8')).hexdigest()[:16]
+
+
+def conditional_get(view):
+    """
+    Decorador para endpoints GET cuja resposta depende só dos parâmetros e da versão dos
+    dados: devolve 304 quando o If-None-Match do cliente ainda vale e, nas respostas 200,
+    envia a ETag e o cabeçalho X-Data-Version.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        versao = request_version()
+        etag = make_etag(cache_key(request.endpoint, request.args), versao)
+        if request.if_none_match.contains(etag):
+            resposta = Response(status=304)
+        else:
+            resposta = view(*args, **kwargs)
+            if not isinstance(resposta, Response) or resposta.status_code != 200:
+                return resposta
+        resposta.set_etag(etag)
+        # O cliente pode guardar a resposta, mas deve revalidá-la a cada uso
+        resposta.headers['Cache-Control'] = 'no-cache'
+        resposta.headers['X-Data-Version'] = str(versao)
+        return resposta
+    return wrapper
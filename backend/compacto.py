@@ -0,0 +1,100 @@
+"""
+Layout compacto de armazenamento da base do ALERTA-19.
+
+No layout padrão, 'dados_covid' é uma tabela que repete estado, município e data (texto)
+em todas as linhas. No layout compacto, cada (state, city) é gravado uma única vez em
+'locais', e os fatos ficam em 'fatos_covid' (WITHOUT ROWID, chave (local_id, dia)), com a
+data como número inteiro de dias desde 1970-01-01. Uma visão chamada 'dados_covid' expõe
+as mesmas colunas do layout padrão (mais 'dia' e 'local_id'), de modo que as respostas da
+API não mudam.
+
+Os ids de 'locais' são atribuídos em ordem de (state, city): a ordem (dia, local_id) é a
+mesma ordem (date, state, city) do layout padrão, e os locais de um estado formam um
+intervalo contínuo de ids.
+"""
+
+PLACES_TABLE = 'locais'
+FACTS_TABLE = 'fatos_covid'
+LAYOUTS = ('padrao', 'compacto')
+
+# Conversões entre a data em texto (AAAA-MM-DD) e o número do dia
+DAY_FROM_DATE_SQL = "CAST(strftime('%s', {}) AS INTEGER) / 86400"
+DATE_FROM_DAY_SQL = "date({} * 86400, 'unixepoch')"
+
+CREATE_PLACES_SQL = '''
+    CREATE TABLE {tabela} (
+        id INTEGER PRIMARY KEY,
+        state TEXT NOT NULL,
+        city TEXT NOT NULL,
+        UNIQUE (state, city)
+    )
+'''
+
+CREATE_FACTS_SQL = '''
+    CREATE TABLE {tabela} (
+        local_id INTEGER NOT NULL,
+        dia INTEGER NOT NULL,
+        last_available_confirmed INTEGER NOT NULL,
+        last_available_deaths INTEGER NOT NULL,
+        new_confirmed INTEGER NOT NULL,
+        new_deaths INTEGER NOT NULL,
+        PRIMARY KEY (local_id, dia)
+    ) WITHOUT ROWID
+'''
+
+# As colunas da visão são qualificadas pelo nome das tabelas (sem apelidos), para que o
+# EXPLAIN QUERY PLAN das consultas feitas sobre ela cite as tabelas reais.
+CREATE_VIEW_SQL = f'''
+    CREATE VIEW dados_covid AS
+    SELECT
+        {DATE_FROM_DAY_SQL.format(FACTS_TABLE + '.dia')} AS date,
+        {PLACES_TABLE}.state AS state,
+        {PLACES_TABLE}.city AS city,
+        {FACTS_TABLE}.last_available_confirmed AS last_available_confirmed,
+        {FACTS_TABLE}.last_available_deaths AS last_available_deaths,
+        {FACTS_TABLE}.new_confirmed AS new_confirmed,
+        {FACTS_TABLE}.new_deaths AS new_deaths,
+        {FACTS_TABLE}.dia AS dia,
+        {FACTS_TABLE}.local_id AS local_id
+    FROM {FACTS_TABLE}
+    JOIN {PLACES_TABLE} ON {PLACES_TABLE}.id = {FACTS_TABLE}.local_id
+'''
+
+# Filtros por local sobre a visão, em termos de 'local_id'
+STATE_FILTER_SQL = (
+    f'local_id BETWEEN (SELECT MIN(id) FROM {PLACES_TABLE} WHERE state = ?) '
+    f'AND (SELECT MAX(id) FROM {PLACES_TABLE} WHERE state = ?)'
+)
+CITY_FILTER_SQL = f'local_id IN (SELECT id FROM {PLACES_TABLE} WHERE city = ?)'
+PLACE_FILTER_SQL = f'local_id IN (SELECT id FROM {PLACES_TABLE} WHERE state = ? AND city = ?)'
+PLACE_ID_SQL = f'(SELECT id FROM {PLACES_TABLE} WHERE state = ? AND city = ?)'
+
+
+def is_compact(conn):
+    """Indica se 'dados_covid' em `conn` é a visão do layout compacto."""
+    row = conn.execute("SELECT type FROM sqlite_master WHERE name = 'dados_covid'").fetchone()
+    return row is not None and row[0] == 'view'
+
+
+def build_compact_tables(conn, origem, sufixo):
+    """
+    Cria 'locais<sufixo>' e 'fatos_covid<sufixo>' a partir da tabela no layout padrão
+    `origem`, que é descartada ao final. Chaves repetidas mantêm a última ocorrência,
+    como na criação do índice único do layout padrão.
+    """
+    locais, fatos = PLACES_TABLE + sufixo, FACTS_TABLE + sufixo
+    conn.execute(f'DROP TABLE IF EXISTS {locais}')
+    conn.execute(f'DROP TABLE IF EXISTS {fatos}')
+    conn.execute(CREATE_PLACES_SQL.format(tabela=locais))
+    conn.execute(CREATE_FACTS_SQL.format(tabela=fatos))
+    conn.execute(f'INSERT INTO {locais} (state, city) SELECT DISTINCT state, city FROM {origem} ORDER BY state, city')
+    # Inserção na ordem da chave primária: a árvore da tabela WITHOUT ROWID cresce só pela direita
+    conn.execute(f'''
+        INSERT OR REPLACE INTO {fatos}
+        SELECT l.id, {DAY_FROM_DATE_SQL.format('o.date')},
+               o.last_available_confirmed, o.last_available_deaths, o.new_confirmed, o.new_deaths
+        FROM {origem} o JOIN {locais} l ON l.state = o.state AND l.city = o.city
+        ORDER BY 1, 2, o.rowid
+    ''')
+    conn.execute(f'DROP TABLE {origem}')
+    conn.commit()
@@ -0,0 +1,52 @@
+"""Fixtures compartilhadas pelos testes do backend: base SQLite temporária e arquivo de dados pequeno."""
+import csv
+import queue
+from datetime import date, timedelta
+
+import pytest
+
+import banco
+from leitura import IMPORT_COLUMNS
+
+# Com poucos municípios por estado, as estatísticas do ANALYZE levam o otimizador a planos
+# diferentes dos da base real (ex.: percorrer o índice por data numa consulta por município)
+ESTADOS = ['AC', 'RJ', 'SP']
+MUNICIPIOS_POR_ESTADO = 40
+DIAS = 60
+PRIMEIRO_DIA = date(2020, 3, 1)
+
+
+def _drain_read_pool():
+    """Fecha as conexões de leitura guardadas no pool, abertas para o DB_PATH anterior."""
+    while True:
+        try:
+            banco._read_pool.get_nowait().close()
+        except queue.Empty:
+            return
+
+
+@pytest.fixture
+def base(tmp_path, monkeypatch):
+    """Caminho de uma base vazia em `tmp_path`, usada por banco durante o teste."""
+    caminho = tmp_path / 'dados_covid.db'
+    monkeypatch.setattr(banco, 'DB_PATH', str(caminho))
+    _drain_read_pool()
+    yield caminho
+    _drain_read_pool()
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    """CSV pequeno com alguns estados, municípios e dias consecutivos."""
+    caminho = tmp_path / 'dados.csv'
+    with open(caminho, 'w', newline='', encoding='utf-8') as arquivo:
+        escritor = csv.writer(arquivo)
+        escritor.writerow(IMPORT_COLUMNS)
+        for estado in ESTADOS:
+            for i in range(MUNICIPIOS_POR_ESTADO):
+                acumulado = 0
+                for dia in range(DIAS):
+                    acumulado += dia
+                    data = (PRIMEIRO_DIA + timedelta(days=dia)).isoformat()
+                    escritor.writerow([data, estado, f'Cidade {estado} {i}', acumulado, dia // 3, dia, dia % 3])
+    return caminho
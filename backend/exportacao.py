@@ -0,0 +1,137 @@
+"""
+Serialização em fluxo (streaming) das exportações do /api/exportar.
+
+As linhas chegam do cursor do SQLite em lotes (fetchmany) e cada lote é convertido em
+bytes e entregue ao cliente antes do próximo ser lido, de modo que a memória do servidor
+depende do tamanho do lote, não do resultado. Formatos:
+
+- 'csv': cabeçalho e linhas separadas por vírgula;
+- 'ndjson': um objeto JSON por linha;
+- 'parquet': um row group por lote. Requer o pacote opcional pyarrow, importado só quando
+  o formato é pedido.
+
+CSV e NDJSON podem ainda ser comprimidos com gzip, também em fluxo.
+"""
+import csv
+import io
+import json
+import zlib
+from json.encoder import encode_basestring
+
+FORMATOS_EXPORTACAO = ('csv', 'ndjson', 'parquet')
+# Linhas lidas do cursor por vez (CSV e NDJSON) e linhas por row group do Parquet
+EXPORT_FETCH_SIZE = 5_000
+PARQUET_ROW_GROUP_SIZE = 100_000
+# Tipo de conteúdo de cada formato
+MIMETYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+    'parquet': 'application/vnd.apache.parquet',
+}
+# Encoder das linhas NDJSON com nulos (json.dumps com opções criaria um novo a cada chamada)
+_json_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+# Nível de compressão do gzip: o ganho dos níveis mais altos não compensa a CPU num fluxo
+GZIP_LEVEL = 6
+
+
+def fetch_batches(cursor, tamanho):
+    """Lotes de até `tamanho` linhas (tuplas) de `cursor`, até o fim do resultado."""
+    while True:
+        linhas = cursor.fetchmany(tamanho)
+        if not linhas:
+            return
+        yield linhas
+
+
+def csv_chunks(colunas, lotes):
+    """Cabeçalho e, para cada lote, as linhas em CSV (bytes UTF-8)."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(colunas)
+    for linhas in lotes:
+        writer.writerows(linhas)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def ndjson_chunks(colunas, tipos, lotes):
+    """
+    Para cada lote, as linhas como objetos JSON, um por linha (bytes UTF-8). As linhas são
+    montadas num modelo fixo, com só os textos passando pelo escape do JSON; linhas com
+    valores nulos usam o encoder completo.
+    """
+    modelo = '{{' + ','.join(f'{encode_basestring(coluna)}:{{}}' for coluna in colunas) + '}}\n'
+    textos = [tipo != 'inteiro' for tipo in tipos]
+
+    def linha_json(linha):
+        if None in linha:
+            return _json_encoder.encode(dict(zip(colunas, linha))) + '\n'
+        return modelo.format(*(encode_basestring(v) if texto else v for v, texto in zip(linha, textos)))
+
+    for linhas in lotes:
+        yield ''.join(map(linha_json, linhas)).encode('utf-8')
+
+
+class _SinkStream(io.RawIOBase):
+    """
+    Destino do ParquetWriter que só acumula os bytes escritos desde a última coleta.
+    A posição (tell) continua crescendo, pois o writer a usa nos metadados do rodapé.
+    """
+
+    def __init__(self):
+        self._partes = []
+        self._posicao = 0
+
+    def writable(self):
+        return True
+
+    def write(self, dados):
+        self._partes.append(bytes(dados))
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self):
+        return self._posicao
+
+    def collect(self):
+        dados = b''.join(self._partes)
+        self._partes = []
+        return dados
+
+
+def parquet_chunks(colunas, tipos, lotes):
+    """
+    Arquivo Parquet em partes: um row group por lote, entregue assim que escrito, e o rodapé
+    ao final. `tipos` diz, para cada coluna, se ela é 'texto', 'data' ou 'inteiro'.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    tipos_arrow = {'texto': pa.string(), 'data': pa.date32(), 'inteiro': pa.int64()}
+    schema = pa.schema([(coluna, tipos_arrow[tipo]) for coluna, tipo in zip(colunas, tipos)])
+    destino = _SinkStream()
+    writer = pq.ParquetWriter(destino, schema)
+    try:
+        for linhas in lotes:
+            arrays = [
+                pa.array(valores, pa.string()).cast(pa.date32()) if tipo == 'data' else pa.array(valores, campo.type)
+                for valores, tipo, campo in zip(zip(*linhas), tipos, schema)
+            ]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            yield destino.collect()
+    finally:
+        writer.close()
+    yield destino.collect()
+
+
+def gzip_chunks(partes):
+    """Comprime as `partes` (bytes) num único fluxo gzip, parte a parte."""
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    for parte in partes:
+        comprimido = compressor.compress(parte)
+        if comprimido:
+            yield comprimido
+    yield compressor.flush()
@@ -0,0 +1,271 @@
+"""
+Gerenciamento dos índices da tabela 'dados_covid'.
+
+Os índices são compostos e casam com os formatos reais de consulta da API: a chave
+(date, state, city) atende à paginação sem filtro de local, e os dois índices iniciados
+por estado atendem aos filtros por estado e por município. Estes dois trazem também as
+métricas, de modo que páginas, contagens e séries por cidade são respondidas só pelo
+índice (covering), sem voltar à tabela. No layout compacto (ver compacto.py), a chave
+primária (local_id, dia) e o índice (dia, local_id) cumprem os mesmos papéis.
+
+Uso (a partir da pasta 'backend'):
+    python indices.py              # cria os índices que faltarem na base ativa e roda ANALYZE
+    python indices.py --explain    # imprime o EXPLAIN QUERY PLAN das consultas de cada endpoint
+    python indices.py --verificar  # termina com código 1 se alguma consulta varrer a tabela inteira
+                                   # (ou se a exportação precisar de ordenação temporária)
+"""
+import argparse
+import sqlite3
+import sys
+
+import banco
+from compacto import DATE_FROM_DAY_SQL, FACTS_TABLE, PLACES_TABLE, is_compact
+
+METRICS = 'last_available_confirmed, last_available_deaths, new_confirmed, new_deaths'
+# Índices da tabela de dados: (nome, colunas, único). Cada um casa com a ordenação da paginação
+# por cursor (date, state, city) para um formato de filtro: sem local, por estado, por município.
+DATA_INDEXES = [
+    ('idx_chave', 'date, state, city', True),
+    ('idx_state_date', 'state, date, city, ' + METRICS, False),
+    ('idx_state_city_date', 'state, city, date, ' + METRICS, False),
+]
+# Layout compacto: a chave primária (local_id, dia) atende aos filtros por local; este índice
+# atende à paginação por data, na ordem (dia, local_id) = (date, state, city).
+COMPACT_INDEXES = [
+    ('idx_fatos_dia', 'dia, local_id', False),
+]
+# Índices de coluna única criados por versões anteriores do criar_db.py, substituídos pelos acima
+LEGACY_INDEXES = ['idx_state', 'idx_city', 'idx_date']
+# Tabelas em que uma varredura completa (da tabela ou de um índice inteiro) é considerada regressão
+FULL_SCAN_TABLES = ('dados_covid', FACTS_TABLE)
+
+
+def _columns(colunas):
+    return [col.strip() for col in colunas.split(',')]
+
+
+def free_index_name(conn, nome):
+    """
+    Nomes de índice são globais no SQLite e não podem ser renomeados. Para que os índices
+    da tabela de staging não colidam com os da tabela ativa, alterna entre 'nome' e 'nome_b'.
+    """
+    existe = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (nome,)
+    ).fetchone()
+    return f'{nome}_b' if existe else nome
+
+
+def remove_duplicate_keys(conn, tabela, colunas):
+    """Mantém apenas a última ocorrência de cada combinação de `colunas` em `tabela`."""
+    conn.execute(f'''
+        DELETE FROM {tabela}
+        WHERE rowid NOT IN (SELECT MAX(rowid) FROM {tabela} GROUP BY {colunas})
+    ''')
+
+
+def _create_index(conn, tabela, nome, colunas, unico):
+    create_sql = 'CREATE {}INDEX {} ON {}({})'.format(
+        'UNIQUE ' if unico else '', free_index_name(conn, nome), tabela, colunas
+    )
+    try:
+        conn.execute(create_sql)
+    except sqlite3.IntegrityError:
+        # Chaves repetidas no arquivo de origem: descarta as duplicatas e tenta de novo.
+        # As impressões digitais dessas datas deixam de bater e serão revistas na próxima
+        # atualização incremental.
+        remove_duplicate_keys(conn, tabela, colunas)
+        conn.execute(create_sql)
+
+
+def create_data_indexes(conn, tabela, definicoes=DATA_INDEXES):
+    """Cria os índices de `definicoes` em `tabela` e atualiza as estatísticas do otimizador."""
+    for nome, colunas, unico in definicoes:
+        _create_index(conn, tabela, nome, colunas, unico)
+    conn.commit()
+    conn.execute(f'ANALYZE {tabela}')
+    conn.commit()
+
+
+def create_compact_indexes(conn, sufixo=''):
+    """Índices e estatísticas das tabelas 'locais<sufixo>' e 'fatos_covid<sufixo>' do layout compacto."""
+    create_data_indexes(conn, FACTS_TABLE + sufixo, COMPACT_INDEXES)
+    conn.execute(f'ANALYZE {PLACES_TABLE + sufixo}')
+    conn.commit()
+
+
+def existing_indexes(conn, tabela):
+    """Índices de `tabela` como {nome: (colunas, único)}."""
+    indices = {}
+    for indice in conn.execute(f"PRAGMA index_list('{tabela}')").fetchall():
+        colunas = [col[2] for col in conn.execute(f"PRAGMA index_info('{indice[1]}')").fetchall()]
+        indices[indice[1]] = (colunas, bool(indice[2]))
+    return indices
+
+
+def ensure_data_indexes(conn):
+    """
+    Atualiza os índices de uma base existente: remove os índices de coluna única antigos,
+    cria os que faltarem (comparando colunas, não nomes, já que os nomes alternam a cada
+    recarga) e roda ANALYZE. Retorna os nomes dos índices criados.
+    """
+    tabela, definicoes = 'dados_covid', DATA_INDEXES
+    if is_compact(conn):
+        tabela, definicoes = FACTS_TABLE, COMPACT_INDEXES
+    atuais = existing_indexes(conn, tabela)
+    for nome in LEGACY_INDEXES:
+        if nome in atuais:
+            conn.execute(f'DROP INDEX {nome}')
+    presentes = [definicao for nome, definicao in atuais.items() if nome not in LEGACY_INDEXES]
+    criados = []
+    for nome, colunas, unico in definicoes:
+        if (_columns(colunas), unico) not in presentes:
+            _create_index(conn, tabela, nome, colunas, unico)
+            criados.append(nome)
+    conn.commit()
+    conn.execute(f'ANALYZE {tabela}')
+    conn.commit()
+    return criados
+
+
+def explain(conn, query, params=()):
+    """Linhas do EXPLAIN QUERY PLAN de `query`, na ordem em que o SQLite as devolve."""
+    return [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + query, params).fetchall()]
+
+
+def full_scans(plano, limitada=False, tabelas=FULL_SCAN_TABLES):
+    """
+    Passos de `plano` que percorrem uma das `tabelas` inteira, sem busca (SEARCH) no índice.
+    Em consultas com LIMIT (`limitada`), percorrer um índice na ordem do ORDER BY, sem
+    ordenação temporária, lê só as linhas da página e não conta como varredura completa.
+    """
+    ordenada = not any(passo.startswith('USE TEMP B-TREE') for passo in plano)
+    return [
+        passo for passo in plano
+        if any(passo == f'SCAN {tabela}' or passo.startswith(f'SCAN {tabela} ') for tabela in tabelas)
+        and not (limitada and ordenada and 'INDEX' in passo)
+    ]
+
+
+def plan_failures(rotulo, query, plano, varredura_permitida=False):
+    """
+    Problemas do `plano` de uma consulta de endpoint (ver endpoint_queries): varreduras
+    completas não permitidas e, na exportação, ordenação temporária. Lista vazia se nenhum.
+    """
+    falhas = []
+    varreduras = full_scans(plano, limitada='LIMIT' in query)
+    if varreduras and not varredura_permitida:
+        falhas.append(f'VARREDURA COMPLETA em {rotulo}: ' + '; '.join(varreduras))
+    # A exportação lê o resultado aos poucos: uma ordenação temporária o acumularia inteiro
+    if rotulo.startswith('exportar') and any(passo.startswith('USE TEMP B-TREE') for passo in plano):
+        falhas.append(f'ORDENAÇÃO TEMPORÁRIA em {rotulo}')
+    return falhas
+
+
+def _sample_values(conn):
+    """Estado, município e datas reais da base, para que os planos reflitam valores válidos."""
+    row = conn.execute('SELECT state, city FROM dados_covid LIMIT 1').fetchone()
+    estado, municipio = row if row else ('SP', 'São Paulo')
+    if is_compact(conn):
+        datas = conn.execute('SELECT {}, {} FROM {}'.format(
+            DATE_FROM_DAY_SQL.format('MIN(dia)'), DATE_FROM_DAY_SQL.format('MAX(dia)'), FACTS_TABLE
+        )).fetchone()
+    else:
+        datas = conn.execute('SELECT MIN(date), MAX(date) FROM dados_covid').fetchone()
+    return estado, municipio, datas[0] or '2020-01-01', datas[1] or '2020-12-31'
+
+
+def endpoint_queries(conn):
+    """
+    Consultas SQL que cada endpoint de leitura gera, para cada combinação de filtros,
+    paginação, agregação e tipo de gráfico. Retorna uma lista de (rótulo, query, params,
+    varredura_permitida); a varredura completa só é aceitável quando não há filtro algum
+    ou a agregação nacional por cidade pede todas as linhas.
+    """
+    import app as api
+    import ingestao
+
+    estado, municipio, data_inicial, data_final = _sample_values(conn)
+    formatos = {
+        'sem filtro': {},
+        'datas': {'data_inicial': data_inicial, 'data_final': data_final},
+        'estado': {'estado': estado},
+        'estado+datas': {'estado': estado, 'data_inicial': data_inicial, 'data_final': data_final},
+        'município': {'estado': estado, 'municipio': municipio},
+        'município+datas': {'estado': estado, 'municipio': municipio,
+                            'data_inicial': data_inicial, 'data_final': data_final},
+    }
+    compacto = is_compact(conn)
+    usar_resumos = [False]
+    resumos = (ingestao.STATE_ROLLUP_TABLE, ingestao.NATIONAL_ROLLUP_TABLE)
+    if all(ingestao._table_exists(conn, tabela) for tabela in resumos):
+        usar_resumos.append(True)
+
+    consultas = [
+        # O plano mostra SCAN, mas o DISTINCT no prefixo do índice salta entre valores distintos
+        ('estados', api.COMPACT_ESTADOS_SQL if compacto else api.ESTADOS_SQL, (), True),
+        ('municipios', api.COMPACT_MUNICIPIOS_SQL if compacto else api.MUNICIPIOS_SQL, (estado,), False),
+    ]
+    for rotulo, args in formatos.items():
+        filtros = api.parse_filters(args)
+        sem_filtro = not args
+        posicao = {'date': data_final, 'state': estado, 'city': municipio}
+        for pagina, pos in (('page', None), ('cursor', posicao)):
+            query, params = api.build_consulta_query(filtros, 20, 2, pos, compacto)
+            consultas.append((f'consulta_dados [{rotulo}, {pagina}]', query, params, False))
+        query, params = api.build_export_query(filtros, compacto)
+        consultas.append((f'exportar [{rotulo}]', query, params, sem_filtro))
+        for resumos in usar_resumos:
+            for modo in ('exact', 'estimate'):
+                query, params, _ = api.build_count_query(filtros, modo, resumos, compacto)
+                fonte = 'resumos' if resumos else 'sem resumos'
+                consultas.append((f'consulta_dados total [{rotulo}, {modo}, {fonte}]', query, params, sem_filtro))
+            for aggregation in ('Nenhum', 'Estado', 'Cidade'):
+                for chart_type in ('Casos Diários vs. Óbitos Diários', 'Casos Acumulados vs. Óbitos Acumulados'):
+                    for top_n in ((None, 10) if aggregation != 'Nenhum' else (None,)):
+                        query, params = api.build_plot_query(filtros, chart_type, aggregation, resumos, compacto, top_n)
+                        fonte = 'resumos' if resumos else 'sem resumos'
+                        topo = f', top {top_n}' if top_n else ''
+                        nacional_por_cidade = aggregation == 'Cidade' and not filtros['estado']
+                        consultas.append((
+                            f'covid_data_for_plot [{rotulo}, {aggregation}{topo}, {chart_type}, {fonte}]', query, params,
+                            sem_filtro or nacional_por_cidade,
+                        ))
+    return consultas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Índices da base do ALERTA-19.')
+    parser.add_argument('--db', default=banco.DB_PATH, help='caminho do banco SQLite')
+    parser.add_argument('--explain', action='store_true', help='imprime o plano de cada consulta dos endpoints')
+    parser.add_argument('--verificar', action='store_true',
+                        help="falha se uma consulta filtrada varrer 'dados_covid' inteira ou a exportação ordenar em memória")
+    args = parser.parse_args(argv)
+    banco.DB_PATH = args.db
+
+    if not args.explain and not args.verificar:
+        with banco.write_connection() as conn:
+            criados = ensure_data_indexes(conn)
+        print('Índices criados: ' + (', '.join(criados) if criados else 'nenhum (todos já existiam)'))
+        return 0
+
+    with banco.read_connection() as conn:
+        falhas = []
+        for rotulo, query, params, varredura_permitida in endpoint_queries(conn):
+            plano = explain(conn, query, params)
+            falhas += plan_failures(rotulo, query, plano, varredura_permitida)
+            if args.explain:
+                print(rotulo)
+                for passo in plano:
+                    print('    ' + passo)
+
+    if args.verificar:
+        for falha in falhas:
+            print(falha)
+        if falhas:
+            return 1
+        print('Nenhuma consulta varre a tabela inteira.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,640 @@
+"""
+Ingestão do dataset no ALERTA-19: biblioteca usada pelos jobs de gerenciamento do app e
+linha de comando para cargas offline, de modo que as duas usam o mesmo caminho otimizado.
+
+- recarga completa (reload_dataset): leitura em blocos (streaming), opcionalmente em
+  paralelo (ver leitura.py), em tabelas de staging trocadas pelas ativas só ao final;
+- atualização incremental (upsert_dataset): só as linhas novas ou alteradas são gravadas;
+- simulação (dry-run): o arquivo é lido e comparado com a base, sem gravar nada.
+
+Uso:
+    python backend/ingestao.py [arquivo] [--db CAMINHO] [--modo completo|incremental]
+        [--layout padrao|compacto] [--workers N] [--chunksize N] [--dry-run]
+
+Ao final, a linha de comando mostra o tempo, as linhas e a vazão de cada etapa.
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+import banco
+from banco import BASE_DIR, bump_data_version, write_connection
+from compacto import CREATE_VIEW_SQL, FACTS_TABLE, LAYOUTS, PLACES_TABLE, build_compact_tables, is_compact
+from indices import create_compact_indexes, create_data_indexes, remove_duplicate_keys
+from jobs import NO_PROGRESS
+from leitura import CHUNK_SIZE, IMPORT_COLUMNS, iter_dataset_chunks
+
+# Caminho para o dataset CSV original (usado para atualização)
+CSV_PATH = os.path.join(BASE_DIR, 'data', 'dados_covid.csv') # Assumindo que o CSV está em 'data' dentro da pasta do backend
+UPDATE_MODES = ('completo', 'incremental')
+
+# Recargas completas são feitas em tabelas de staging ('<tabela>_novo'), trocadas pelas ativas só ao final
+STAGING_SUFFIX = '_novo'
+OLD_SUFFIX = '_antigo'
+# Chave natural de cada registro: um local em uma data
+KEY_COLUMNS = ['date', 'state', 'city']
+METRIC_COLUMNS = ['last_available_confirmed', 'last_available_deaths', 'new_confirmed', 'new_deaths']
+# Impressão digital do conteúdo de cada data, usada pela atualização incremental
+FINGERPRINT_TABLE = 'hash_datas'
+# Acima desta fração de linhas em datas revisadas, a recarga completa sai mais barata que a comparação
+INCREMENTAL_MAX_REVISED = 0.5
+# Séries diárias pré-agregadas usadas pelo /api/covid_data_for_plot, mantidas junto com 'dados_covid'
+STATE_ROLLUP_TABLE = 'resumo_estadual'
+NATIONAL_ROLLUP_TABLE = 'resumo_nacional'
+# Tabelas derivadas de 'dados_covid', recriadas e trocadas junto com ela
+DERIVED_TABLES = [FINGERPRINT_TABLE, STATE_ROLLUP_TABLE, NATIONAL_ROLLUP_TABLE]
+# Fases das operações de escrita e o peso aproximado de cada uma no tempo total (ver jobs.Progress),
+# medidos numa carga de 1,36 milhão de linhas
+IMPORT_PHASES = [('leitura', 50), ('indices', 45), ('resumos', 3), ('troca', 2)]
+COMPACT_IMPORT_PHASES = [('leitura', 50), ('resumos', 13), ('compactacao', 23), ('indices', 8), ('troca', 6)]
+UPSERT_PHASES = [('comparacao', 50), ('revisao', 38), ('gravacao', 12)]
+
+CREATE_TABLE_SQL = '''
+    CREATE TABLE {tabela} (
+        date TEXT,
+        state TEXT,
+        city TEXT,
+        last_available_confirmed INTEGER,
+        last_available_deaths INTEGER,
+        new_confirmed INTEGER,
+        new_deaths INTEGER
+    )
+'''
+
+CREATE_FINGERPRINT_TABLE_SQL = '''
+    CREATE TABLE {tabela} (
+        date TEXT PRIMARY KEY,
+        hash INTEGER NOT NULL,
+        registros INTEGER NOT NULL
+    )
+'''
+
+# 'registros' guarda quantas linhas de 'dados_covid' cada linha do resumo agrega
+CREATE_STATE_ROLLUP_SQL = '''
+    CREATE TABLE {tabela} (
+        state TEXT NOT NULL,
+        date TEXT NOT NULL,
+        last_available_confirmed INTEGER,
+        last_available_deaths INTEGER,
+        new_confirmed INTEGER,
+        new_deaths INTEGER,
+        registros INTEGER NOT NULL,
+        PRIMARY KEY (state, date)
+    ) WITHOUT ROWID
+'''
+
+CREATE_NATIONAL_ROLLUP_SQL = '''
+    CREATE TABLE {tabela} (
+        date TEXT PRIMARY KEY,
+        last_available_confirmed INTEGER,
+        last_available_deaths INTEGER,
+        new_confirmed INTEGER,
+        new_deaths INTEGER,
+        registros INTEGER NOT NULL
+    ) WITHOUT ROWID
+'''
+
+
+def records(df):
+    """Linhas de `df` como tuplas de tipos nativos do Python, no formato esperado pelo executemany."""
+    return zip(*(df[col].tolist() for col in df.columns))
+
+
+def row_hashes(df):
+    """Hash de 64 bits (como int64) do conteúdo de cada linha, calculado de forma vetorizada."""
+    texto = {col: object for col in KEY_COLUMNS}
+    hashes = pd.util.hash_pandas_object(df[IMPORT_COLUMNS].astype(texto), index=False)
+    return hashes.to_numpy().view('int64')
+
+
+def date_fingerprints(df):
+    """
+    Impressão digital de cada data presente em `df`: soma (módulo 2**64) dos hashes das linhas
+    e número de linhas. A soma não depende da ordem, então blocos podem ser combinados.
+    Retorna {date: (hash, registros)}.
+    """
+    agregado = (
+        pd.DataFrame({'date': df['date'].to_numpy(), 'hash': row_hashes(df)})
+        .groupby('date')['hash']
+        .agg(['sum', 'count'])
+    )
+    return {date: (int(h), int(n)) for date, h, n in agregado.itertuples(name=None)}
+
+
+def merge_fingerprints(acumulado, novo):
+    """Soma as impressões digitais de `novo` em `acumulado`, mantendo o hash em int64 com sinal."""
+    for date, (h, n) in novo.items():
+        h_ant, n_ant = acumulado.get(date, (0, 0))
+        soma = (h_ant + h) & 0xFFFFFFFFFFFFFFFF
+        acumulado[date] = (soma - (1 << 64) if soma >= (1 << 63) else soma, n_ant + n)
+    return acumulado
+
+
+def import_dataset_streaming(
+    conn, file_path, sufixo=STAGING_SUFFIX, chunksize=CHUNK_SIZE, progresso=NO_PROGRESS, workers=None
+):
+    """
+    Recria 'dados_covid<sufixo>' e 'hash_datas<sufixo>' a partir do arquivo, bloco a bloco.
+    Cada bloco é inserido com executemany; todo o carregamento ocorre em uma única transação,
+    de modo que uma falha no meio do arquivo não deixa a tabela pela metade.
+    Retorna o total de linhas inseridas.
+    """
+    tabela = 'dados_covid' + sufixo
+    tabela_hash = FINGERPRINT_TABLE + sufixo
+    insert_sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        tabela, ', '.join(IMPORT_COLUMNS), ', '.join('?' * len(IMPORT_COLUMNS))
+    )
+    total = 0
+    impressoes = {}
+    try:
+        conn.execute('BEGIN')
+        conn.execute(f'DROP TABLE IF EXISTS {tabela}')
+        conn.execute(f'DROP TABLE IF EXISTS {tabela_hash}')
+        conn.execute(CREATE_TABLE_SQL.format(tabela=tabela))
+        conn.execute(CREATE_FINGERPRINT_TABLE_SQL.format(tabela=tabela_hash))
+        progresso.phase('leitura')
+        for chunk in iter_dataset_chunks(file_path, chunksize, progresso, workers):
+            conn.executemany(insert_sql, records(chunk))
+            merge_fingerprints(impressoes, date_fingerprints(chunk))
+            total += len(chunk)
+        conn.executemany(
+            f'INSERT INTO {tabela_hash} (date, hash, registros) VALUES (?, ?, ?)',
+            ((date, h, n) for date, (h, n) in impressoes.items()),
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return total
+
+
+def _table_exists(conn, nome):
+    """Indica se a tabela `nome` existe no banco."""
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (nome,)
+    ).fetchone() is not None
+
+
+def swap_staging_tables(conn, tabelas, compacto=False):
+    """
+    Troca cada tabela de staging ('<tabela>_novo') pela respectiva tabela ativa em uma única
+    transação curta (apenas renomeações), de modo que os leitores veem ou os dados antigos
+    ou os novos, nunca uma tabela vazia. As tabelas do outro layout de armazenamento saem
+    na mesma transação, e a visão 'dados_covid' é recriada quando o novo layout é o compacto.
+    As tabelas antigas são descartadas depois, fora da transação da troca.
+    """
+    obsoletas = ['dados_covid'] if compacto else [PLACES_TABLE, FACTS_TABLE]
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        # A visão referencia as tabelas pelo nome e seria reescrita pelas renomeações
+        if is_compact(conn):
+            conn.execute('DROP VIEW dados_covid')
+        for tabela in tabelas + obsoletas:
+            antiga, nova = tabela + OLD_SUFFIX, tabela + STAGING_SUFFIX
+            conn.execute(f'DROP TABLE IF EXISTS {antiga}')
+            if _table_exists(conn, tabela):
+                conn.execute(f'ALTER TABLE {tabela} RENAME TO {antiga}')
+            # O RENAME não atualiza sqlite_stat1: move as estatísticas do ANALYZE junto com a tabela,
+            # inclusive as dos índices automáticos e da chave primária WITHOUT ROWID, cujos nomes
+            # derivam do nome da tabela
+            conn.execute('DELETE FROM sqlite_stat1 WHERE tbl = ?', (tabela,))
+            if tabela in tabelas:
+                conn.execute(f'ALTER TABLE {nova} RENAME TO {tabela}')
+                conn.execute(
+                    """
+                    UPDATE sqlite_stat1 SET tbl = :tabela, idx = CASE
+                        WHEN idx = :nova OR idx LIKE 'sqlite_autoindex_%' THEN replace(idx, :nova, :tabela)
+                        ELSE idx END
+                    WHERE tbl = :nova
+                    """,
+                    {'tabela': tabela, 'nova': nova},
+                )
+        if compacto:
+            conn.execute(CREATE_VIEW_SQL)
+        bump_data_version(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    for tabela in tabelas + obsoletas:
+        conn.execute(f'DROP TABLE IF EXISTS {tabela + OLD_SUFFIX}')
+    conn.commit()
+
+
+def _rollup_select(origem, grupo, filtro=''):
+    """SELECT que agrega as métricas de `origem` por `grupo` (ex.: 'state, date')."""
+    somas = ', '.join(f'SUM({col})' for col in METRIC_COLUMNS)
+    contagem = 'COUNT(*)' if origem.startswith('dados_covid') else 'SUM(registros)'
+    return f'SELECT {grupo}, {somas}, {contagem} FROM {origem} {filtro} GROUP BY {grupo}'
+
+
+def build_rollups(conn, sufixo=STAGING_SUFFIX):
+    """
+    Cria as tabelas de resumo estadual (state, date) e nacional (date) a partir de
+    'dados_covid<sufixo>'. O resumo nacional é derivado do estadual, bem menor.
+    """
+    estadual, nacional = STATE_ROLLUP_TABLE + sufixo, NATIONAL_ROLLUP_TABLE + sufixo
+    colunas = ', '.join(METRIC_COLUMNS)
+    conn.execute(f'DROP TABLE IF EXISTS {estadual}')
+    conn.execute(f'DROP TABLE IF EXISTS {nacional}')
+    conn.execute(CREATE_STATE_ROLLUP_SQL.format(tabela=estadual))
+    conn.execute(CREATE_NATIONAL_ROLLUP_SQL.format(tabela=nacional))
+    conn.execute(
+        f'INSERT INTO {estadual} (state, date, {colunas}, registros) '
+        + _rollup_select('dados_covid' + sufixo, 'state, date')
+    )
+    conn.execute(
+        f'INSERT INTO {nacional} (date, {colunas}, registros) ' + _rollup_select(estadual, 'date')
+    )
+    conn.commit()
+
+
+def refresh_rollups(conn):
+    """
+    Recalcula, nos resumos ativos, apenas os pares (state, date) presentes em '_alteradas' ou
+    '_removidas' (as tabelas temporárias da atualização incremental); os pares que ficaram sem
+    registros saem dos resumos. Deve rodar dentro da transação do upsert.
+    """
+    colunas = ', '.join(METRIC_COLUMNS)
+    pares = 'SELECT state, date FROM _alteradas UNION SELECT state, date FROM _removidas'
+    datas = 'SELECT date FROM _alteradas UNION SELECT date FROM _removidas'
+    conn.execute(f'DELETE FROM {STATE_ROLLUP_TABLE} WHERE (state, date) IN ({pares})')
+    conn.execute(f'''
+        INSERT INTO {STATE_ROLLUP_TABLE} (state, date, {colunas}, registros)
+        SELECT d.state, d.date, {', '.join(f'SUM(d.{col})' for col in METRIC_COLUMNS)}, COUNT(*)
+        FROM ({pares}) a
+        JOIN dados_covid d ON d.date = a.date AND d.state = a.state
+        GROUP BY d.state, d.date
+    ''')
+    conn.execute(f'DELETE FROM {NATIONAL_ROLLUP_TABLE} WHERE date IN ({datas})')
+    conn.execute(
+        f'INSERT INTO {NATIONAL_ROLLUP_TABLE} (date, {colunas}, registros) '
+        + _rollup_select(STATE_ROLLUP_TABLE, 'date', f'WHERE date IN ({datas})')
+    )
+
+
+def reload_dataset(file_path, chunksize=CHUNK_SIZE, layout=None, progresso=NO_PROGRESS, workers=None):
+    """
+    Recarrega 'dados_covid' a partir do arquivo sem expor aos leitores uma tabela vazia
+    ou parcialmente carregada: os dados vão para a tabela de staging, são indexados,
+    analisados e resumidos, e só então substituem a tabela ativa (junto com os resumos). Se qualquer etapa falhar,
+    os dados anteriores permanecem no lugar.
+    `layout` ('padrao' ou 'compacto', ver compacto.py) escolhe o armazenamento; sem ele,
+    mantém o layout da base atual. `workers` é repassado a iter_dataset_chunks.
+    Retorna (total_de_linhas, segundos).
+    """
+    inicio = time.perf_counter()
+    with write_connection() as conn:
+        compacto = is_compact(conn) if layout is None else layout == 'compacto'
+        progresso.plan(COMPACT_IMPORT_PHASES if compacto else IMPORT_PHASES)
+        total = import_dataset_streaming(conn, file_path, STAGING_SUFFIX, chunksize, progresso, workers)
+        if compacto:
+            # Os resumos saem da tabela de staging no layout padrão, antes da conversão. As chaves
+            # repetidas são descartadas antes (mantendo a última, como a conversão e o índice único
+            # do layout padrão), para que não sejam somadas duas vezes nos resumos.
+            progresso.phase('resumos')
+            remove_duplicate_keys(conn, 'dados_covid' + STAGING_SUFFIX, ', '.join(KEY_COLUMNS))
+            build_rollups(conn, STAGING_SUFFIX)
+            progresso.phase('compactacao')
+            build_compact_tables(conn, 'dados_covid' + STAGING_SUFFIX, STAGING_SUFFIX)
+            progresso.phase('indices')
+            create_compact_indexes(conn, STAGING_SUFFIX)
+            progresso.phase('troca')
+            swap_staging_tables(conn, [PLACES_TABLE, FACTS_TABLE] + DERIVED_TABLES, compacto=True)
+        else:
+            progresso.phase('indices')
+            create_data_indexes(conn, 'dados_covid' + STAGING_SUFFIX)
+            progresso.phase('resumos')
+            build_rollups(conn, STAGING_SUFFIX)
+            progresso.phase('troca')
+            swap_staging_tables(conn, ['dados_covid'] + DERIVED_TABLES)
+    return total, time.perf_counter() - inicio
+
+
+def supports_incremental(conn):
+    """
+    Indica se a base permite atualização incremental: 'dados_covid' com índice único em
+    (date, state, city), a tabela de impressões digitais por data e os resumos. No layout
+    compacto 'dados_covid' é uma visão, sem índices, e as atualizações são recargas completas.
+    """
+    if not all(_table_exists(conn, tabela) for tabela in DERIVED_TABLES):
+        return False
+    for indice in conn.execute("PRAGMA index_list('dados_covid')").fetchall():
+        if indice[2]:  # coluna 'unique'
+            colunas = [col[2] for col in conn.execute(f"PRAGMA index_info('{indice[1]}')").fetchall()]
+            if colunas == KEY_COLUMNS:
+                return True
+    return False
+
+
+def _refresh_fingerprints(conn, datas):
+    """Recalcula, a partir do conteúdo gravado, as impressões digitais das `datas` informadas."""
+    datas = sorted(datas)
+    for inicio in range(0, len(datas), 500):
+        lote = datas[inicio:inicio + 500]
+        marcadores = ', '.join('?' * len(lote))
+        df = pd.read_sql_query(
+            f"SELECT {', '.join(IMPORT_COLUMNS)} FROM dados_covid WHERE date IN ({marcadores})", conn, params=lote
+        )
+        impressoes = date_fingerprints(df) if len(df) else {}
+        conn.execute(f'DELETE FROM {FINGERPRINT_TABLE} WHERE date IN ({marcadores})', lote)
+        conn.executemany(
+            f'INSERT INTO {FINGERPRINT_TABLE} (date, hash, registros) VALUES (?, ?, ?)',
+            ((date, h, n) for date, (h, n) in impressoes.items()),
+        )
+
+
+def upsert_dataset(conn, file_path, chunksize=CHUNK_SIZE, progresso=NO_PROGRESS, workers=None, dry_run=False):
+    """
+    Aplica o arquivo de forma incremental sobre 'dados_covid', usando (date, state, city) como chave.
+
+    1. Linhas com data posterior à maior data já gravada (high-water mark) são novas por definição.
+    2. Para as demais, compara a impressão digital de cada data (soma dos hashes das linhas)
+       com a registrada em 'hash_datas'; só as datas divergentes são comparadas linha a linha.
+    3. Apenas as linhas novas ou alteradas são gravadas, com INSERT ... ON CONFLICT DO UPDATE.
+       Numa data revisada, o arquivo passa a ser a referência: as linhas gravadas que não
+       aparecem mais nele são apagadas. Datas ausentes do arquivo não são tocadas.
+    4. Só os pares (state, date) afetados são recalculados nos resumos.
+
+    Chaves repetidas no arquivo contam uma vez só e mantêm a última ocorrência alterada.
+    A segunda leitura do arquivo só acontece se alguma data antiga tiver sido revisada.
+    Tudo ocorre em uma única transação.
+    Retorna um dicionário com as contagens 'inserted', 'updated', 'deleted' e 'unchanged', ou
+    None (sem alterar a base) se as revisões forem tantas que a recarga completa compensa mais.
+    Com `dry_run`, as contagens são calculadas e a transação é desfeita antes da gravação.
+    """
+    colunas = ', '.join(IMPORT_COLUMNS)
+    chaves = ', '.join(KEY_COLUMNS)
+    placeholders = ', '.join('?' * len(IMPORT_COLUMNS))
+    chave = ' AND '.join(f'd.{col} = e.{col}' for col in KEY_COLUMNS)
+    metricas_d = ', '.join(f'd.{col}' for col in METRIC_COLUMNS)
+    metricas_e = ', '.join(f'e.{col}' for col in METRIC_COLUMNS)
+
+    high_water_mark = conn.execute('SELECT MAX(date) FROM dados_covid').fetchone()[0] or ''
+    gravadas = {
+        date: (h, n) for date, h, n in conn.execute(f'SELECT date, hash, registros FROM {FINGERPRINT_TABLE}')
+    }
+    total = 0
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute(f'CREATE TEMP TABLE IF NOT EXISTS _entrada AS SELECT {colunas} FROM dados_covid WHERE 0')
+        conn.execute(
+            f'CREATE TEMP TABLE IF NOT EXISTS _alteradas AS SELECT {colunas}, 0 AS novo FROM dados_covid WHERE 0'
+        )
+        # Chaves das linhas do arquivo nas datas revisadas, acumuladas entre os blocos da segunda leitura
+        conn.execute(
+            'CREATE TEMP TABLE IF NOT EXISTS _chaves '
+            '(date TEXT, state TEXT, city TEXT, PRIMARY KEY (date, state, city)) WITHOUT ROWID'
+        )
+        conn.execute(f'CREATE TEMP TABLE IF NOT EXISTS _removidas AS SELECT {chaves} FROM dados_covid WHERE 0')
+        for temporaria in ('_alteradas', '_chaves', '_removidas'):
+            conn.execute(f'DELETE FROM {temporaria}')
+
+        # Primeira leitura: grava as linhas recentes e acumula as impressões digitais das antigas
+        progresso.plan(UPSERT_PHASES)
+        progresso.phase('comparacao')
+        impressoes = {}
+        for chunk in iter_dataset_chunks(file_path, chunksize, progresso, workers):
+            total += len(chunk)
+            recentes = chunk['date'] > high_water_mark
+            conn.executemany(
+                f'INSERT INTO _alteradas ({colunas}, novo) VALUES ({placeholders}, 1)',
+                records(chunk[recentes]),
+            )
+            merge_fingerprints(impressoes, date_fingerprints(chunk[~recentes]))
+
+        revisadas = {date for date, impressao in impressoes.items() if gravadas.get(date) != impressao}
+        if sum(impressoes[date][1] for date in revisadas) > total * INCREMENTAL_MAX_REVISED:
+            conn.rollback()
+            return None
+
+        # Segunda leitura, só das datas revisadas: compara linha a linha com o registro existente
+        progresso.phase('revisao')
+        if revisadas:
+            for chunk in iter_dataset_chunks(file_path, chunksize, progresso, workers):
+                conn.execute('DELETE FROM _entrada')
+                conn.executemany(
+                    f'INSERT INTO _entrada ({colunas}) VALUES ({placeholders})',
+                    records(chunk[chunk['date'].isin(revisadas)]),
+                )
+                conn.execute(f'''
+                    INSERT INTO _alteradas ({colunas}, novo)
+                    SELECT {', '.join(f'e.{col}' for col in IMPORT_COLUMNS)}, d.rowid IS NULL
+                    FROM _entrada e LEFT JOIN dados_covid d ON {chave}
+                    WHERE d.rowid IS NULL OR ({metricas_d}) IS NOT ({metricas_e})
+                ''')
+                conn.execute(f'INSERT OR IGNORE INTO _chaves SELECT {chaves} FROM _entrada')
+            # Linhas gravadas nas datas revisadas que não estão mais no arquivo
+            conn.execute(f'''
+                INSERT INTO _removidas
+                SELECT {', '.join(f'd.{col}' for col in KEY_COLUMNS)} FROM dados_covid d
+                WHERE d.date IN (SELECT DISTINCT date FROM _chaves)
+                  AND NOT EXISTS (SELECT 1 FROM _chaves e WHERE {chave})
+            ''')
+
+        progresso.phase('gravacao')
+        # Chaves repetidas no arquivo: só a última ocorrência é gravada e contada
+        remove_duplicate_keys(conn, '_alteradas', chaves)
+        inserted, updated = conn.execute(
+            'SELECT COALESCE(SUM(novo), 0), COALESCE(SUM(1 - novo), 0) FROM _alteradas'
+        ).fetchone()
+        deleted = conn.execute('SELECT COUNT(*) FROM _removidas').fetchone()[0]
+        # Chaves distintas do arquivo: as das datas intactas (a impressão digital bate com a da
+        # base, que não tem chaves repetidas), as das datas revisadas e as posteriores ao high-water mark
+        distintas = (
+            sum(n for date, (_, n) in impressoes.items() if date not in revisadas)
+            + conn.execute('SELECT COUNT(*) FROM _chaves').fetchone()[0]
+            + conn.execute('SELECT COUNT(*) FROM _alteradas WHERE date > ?', (high_water_mark,)).fetchone()[0]
+        )
+        contagens = {
+            'inserted': inserted, 'updated': updated, 'deleted': deleted,
+            'unchanged': distintas - inserted - updated,
+        }
+        if dry_run:
+            conn.rollback()
+            return contagens
+        conn.execute(f'''
+            INSERT INTO dados_covid ({colunas})
+            SELECT {colunas} FROM _alteradas WHERE 1
+            ON CONFLICT({chaves}) DO UPDATE SET
+                {', '.join(f'{col} = excluded.{col}' for col in METRIC_COLUMNS)}
+        ''')
+        conn.execute(
+            f'DELETE FROM dados_covid WHERE ({chaves}) IN (SELECT {chaves} FROM _removidas)'
+        )
+        alteradas = [
+            row[0] for row in conn.execute('SELECT date FROM _alteradas UNION SELECT date FROM _removidas')
+        ]
+        _refresh_fingerprints(conn, alteradas)
+        refresh_rollups(conn)
+        if alteradas:
+            bump_data_version(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return contagens
+
+
+def preview_dataset(file_path, chunksize=CHUNK_SIZE, progresso=NO_PROGRESS, workers=None):
+    """
+    Lê e trata o arquivo inteiro sem gravar nada (simulação da recarga completa).
+    Retorna {'rows', 'dates', 'first_date', 'last_date'}.
+    """
+    progresso.plan([('leitura', 1)])
+    progresso.phase('leitura')
+    total, datas = 0, set()
+    for chunk in iter_dataset_chunks(file_path, chunksize, progresso, workers):
+        total += len(chunk)
+        datas.update(chunk['date'].unique())
+    return {
+        'rows': total,
+        'dates': len(datas),
+        'first_date': min(datas, default=None),
+        'last_date': max(datas, default=None),
+    }
+
+
+def update_dataset(
+    file_path, modo='incremental', layout=None, chunksize=CHUNK_SIZE, progresso=NO_PROGRESS, workers=None,
+    dry_run=False,
+):
+    """
+    Atualiza a base a partir do arquivo: de forma incremental (upsert_dataset) quando `modo`
+    é 'incremental', a base permite e as revisões não são muitas; senão, por recarga completa
+    (reload_dataset, no `layout` informado ou no atual).
+    Com `dry_run`, nada é gravado: o modo incremental só conta as linhas que mudariam e a
+    recarga completa só lê o arquivo (preview_dataset).
+    Retorna um dicionário com 'modo' ('incremental' ou 'completo'), 'seconds' e as contagens
+    do upsert ou o total de linhas ('rows') da recarga.
+    """
+    inicio = time.perf_counter()
+    contagens = None
+    if modo == 'incremental' and layout != 'compacto':
+        with write_connection() as conn:
+            # Bases sem a chave única (ex.: criadas por versões anteriores) precisam de uma recarga completa
+            if supports_incremental(conn):
+                contagens = upsert_dataset(conn, file_path, chunksize, progresso, workers, dry_run)
+    if contagens is not None:
+        return {'modo': 'incremental', 'seconds': round(time.perf_counter() - inicio, 3), **contagens}
+
+    if dry_run:
+        resumo = preview_dataset(file_path, chunksize, progresso, workers)
+        return {'modo': 'completo', 'seconds': round(time.perf_counter() - inicio, 3), **resumo}
+    # Recarga via tabela de staging: as consultas continuam vendo os dados atuais até a troca
+    total, segundos = reload_dataset(file_path, chunksize, layout, progresso, workers)
+    return {'modo': 'completo', 'seconds': round(segundos, 3), 'rows': total}
+
+
+def clear_database(progresso=NO_PROGRESS):
+    """Apaga os registros e os resumos, mantendo as tabelas e os índices."""
+    progresso.plan([('limpeza', 1)])
+    progresso.phase('limpeza')
+    with write_connection() as conn:
+        cursor = conn.cursor()
+        if is_compact(conn):
+            cursor.execute(f'DELETE FROM {FACTS_TABLE}')
+            cursor.execute(f'DELETE FROM {PLACES_TABLE}')
+        else:
+            cursor.execute('DELETE FROM dados_covid')
+        for tabela in DERIVED_TABLES:
+            if _table_exists(conn, tabela):
+                cursor.execute(f'DELETE FROM {tabela}')
+        bump_data_version(conn)
+        conn.commit()
+
+
+class StageTimings:
+    """
+    Progresso (mesma interface de jobs.Progress) que mede o tempo e as linhas de cada etapa,
+    para o relatório da linha de comando.
+    """
+
+    def __init__(self):
+        self.etapas = []  # [nome, segundos, linhas]
+        self._inicio = None
+
+    def plan(self, fases):
+        pass
+
+    def phase(self, nome):
+        self._close()
+        self.etapas.append([nome, 0.0, 0])
+        self._inicio = time.perf_counter()
+
+    def advance(self, linhas=0, fracao=None):
+        if self.etapas:
+            self.etapas[-1][2] += linhas
+
+    def _close(self):
+        if self.etapas:
+            self.etapas[-1][1] = time.perf_counter() - self._inicio
+
+    def report(self, total):
+        """Tabela com segundos, linhas e linhas/s de cada etapa e o tempo `total`."""
+        self._close()
+        linhas = [f"{'etapa':<14}{'segundos':>10}{'linhas':>12}{'linhas/s':>12}"]
+        for nome, segundos, n in self.etapas:
+            vazao = f'{n / segundos:,.0f}' if n and segundos > 0 else '-'
+            linhas.append(f"{nome:<14}{segundos:>10.2f}{(f'{n:,}' if n else '-'):>12}{vazao:>12}")
+        linhas.append(f"{'total':<14}{total:>10.2f}")
+        return '\n'.join(linhas)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Carrega o dataset da COVID-19 (caso_full) na base do ALERTA-19.')
+    parser.add_argument('arquivo', nargs='?', default=CSV_PATH, help='CSV ou CSV.GZ de origem (padrão: %(default)s)')
+    parser.add_argument('--db', default=banco.DB_PATH, help='base SQLite de destino (padrão: %(default)s)')
+    parser.add_argument(
+        '--modo', choices=UPDATE_MODES, default='incremental',
+        help='incremental grava só as linhas novas ou alteradas, quando a base permite (padrão: %(default)s)',
+    )
+    parser.add_argument('--layout', choices=LAYOUTS, help='layout de armazenamento (padrão: o da base atual)')
+    parser.add_argument(
+        '--workers', type=int, default=None,
+        help='processos na leitura do arquivo; 1 lê em blocos num único processo (padrão: número de núcleos)',
+    )
+    parser.add_argument('--chunksize', type=int, default=CHUNK_SIZE, help='linhas por bloco na leitura sem paralelismo')
+    parser.add_argument('--dry-run', action='store_true', help='lê e compara o arquivo com a base sem gravar nada')
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.arquivo):
+        parser.error(f'Arquivo não encontrado: {args.arquivo}')
+    if args.workers is not None and args.workers < 1:
+        parser.error('--workers deve ser um inteiro maior ou igual a 1.')
+    if args.chunksize < 1:
+        parser.error('--chunksize deve ser um inteiro maior ou igual a 1.')
+
+    banco.DB_PATH = os.path.abspath(args.db)
+    etapas = StageTimings()
+    inicio = time.perf_counter()
+    try:
+        resultado = update_dataset(
+            args.arquivo, args.modo, args.layout, args.chunksize, etapas, args.workers, args.dry_run
+        )
+    except (ValueError, pd.errors.ParserError) as e:
+        print(f'Erro: {e}', file=sys.stderr)
+        return 1
+
+    print(etapas.report(time.perf_counter() - inicio))
+    prefixo = 'Simulação' if args.dry_run else 'Concluído'
+    if resultado['modo'] == 'incremental':
+        print(
+            f"{prefixo} (incremental): {resultado['inserted']} inseridos, {resultado['updated']} alterados, "
+            f"{resultado['deleted']} removidos, {resultado['unchanged']} inalterados."
+        )
+    elif args.dry_run:
+        print(
+            f"{prefixo} (recarga completa): {resultado['rows']} registros, {resultado['dates']} datas "
+            f"({resultado['first_date']} a {resultado['last_date']})."
+        )
+    else:
+        print(f"{prefixo} (recarga completa): {resultado['rows']} registros em {banco.DB_PATH}.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
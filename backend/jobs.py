@@ -0,0 +1,260 @@
+"""
+Execução em segundo plano das operações de escrita do ALERTA-19 (importação, atualização
+e limpeza da base).
+
+Os endpoints de gerenciamento apenas registram um job e respondem com o seu id; o trabalho
+roda num processo separado (um único processo de trabalho, de modo que continua havendo
+um só escritor na base) e não ocupa as threads do servidor. O estado de cada job fica numa
+base SQLite própria (jobs.db), gravada pelo processo de trabalho e lida pelo servidor em
+/api/jobs/<id>: fase atual, linhas processadas, vazão e tempo restante estimado.
+
+O progresso é informado pelas próprias operações por meio de um objeto Progress: cada
+operação declara o seu plano de fases, com o peso aproximado de cada uma no tempo total,
+e avança a fração concluída da fase corrente (na leitura do arquivo, a fração de bytes lidos).
+"""
+import importlib
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import banco
+
+JOBS_DB_PATH = os.path.join(banco.BASE_DIR, 'jobs.db')
+# Estados de um job
+QUEUED, RUNNING, DONE, FAILED = 'na_fila', 'executando', 'concluido', 'erro'
+# Intervalo mínimo entre duas gravações de progresso do mesmo job (segundos)
+PROGRESS_INTERVAL = 0.5
+# Jobs concluídos mantidos na base; os mais antigos são apagados a cada novo job
+MAX_FINISHED_JOBS = 200
+
+CREATE_JOBS_SQL = '''
+    CREATE TABLE IF NOT EXISTS jobs (
+        id TEXT PRIMARY KEY,
+        tipo TEXT NOT NULL,
+        status TEXT NOT NULL,
+        fase TEXT,
+        linhas INTEGER NOT NULL DEFAULT 0,
+        progresso REAL NOT NULL DEFAULT 0,
+        criado REAL NOT NULL,
+        iniciado REAL,
+        atualizado REAL,
+        concluido REAL,
+        resultado TEXT,
+        erro TEXT
+    )
+'''
+
+
+def _connect(caminho):
+    conn = sqlite3.connect(caminho, timeout=banco.BUSY_TIMEOUT)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute(CREATE_JOBS_SQL)
+    return conn
+
+
+@contextmanager
+def _jobs_connection(caminho):
+    """Conexão curta com jobs.db: confirma a transação ao final e fecha a conexão."""
+    conn = _connect(caminho)
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+class Progress:
+    """
+    Progresso de um job, gravado em jobs.db no máximo a cada PROGRESS_INTERVAL segundos
+    (mudanças de fase são gravadas na hora).
+    """
+
+    def __init__(self, caminho, job_id):
+        self._conn = _connect(caminho)
+        self._job_id = job_id
+        self._pesos = {}
+        self._fase = None
+        self._fracao = 0.0
+        self._linhas = 0
+        self._gravado = 0.0
+
+    def plan(self, fases):
+        """Declara as fases da operação como [(nome, peso)]; os pesos são normalizados."""
+        total = sum(peso for _, peso in fases) or 1
+        self._pesos = {nome: peso / total for nome, peso in fases}
+
+    def phase(self, nome):
+        """Inicia a fase `nome`; as anteriores contam como concluídas."""
+        self._fase, self._fracao = nome, 0.0
+        self._save(forcar=True)
+
+    def advance(self, linhas=0, fracao=None):
+        """Soma `linhas` processadas e, se informada, atualiza a fração concluída da fase."""
+        self._linhas += linhas
+        if fracao is not None:
+            self._fracao = min(max(fracao, 0.0), 1.0)
+        self._save()
+
+    def overall(self):
+        """Fração estimada do job inteiro, pelos pesos das fases do plano."""
+        concluido = 0.0
+        for nome, peso in self._pesos.items():
+            if nome == self._fase:
+                return min(concluido + peso * self._fracao, 1.0)
+            concluido += peso
+        return 0.0
+
+    def _save(self, forcar=False):
+        agora = time.time()
+        if not forcar and agora - self._gravado < PROGRESS_INTERVAL:
+            return
+        self._gravado = agora
+        with self._conn:
+            self._conn.execute(
+                'UPDATE jobs SET fase = ?, linhas = ?, progresso = ?, atualizado = ? WHERE id = ?',
+                (self._fase, self._linhas, self.overall(), agora, self._job_id),
+            )
+
+    def close(self):
+        self._conn.close()
+
+
+class _NoProgress:
+    """Progresso descartado: usado quando as operações rodam fora de um job (ex.: scripts)."""
+
+    def plan(self, fases):
+        pass
+
+    def phase(self, nome):
+        pass
+
+    def advance(self, linhas=0, fracao=None):
+        pass
+
+
+NO_PROGRESS = _NoProgress()
+
+
+def _run_job(caminho, job_id, tarefa, kwargs, db_path):
+    """
+    Ponto de entrada no processo de trabalho: executa `tarefa` ('modulo.funcao'), que recebe
+    `progresso` além de `kwargs` e retorna um dicionário JSON com o resultado.
+    """
+    banco.DB_PATH = db_path
+    progresso = Progress(caminho, job_id)
+    conn = progresso._conn
+    with conn:
+        conn.execute(
+            'UPDATE jobs SET status = ?, iniciado = ?, atualizado = ? WHERE id = ?',
+            (RUNNING, time.time(), time.time(), job_id),
+        )
+    try:
+        modulo, nome = tarefa.rsplit('.', 1)
+        resultado = getattr(importlib.import_module(modulo), nome)(progresso=progresso, **kwargs)
+        status, resultado, erro = DONE, json.dumps(resultado), None
+    except Exception as e:
+        status, resultado, erro = FAILED, None, str(e)
+    agora = time.time()
+    with conn:
+        conn.execute(
+            '''UPDATE jobs SET status = ?, resultado = ?, erro = ?, concluido = ?, atualizado = ?,
+               progresso = CASE WHEN ? = ? THEN 1 ELSE progresso END WHERE id = ?''',
+            (status, resultado, erro, agora, agora, status, DONE, job_id),
+        )
+    progresso.close()
+
+
+class JobManager:
+    """Registra jobs em jobs.db e os executa, em ordem, num processo de trabalho."""
+
+    def __init__(self, caminho=JOBS_DB_PATH):
+        self.caminho = caminho
+        self._executor = None
+        self._recuperado = False
+        self._lock = threading.Lock()
+
+    def _recover(self):
+        """
+        Na primeira consulta ou submissão deste servidor, marca como falhos os jobs que
+        ficaram pela metade quando o servidor anterior parou (não vão mais terminar).
+        Não roda no construtor porque o processo de trabalho também importa o app.
+        """
+        with self._lock:
+            if self._recuperado:
+                return
+            self._recuperado = True
+            with _jobs_connection(self.caminho) as conn:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, erro = 'Interrompido pelo reinício do servidor.' WHERE status IN (?, ?)",
+                    (FAILED, QUEUED, RUNNING),
+                )
+
+    def _get_executor(self):
+        if self._executor is None:
+            # 'spawn': o processo de trabalho não herda threads nem conexões abertas do servidor
+            self._executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+        return self._executor
+
+    def submit(self, tipo, tarefa, **kwargs):
+        """Registra um job do `tipo` informado que executa `tarefa` ('modulo.funcao'); retorna o id."""
+        self._recover()
+        job_id = uuid.uuid4().hex
+        with _jobs_connection(self.caminho) as conn:
+            conn.execute(
+                'INSERT INTO jobs (id, tipo, status, criado) VALUES (?, ?, ?, ?)', (job_id, tipo, QUEUED, time.time())
+            )
+            conn.execute(
+                'DELETE FROM jobs WHERE status IN (?, ?) AND id NOT IN '
+                '(SELECT id FROM jobs WHERE status IN (?, ?) ORDER BY criado DESC LIMIT ?)',
+                (DONE, FAILED, DONE, FAILED, MAX_FINISHED_JOBS),
+            )
+        with self._lock:
+            futuro = self._get_executor().submit(_run_job, self.caminho, job_id, tarefa, kwargs, banco.DB_PATH)
+        futuro.add_done_callback(lambda f: self._check_crash(f, job_id))
+        return job_id
+
+    def _check_crash(self, futuro, job_id):
+        """Se o processo de trabalho morreu, marca o job como falho e recria o executor no próximo job."""
+        erro = futuro.exception()
+        if erro is None:
+            return
+        with self._lock:
+            self._executor = None
+        with _jobs_connection(self.caminho) as conn:
+            conn.execute(
+                'UPDATE jobs SET status = ?, erro = ?, concluido = ? WHERE id = ? AND status IN (?, ?)',
+                (FAILED, f'Processo de trabalho encerrado: {erro}', time.time(), job_id, QUEUED, RUNNING),
+            )
+
+    def get(self, job_id):
+        """Estado do job como dicionário (com vazão e tempo restante estimados), ou None."""
+        self._recover()
+        with _jobs_connection(self.caminho) as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        fim = row['concluido'] or time.time()
+        decorrido = fim - row['iniciado'] if row['iniciado'] else 0.0
+        eta = None
+        if row['status'] == RUNNING and 0 < row['progresso'] < 1:
+            eta = round(decorrido * (1 - row['progresso']) / row['progresso'], 1)
+        return {
+            'id': row['id'],
+            'tipo': row['tipo'],
+            'status': row['status'],
+            'fase': row['fase'],
+            'linhas': row['linhas'],
+            'progresso': round(row['progresso'], 4),
+            'linhas_por_segundo': round(row['linhas'] / decorrido, 1) if decorrido > 0 else None,
+            'segundos': round(decorrido, 1),
+            'eta_segundos': eta,
+            'resultado': json.loads(row['resultado']) if row['resultado'] else None,
+            'erro': row['erro'],
+        }
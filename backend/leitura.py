@@ -0,0 +1,214 @@
+"""
+Leitura e tratamento do dataset (caso_full.csv / .csv.gz) para a importação no ALERTA-19.
+
+O arquivo é sempre consumido em blocos, com memória limitada. Em máquinas com vários
+núcleos, a interpretação do CSV e o tratamento dos tipos (process_dataframe_for_db), que
+dominam o tempo da leitura, rodam em paralelo num pool de processos:
+
+- o processo principal lê o conteúdo descomprimido em blocos de PARSE_BLOCK_BYTES bytes,
+  cortados na última quebra de linha (o dataset não tem quebras de linha dentro de campos);
+- cada bloco é interpretado e tratado por um processo do pool;
+- os blocos tratados voltam ao processo principal na ordem do arquivo, e só ele grava na
+  base, de modo que continua havendo um único escritor.
+
+O número de blocos em andamento é limitado a 2 por processo, o que mantém a memória
+limitada mesmo quando a gravação é mais lenta que a leitura.
+"""
+import gzip
+import io
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from jobs import NO_PROGRESS
+
+# Colunas do caso_full.csv.gz efetivamente usadas pela API; as demais são descartadas na leitura
+IMPORT_COLUMNS = ['date', 'state', 'city', 'last_available_confirmed', 'last_available_deaths', 'new_confirmed', 'new_deaths']
+# Tipos explícitos evitam a inferência do pandas (e colunas 'object' desnecessárias).
+# As métricas são lidas como float para aceitar valores ausentes antes do fillna.
+IMPORT_DTYPES = {
+    'date': str,
+    'state': str,
+    'city': str,
+    'last_available_confirmed': 'float64',
+    'last_available_deaths': 'float64',
+    'new_confirmed': 'float64',
+    'new_deaths': 'float64',
+}
+# Número de linhas lidas por bloco na importação: define o pico de memória, não o tamanho do arquivo
+CHUNK_SIZE = 100_000
+# Processos usados na leitura paralela (1 desliga o pool) e tamanho, em bytes descomprimidos,
+# de cada bloco entregue a eles
+PARSE_WORKERS = os.cpu_count() or 1
+PARSE_BLOCK_BYTES = 8 * 1024 * 1024
+# Blocos em andamento por processo do pool
+BLOCKS_PER_WORKER = 2
+# Data gravada quando o valor do arquivo está ausente ou não é uma data válida
+INVALID_DATE = '1970-01-01'
+# Datas já no formato da base (AAAA-MM-DD), que dispensam conversão
+ISO_DATE_PATTERN = r'\d{4}-\d{2}-\d{2}'
+# Limite de valores distintos guardados pelo cache de datas normalizadas (por processo)
+DATE_CACHE_SIZE = 100_000
+
+# Valor de data do arquivo -> data normalizada; o dataset tem só cerca de mil datas distintas
+_date_cache = {}
+
+
+def process_dataframe_for_db(df):
+    """
+    Processa o DataFrame do pandas para garantir a compatibilidade com o SQLite.
+    Aplica as mesmas lógicas de tratamento de nulos e tipos do criar_db.py.
+    """
+    for col in ['state', 'city']:
+        if col in df.columns:
+            df[col] = df[col].fillna('Desconhecido')
+
+    for col in ['last_available_confirmed', 'last_available_deaths', 'new_confirmed', 'new_deaths']:
+        if col in df.columns:
+            df[col] = df[col].fillna(0).astype(int)
+
+    if 'date' in df.columns:
+        df['date'] = normalize_dates(df['date'])
+    return df
+
+
+def _convert_dates(valores):
+    """
+    Normaliza valores distintos de data para AAAA-MM-DD. Os que já estão nesse formato só
+    são validados (e mantidos); apenas os demais passam pela interpretação do pd.to_datetime,
+    com o formato inferido valor a valor (format='mixed'), não a partir do primeiro deles.
+    """
+    valores = pd.Series(valores, dtype=object)
+    iso = valores.str.fullmatch(ISO_DATE_PATTERN).fillna(False).astype(bool)
+    validas = pd.to_datetime(valores.where(iso), format='%Y-%m-%d', errors='coerce').notna()
+    normalizadas = valores.where(validas, INVALID_DATE)
+    outras = ~iso
+    if outras.any():
+        convertidas = pd.to_datetime(valores[outras], format='mixed', errors='coerce').dt.strftime('%Y-%m-%d')
+        normalizadas[outras] = convertidas.fillna(INVALID_DATE)
+    return normalizadas.tolist()
+
+
+def normalize_dates(datas):
+    """
+    Datas (Series) no formato AAAA-MM-DD, com INVALID_DATE nas ausentes ou inválidas.
+    Cada valor distinto é convertido uma única vez (e guardado em cache entre os blocos);
+    as linhas recebem o resultado por indexação, sem interpretar data a data.
+    """
+    codigos, distintos = pd.factorize(datas)
+    novos = [valor for valor in distintos if valor not in _date_cache]
+    convertidos = dict(zip(novos, _convert_dates(novos))) if novos else {}
+    # O mapeamento do bloco é montado antes de o cache ser esvaziado, que pode descartar datas do bloco
+    mapeadas = [convertidos[valor] if valor in convertidos else _date_cache[valor] for valor in distintos]
+    if convertidos:
+        if len(_date_cache) + len(convertidos) > DATE_CACHE_SIZE:
+            _date_cache.clear()
+        _date_cache.update(convertidos)
+    # Ausentes têm código -1 e caem na última posição
+    convertidas = np.array(mapeadas + [INVALID_DATE], dtype=object)
+    return pd.Series(convertidas[codigos], index=datas.index)
+
+
+def _compression(file_path):
+    if file_path.endswith('.csv.gz'):
+        return 'gzip'
+    if file_path.endswith('.csv'):
+        return None
+    raise ValueError('Formato de arquivo não suportado. Use .csv ou .csv.gz.')
+
+
+def _check_columns(colunas):
+    missing = [col for col in IMPORT_COLUMNS if col not in colunas]
+    if missing:
+        raise ValueError(f'Colunas ausentes no dataset: {", ".join(missing)}')
+
+
+def iter_dataset_chunks(file_path, chunksize=CHUNK_SIZE, progresso=NO_PROGRESS, workers=None):
+    """
+    Lê um CSV/CSV.GZ em blocos, apenas com as colunas necessárias, e devolve cada bloco,
+    na ordem do arquivo, já tratado por process_dataframe_for_db.
+    Com `workers` (padrão: PARSE_WORKERS) maior que 1, os blocos são interpretados em
+    paralelo e têm PARSE_BLOCK_BYTES bytes em vez de `chunksize` linhas.
+    A cada bloco, informa a `progresso` as linhas lidas e a fração do arquivo (em bytes,
+    comprimidos no caso do .csv.gz) já consumida.
+    """
+    compression = _compression(file_path)
+    workers = PARSE_WORKERS if workers is None else workers
+    if workers > 1:
+        yield from _iter_parallel_chunks(file_path, compression, workers, progresso)
+        return
+
+    tamanho = os.path.getsize(file_path) or 1
+    with open(file_path, 'rb') as arquivo:
+        reader = pd.read_csv(
+            arquivo,
+            compression=compression,
+            usecols=lambda col: col in IMPORT_COLUMNS,
+            dtype=IMPORT_DTYPES,
+            chunksize=chunksize,
+        )
+        with reader:
+            for chunk in reader:
+                _check_columns(chunk.columns)
+                progresso.advance(len(chunk), arquivo.tell() / tamanho)
+                yield process_dataframe_for_db(chunk)[IMPORT_COLUMNS]
+
+
+def iter_csv_blocks(stream, tamanho_bloco=PARSE_BLOCK_BYTES):
+    """Lê `stream` (bytes) em blocos de cerca de `tamanho_bloco` bytes, terminados em fim de linha."""
+    resto = b''
+    while True:
+        dados = stream.read(tamanho_bloco)
+        if not dados:
+            break
+        dados = resto + dados
+        corte = dados.rfind(b'\n') + 1
+        resto = dados[corte:]
+        if corte:
+            yield dados[:corte]
+    if resto.strip():
+        yield resto
+
+
+def parse_csv_block(bloco, colunas):
+    """Interpreta e trata um bloco de linhas CSV sem cabeçalho (executado no pool de processos)."""
+    df = pd.read_csv(
+        io.BytesIO(bloco),
+        header=None,
+        names=colunas,
+        usecols=IMPORT_COLUMNS,
+        dtype=IMPORT_DTYPES,
+    )
+    return process_dataframe_for_db(df)[IMPORT_COLUMNS]
+
+
+def _iter_parallel_chunks(file_path, compression, workers, progresso):
+    tamanho = os.path.getsize(file_path) or 1
+    with open(file_path, 'rb') as arquivo:
+        stream = gzip.GzipFile(fileobj=arquivo) if compression == 'gzip' else arquivo
+        colunas = pd.read_csv(io.BytesIO(stream.readline()), nrows=0).columns.tolist()
+        _check_columns(colunas)
+
+        # 'spawn': os processos do pool não herdam as conexões abertas por quem faz a leitura
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        pendentes = deque()
+
+        def proximo():
+            futuro, fracao = pendentes.popleft()
+            chunk = futuro.result()
+            progresso.advance(len(chunk), fracao)
+            return chunk
+
+        try:
+            for bloco in iter_csv_blocks(stream):
+                pendentes.append((executor.submit(parse_csv_block, bloco, colunas), arquivo.tell() / tamanho))
+                if len(pendentes) >= workers * BLOCKS_PER_WORKER:
+                    yield proximo()
+            while pendentes:
+                yield proximo()
+        finally:
+            executor.shutdown(cancel_futures=True)
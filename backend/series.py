@@ -0,0 +1,179 @@
+"""
+Montagem e redução das séries temporais do /api/covid_data_for_plot.
+
+As linhas da consulta (data, rótulo, métricas) são pivotadas, de forma vetorizada, em
+matrizes densas rótulos × datas, com NaN onde um rótulo não tem valor numa data. Sobre
+essas matrizes atuam duas reduções que limitam o tamanho da resposta independentemente
+do intervalo de datas:
+
+- reamostragem semanal ou mensal: métricas diárias são somadas no período, métricas
+  acumuladas ficam com o último valor do período;
+- 'max_points': Largest-Triangle-Three-Buckets (LTTB), que escolhe os pontos que melhor
+  preservam a forma das curvas. Com várias séries, o ponto de cada bucket é o mesmo para
+  todas (o que maximiza a soma das áreas normalizadas), para que continuem compartilhando
+  a mesma lista de datas.
+
+As matrizes são então serializadas em listas JSON (formato original) ou no formato
+colunar: cada métrica como um bloco base64 de inteiros little-endian, que o cliente lê
+direto com numpy.frombuffer.
+"""
+import base64
+
+import numpy as np
+
+PERIODOS = ('diario', 'semanal', 'mensal')
+# Menor 'max_points' aceito: o LTTB sempre mantém o primeiro e o último ponto
+MIN_POINTS = 3
+# Formatos de resposta: listas por série (original) ou matrizes binárias em base64
+FORMATOS = ('listas', 'colunar')
+# Tipos inteiros do formato colunar, do mais estreito ao mais largo
+COLUMNAR_DTYPES = ('<i1', '<i2', '<i4', '<i8')
+
+
+def pivot(datas, rotulos, metricas, por_ultimo=None):
+    """
+    Pivota linhas em matrizes rótulos × datas.
+    `datas` são textos AAAA-MM-DD, `rotulos` os rótulos de cada linha (None para série única)
+    e `metricas` um dict nome -> valores por linha. Retorna (dias, rótulos, {nome: matriz}),
+    com dias (datetime64) e rótulos em ordem crescente, exceto `por_ultimo`, que, se
+    presente, fica no fim.
+    """
+    dias, coluna = np.unique(np.array(datas, dtype='datetime64[D]'), return_inverse=True)
+    if rotulos is None:
+        nomes, linha = np.array([], dtype=object), np.zeros(len(coluna), dtype=np.int64)
+        forma = (1, len(dias))
+    else:
+        nomes, linha = np.unique(np.array(rotulos, dtype=object), return_inverse=True)
+        if por_ultimo is not None and por_ultimo in nomes:
+            posicao = int(np.flatnonzero(nomes == por_ultimo)[0])
+            nomes = np.append(np.delete(nomes, posicao), por_ultimo)
+            linha = np.where(linha == posicao, len(nomes) - 1, linha - (linha > posicao))
+        forma = (len(nomes), len(dias))
+    matrizes = {}
+    for nome, valores in metricas.items():
+        matriz = np.full(forma, np.nan)
+        matriz[linha, coluna] = np.array(valores, dtype=float)
+        matrizes[nome] = matriz
+    return dias, nomes.tolist(), matrizes
+
+
+def _period_starts(dias, periodo):
+    """Primeiro dia da semana (segunda-feira) ou do mês de cada data."""
+    if periodo == 'semanal':
+        # 1970-01-01 foi uma quinta-feira: (dias + 3) % 7 é 0 nas segundas-feiras
+        return dias - (dias.astype(np.int64) + 3) % 7
+    return dias.astype('datetime64[M]').astype('datetime64[D]')
+
+
+def resample(dias, matriz, periodo, acumulado):
+    """
+    Reagrupa as colunas de `matriz` (alinhadas a `dias`, em ordem) por semana ou mês.
+    Retorna (inícios dos períodos, nova matriz).
+    """
+    inicios, posicoes = np.unique(_period_starts(dias, periodo), return_index=True)
+    validos = ~np.isnan(matriz)
+    if acumulado:
+        # Último valor presente em cada período
+        fins = np.append(posicoes[1:], len(dias)) - 1
+        indices = np.where(validos, np.arange(len(dias)), -1)
+        ultimo = np.maximum.accumulate(indices, axis=1)[:, fins]
+        nova = np.where(ultimo >= posicoes, np.take_along_axis(matriz, np.maximum(ultimo, 0), axis=1), np.nan)
+    else:
+        somas = np.add.reduceat(np.where(validos, matriz, 0), posicoes, axis=1)
+        contagens = np.add.reduceat(validos, posicoes, axis=1)
+        nova = np.where(contagens > 0, somas, np.nan)
+    return inicios, nova
+
+
+def lttb_indices(x, matriz, n):
+    """
+    Índices (em ordem) dos `n` pontos escolhidos pelo LTTB, comuns a todas as séries de `matriz`.
+    Cada série é normalizada pela sua amplitude, para que as maiores não decidam sozinhas.
+    """
+    total = len(x)
+    if n >= total:
+        return np.arange(total)
+    # Valores ausentes repetem o anterior (ou zero no início), para não criar picos artificiais
+    validos = ~np.isnan(matriz)
+    anteriores = np.maximum.accumulate(np.where(validos, np.arange(total), 0), axis=1)
+    y = np.nan_to_num(np.take_along_axis(matriz, anteriores, axis=1))
+    amplitude = y.max(axis=1, initial=0) - y.min(axis=1, initial=0)
+    y = y / np.where(amplitude > 0, amplitude, 1)[:, None]
+    x = x.astype(float)
+
+    # n - 2 buckets entre o primeiro e o último ponto
+    bordas = np.linspace(1, total - 1, n - 1).astype(np.int64)
+    selecionados = [0]
+    a = 0
+    for i in range(n - 2):
+        inicio, fim = bordas[i], bordas[i + 1]
+        prox_inicio, prox_fim = (bordas[i + 1], bordas[i + 2]) if i + 2 < len(bordas) else (total - 1, total)
+        mx = x[prox_inicio:prox_fim].mean()
+        my = y[:, prox_inicio:prox_fim].mean(axis=1)
+        ax, ay = x[a], y[:, a]
+        areas = np.abs(
+            (ax - mx) * (y[:, inicio:fim] - ay[:, None]) - (ax - x[inicio:fim]) * (my - ay)[:, None]
+        ).sum(axis=0)
+        a = inicio + int(np.argmax(areas))
+        selecionados.append(a)
+    selecionados.append(total - 1)
+    return np.array(selecionados)
+
+
+def reduce_series(dias, matrizes, periodo='diario', max_points=None, acumulado=False):
+    """
+    Aplica a reamostragem (`periodo`) e o limite de pontos (`max_points`) às `matrizes`
+    (todas alinhadas a `dias`), que continuam alinhadas entre si. Retorna (dias, matrizes).
+    """
+    if not len(dias) or (periodo == 'diario' and max_points is None):
+        return dias, matrizes
+    nomes = list(matrizes)
+    linhas = [len(matrizes[nome]) for nome in nomes]
+    matriz = np.vstack([matrizes[nome] for nome in nomes])
+
+    if periodo != 'diario':
+        dias, matriz = resample(dias, matriz, periodo, acumulado)
+    if max_points is not None and max_points < len(dias):
+        indices = lttb_indices(dias.astype(np.int64), matriz, max_points)
+        dias, matriz = dias[indices], matriz[:, indices]
+
+    return dias, dict(zip(nomes, np.split(matriz, np.cumsum(linhas)[:-1])))
+
+
+def to_lists(matriz):
+    """Matriz float -> listas de int, com None no lugar de NaN."""
+    ausentes = np.isnan(matriz)
+    valores = np.where(ausentes, 0, matriz).astype(np.int64).astype(object)
+    valores[ausentes] = None
+    return valores.tolist()
+
+
+def _b64(array):
+    return base64.b64encode(np.ascontiguousarray(array).tobytes()).decode('ascii')
+
+
+def encode_columnar(dias, rotulos, matrizes):
+    """
+    Formato colunar: cada matriz rótulos × datas vira um bloco base64 de inteiros
+    little-endian em ordem de linhas, no tipo mais estreito em que todos os valores cabem
+    ('dtype', um de COLUMNAR_DTYPES), com zeros nas posições ausentes. 'missing' é a
+    máscara dessas posições, um bit por valor (numpy.packbits, bitorder='little'), ou None
+    quando não há ausentes; ela vale para todas as métricas, que vêm das mesmas linhas.
+    """
+    primeira = next(iter(matrizes.values()))
+    ausentes = np.isnan(primeira)
+    cheias = {nome: np.where(ausentes, 0, matriz) for nome, matriz in matrizes.items()}
+    menor = min(matriz.min(initial=0) for matriz in cheias.values())
+    maior = max(matriz.max(initial=0) for matriz in cheias.values())
+    dtype = next(t for t in COLUMNAR_DTYPES if np.iinfo(t).min <= menor and maior <= np.iinfo(t).max)
+    resposta = {
+        'format': 'colunar',
+        'dates': dias.astype(str).tolist(),
+        'labels': rotulos,
+        'shape': list(primeira.shape),
+        'dtype': dtype,
+        'missing': _b64(np.packbits(ausentes, axis=None, bitorder='little')) if ausentes.any() else None,
+    }
+    for nome, matriz in cheias.items():
+        resposta[nome] = _b64(matriz.astype(dtype))
+    return resposta
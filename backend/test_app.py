@@ -0,0 +1,45 @@
+"""Paginação do /api/consulta_dados: por página (LIMIT/OFFSET) e por cursor (keyset)."""
+import pytest
+
+import ingestao
+from app import app
+
+
+@pytest.fixture
+def client(base, dataset):
+    ingestao.reload_dataset(str(dataset), layout='padrao')
+    return app.test_client()
+
+
+def _consulta(client, **params):
+    return client.get('/api/consulta_dados', query_string={'count': 'none', **params})
+
+
+def test_cursor_pages_match_offset_pages(client):
+    filtros = {'estado': 'AC', 'data_inicial': '2020-03-01', 'data_final': '2020-03-10'}
+    por_pagina = [
+        linha for page in (1, 2, 3, 4, 5) for linha in _consulta(client, page=page, per_page=90, **filtros).json['data']
+    ]
+
+    por_cursor, cursor = [], None
+    while True:
+        resposta = _consulta(client, per_page=90, **filtros, **({'cursor': cursor} if cursor else {})).json
+        por_cursor += resposta['data']
+        cursor = resposta['next_cursor']
+        if cursor is None:
+            break
+
+    assert len(por_cursor) == 40 * 10
+    assert por_cursor == por_pagina
+
+
+def test_invalid_cursor_is_rejected(client):
+    resposta = _consulta(client, cursor='nao-e-um-cursor')
+    assert resposta.status_code == 400
+
+
+@pytest.mark.parametrize('per_page', [0, -5])
+def test_per_page_must_be_positive(client, per_page):
+    resposta = _consulta(client, per_page=per_page)
+    assert resposta.status_code == 400
+    assert 'per_page' in resposta.json['message']
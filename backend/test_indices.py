@@ -0,0 +1,22 @@
+"""
+Planos de consulta dos endpoints (o mesmo que 'python indices.py --verificar'): nenhuma
+consulta filtrada pode varrer a tabela de dados inteira, nos dois layouts de armazenamento.
+"""
+import pytest
+
+import banco
+import ingestao
+from indices import endpoint_queries, explain, plan_failures
+
+
+@pytest.mark.parametrize('layout', ['padrao', 'compacto'])
+def test_endpoint_queries_do_not_scan_whole_table(base, dataset, layout):
+    ingestao.reload_dataset(str(dataset), layout=layout)
+
+    with banco.write_connection() as conn:
+        consultas = endpoint_queries(conn)
+        assert consultas
+        falhas = []
+        for rotulo, query, params, varredura_permitida in consultas:
+            falhas += plan_failures(rotulo, query, explain(conn, query, params), varredura_permitida)
+    assert falhas == []
@@ -0,0 +1,61 @@
+"""Atualização incremental (upsert_dataset): contagens e conteúdo final iguais aos de uma recarga completa."""
+import csv
+
+import banco
+import ingestao
+
+
+def _rows(caminho):
+    with open(caminho, newline='', encoding='utf-8') as arquivo:
+        return list(csv.reader(arquivo))
+
+
+def _write_rows(caminho, linhas):
+    with open(caminho, 'w', newline='', encoding='utf-8') as arquivo:
+        csv.writer(arquivo).writerows(linhas)
+
+
+def _contents(tabela):
+    with banco.write_connection() as conn:
+        return sorted(conn.execute(f'SELECT * FROM {tabela}').fetchall())
+
+
+def test_repeated_keys_count_once(base, dataset, tmp_path):
+    ingestao.reload_dataset(str(dataset), layout='padrao')
+    cabecalho, *linhas = _rows(dataset)
+
+    # Uma chave antiga repetida sem alteração e uma chave nova (data posterior) repetida
+    nova = ['2099-01-01'] + linhas[0][1:]
+    atualizado = tmp_path / 'atualizado.csv'
+    _write_rows(atualizado, [cabecalho, *linhas, linhas[5], nova, nova])
+
+    contagens = {'inserted': 1, 'updated': 0, 'deleted': 0, 'unchanged': len(linhas)}
+    resultado = ingestao.update_dataset(str(atualizado), dry_run=True)
+    assert resultado['modo'] == 'incremental'
+    assert {chave: resultado[chave] for chave in contagens} == contagens
+    resultado = ingestao.update_dataset(str(atualizado))
+    assert {chave: resultado[chave] for chave in contagens} == contagens
+    assert len(_contents('dados_covid')) == len(linhas) + 1
+
+
+def test_revised_date_matches_full_reload(base, dataset, tmp_path):
+    ingestao.reload_dataset(str(dataset), layout='padrao')
+    cabecalho, *linhas = _rows(dataset)
+    data = linhas[10][0]
+
+    # Na data revisada, uma linha some, outra muda e uma terceira aparece repetida sem alteração
+    revisadas = [i for i, linha in enumerate(linhas) if linha[0] == data]
+    removida, alterada, repetida = revisadas[:3]
+    linhas[alterada] = linhas[alterada][:-1] + [str(int(linhas[alterada][-1]) + 7)]
+    novas = [linha for i, linha in enumerate(linhas) if i != removida] + [linhas[repetida]]
+    atualizado = tmp_path / 'atualizado.csv'
+    _write_rows(atualizado, [cabecalho, *novas])
+
+    resultado = ingestao.update_dataset(str(atualizado))
+    contagens = {'inserted': 0, 'updated': 1, 'deleted': 1, 'unchanged': len(linhas) - 2}
+    assert {chave: resultado[chave] for chave in contagens} == contagens
+
+    tabelas = ['dados_covid', ingestao.STATE_ROLLUP_TABLE, ingestao.NATIONAL_ROLLUP_TABLE]
+    incremental = {tabela: _contents(tabela) for tabela in tabelas}
+    ingestao.reload_dataset(str(atualizado), layout='padrao')
+    assert {tabela: _contents(tabela) for tabela in tabelas} == incremental
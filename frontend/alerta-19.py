@@ -1,16 +1,22 @@
 import customtkinter as ctk
 import tkinter as tk
 from tkinter import filedialog # Importar filedialog
-import threading
+from tkinter import ttk
 import requests
 import os
 import json
+import time
+import base64
 from datetime import datetime
 
+import numpy as np
+
 # Importações para Matplotlib
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
 
+from cliente_api import ApiClient
+
 # Configurações iniciais do CustomTkinter
 ctk.set_appearance_mode("System")  # Modes: "System" (default), "Dark", "Light"
 ctk.set_default_color_theme("blue")  # Themes: "blue" (default), "dark-blue", "green"
@@ -25,6 +31,39 @@ API_IMPORT_URL = f'{BASE_API_URL}/api/importar_dataset'
 API_UPDATE_URL = f'{BASE_API_URL}/api/atualizar_dados'
 API_DELETE_URL = f'{BASE_API_URL}/api/limpar_base'
 API_VISUALIZACAO_URL = f'{BASE_API_URL}/api/covid_data_for_plot'
+API_JOBS_URL = f'{BASE_API_URL}/api/jobs'
+
+# Importação, atualização e limpeza rodam como jobs no backend; o andamento é consultado neste intervalo (s)
+JOB_POLL_INTERVAL = 0.5
+# Nomes exibidos para as fases informadas pelo backend em /api/jobs/<id>
+JOB_PHASE_NAMES = {
+    "leitura": "Lendo o arquivo",
+    "indices": "Criando índices",
+    "resumos": "Calculando resumos",
+    "compactacao": "Compactando a base",
+    "troca": "Ativando os novos dados",
+    "comparacao": "Comparando com a base",
+    "revisao": "Revisando datas alteradas",
+    "gravacao": "Gravando alterações",
+    "limpeza": "Limpando a base",
+}
+
+# Máximo de datas por série pedido ao backend para os gráficos (redução no servidor, ver series.py)
+PLOT_MAX_POINTS = 400
+# Séries por estado/cidade desenhadas individualmente; as demais são somadas em 'Outros'
+PLOT_TOP_N = 10
+# Linhas por página da tabela: o Treeview só desenha as linhas visíveis, então páginas grandes não travam a interface
+TABLE_PAGE_SIZE = 1000
+# Colunas da tabela de resultados: (campo na resposta de /api/consulta_dados, título, largura, alinhamento)
+TABLE_COLUMNS = [
+    ("date", "Data", 100, "center"),
+    ("state", "Estado", 70, "center"),
+    ("city", "Município", 220, "w"),
+    ("confirmed_cases", "Casos Confirmados", 130, "e"),
+    ("deaths", "Óbitos", 100, "e"),
+    ("new_cases", "Novos Casos", 110, "e"),
+    ("new_deaths", "Novos Óbitos", 110, "e"),
+]
 
 
 class LoginWindow(ctk.CTkToplevel):
@@ -78,15 +117,14 @@ class LoginWindow(ctk.CTkToplevel):
         role_selection = self.optionmenu_role.get()
 
         self.label_feedback.configure(text="Autenticando...", text_color="orange")
-        threading.Thread(target=self._send_login_request_async,
-                         args=(username, password, role_selection)).start()
+        self.app_instance.api.submit(self._send_login_request_async, username, password, role_selection)
 
     def _send_login_request_async(self, username, password, role_selection):
         """
         Envia a requisição de login para o backend de forma assíncrona.
         """
         try:
-            response = requests.post(API_LOGIN_URL, json={
+            response = self.app_instance.api.request("POST", API_LOGIN_URL, json={
                 "username": username,
                 "password": password
             })
@@ -104,15 +142,21 @@ class LoginWindow(ctk.CTkToplevel):
                 self.after(0, lambda: self.label_feedback.configure(text=data.get("message", "Credenciais inválidas."), text_color="red"))
         except requests.exceptions.ConnectionError:
             self.after(0, lambda: self.label_feedback.configure(text="Erro de conexão com o servidor.", text_color="red"))
+        except requests.exceptions.Timeout:
+            self.after(0, lambda: self.label_feedback.configure(text="Tempo esgotado ao contatar o servidor.", text_color="red"))
         except requests.exceptions.HTTPError as e:
             if e.response.status_code == 401:
                 self.after(0, lambda: self.label_feedback.configure(text="Usuário ou senha incorretos.", text_color="red"))
             else:
-                self.after(0, lambda: self.label_feedback.configure(text=f"Erro no servidor: {e}", text_color="red"))
+                self._show_feedback(f"Erro no servidor: {e}", "red")
         except json.JSONDecodeError:
             self.after(0, lambda: self.label_feedback.configure(text="Resposta inválida do servidor.", text_color="red"))
         except Exception as e:
-            self.after(0, lambda: self.label_feedback.configure(text=f"Erro inesperado: {e}", text_color="red"))
+            self._show_feedback(f"Erro inesperado: {e}", "red")
+
+    def _show_feedback(self, text, text_color):
+        """Mostra `text` no feedback do login, na thread da interface."""
+        self.after(0, lambda: self.label_feedback.configure(text=text, text_color=text_color))
 
     def _login_successful(self, role):
         """
@@ -137,7 +181,7 @@ class App(ctk.CTk):
 
         # Variáveis de estado da aplicação
         self.current_page = 1
-        self.records_per_page = 20
+        self.records_per_page = TABLE_PAGE_SIZE
         self.total_records = 0
         self.total_pages = 1
         self.current_state_selection = ""
@@ -146,6 +190,7 @@ class App(ctk.CTk):
         self.records = [] # Armazena os dados da tabela
         self.plot_data = {} # Armazena os dados para o gráfico
         self.user_role = None # Será definido após o login
+        self.api = ApiClient() # Sessão HTTP e pool de threads de todas as requisições ao backend
 
         # Variáveis para a interface de importação
         self.file_path_entry = None # ctk.CTkEntry para exibir o caminho do arquivo
@@ -289,18 +334,20 @@ class App(ctk.CTk):
         self.results_display_frame.grid_rowconfigure(0, weight=1)
 
         # Área da tabela de resultados (inicialmente visível)
-        self.table_scroll_frame = ctk.CTkScrollableFrame(self.results_display_frame, corner_radius=8)
-        self.table_scroll_frame.grid(row=0, column=0, padx=0, pady=0, sticky="nsew")
-        self.table_scroll_frame.grid_columnconfigure(0, weight=1)
-
-        # Placeholder para a tabela (usaremos CTkLabel e CTkEntry para simular)
-        self.table_headers = ["Data", "Estado", "Município", "Casos Confirmados", "Óbitos", "Novos Casos", "Novos Óbitos"]
-        self.table_widgets = [] # Para armazenar os widgets da tabela
+        self.table_frame = ctk.CTkFrame(self.results_display_frame, corner_radius=8)
+        self.table_frame.grid(row=0, column=0, padx=0, pady=0, sticky="nsew")
+        self.table_frame.grid_columnconfigure(0, weight=1)
+        self.table_frame.grid_rowconfigure(0, weight=1)
+        self.create_table(self.table_frame)
 
         # Área do gráfico (inicialmente oculta)
         self.plot_frame = ctk.CTkFrame(self.results_display_frame, corner_radius=8)
+        self.plot_figure = None # Figura do Matplotlib, criada no primeiro gráfico e reaproveitada
         self.plot_canvas = None # Para armazenar o canvas do Matplotlib
         self.toolbar = None # Para armazenar a barra de ferramentas do Matplotlib
+        self.plot_lines = [] # Linhas (Line2D) reaproveitadas entre os gráficos; as que sobram ficam ocultas
+        self._theme_colors = {} # Modo de aparência -> (cor de fundo, cor do texto) em RGB do Matplotlib
+        self._plot_colors_mode = None # Modo de aparência cujas cores estão aplicadas à figura
 
         # Paginação
         pagination_frame = ctk.CTkFrame(parent_frame, corner_radius=8)
@@ -316,6 +363,45 @@ class App(ctk.CTk):
         self.button_proximo = ctk.CTkButton(pagination_frame, text="Próximo", command=self.next_page, corner_radius=8)
         self.button_proximo.grid(row=0, column=2, padx=10, pady=5, sticky="e")
 
+    def create_table(self, parent_frame):
+        """
+        Cria a tabela de resultados: um único ttk.Treeview com barra de rolagem. O Treeview
+        desenha só as linhas visíveis, e as linhas (itens) são reaproveitadas entre as
+        páginas por _render_table, em vez de um widget por célula.
+        """
+        self._apply_table_style()
+        self.table_tree = ttk.Treeview(parent_frame, columns=[key for key, *_ in TABLE_COLUMNS],
+                                       show="headings", style="Alerta.Treeview", selectmode="browse")
+        for key, header_text, width, anchor in TABLE_COLUMNS:
+            self.table_tree.heading(key, text=header_text)
+            self.table_tree.column(key, width=width, minwidth=50, anchor=anchor, stretch=True)
+        self.table_tree.grid(row=0, column=0, padx=(5, 0), pady=5, sticky="nsew")
+
+        table_scrollbar = ctk.CTkScrollbar(parent_frame, command=self.table_tree.yview)
+        table_scrollbar.grid(row=0, column=1, padx=(0, 5), pady=5, sticky="ns")
+        self.table_tree.configure(yscrollcommand=table_scrollbar.set)
+
+        # Mensagem sobreposta à tabela quando a consulta não retorna linhas
+        self.table_empty_label = ctk.CTkLabel(parent_frame, text="Nenhum dado para exibir com os filtros selecionados.")
+        self.table_rows = [] # Ids dos itens do Treeview, reaproveitados entre as páginas
+
+    def _apply_table_style(self):
+        """Aplica ao estilo ttk da tabela as cores do tema atual do CustomTkinter."""
+        theme = ctk.ThemeManager.theme
+        bg_color = self._apply_appearance_mode(theme["CTkFrame"]["fg_color"])
+        text_color = self._apply_appearance_mode(theme["CTkLabel"]["text_color"])
+        header_color = self._apply_appearance_mode(theme["CTkFrame"]["top_fg_color"])
+        selected_color = self._apply_appearance_mode(theme["CTkButton"]["fg_color"])
+
+        style = ttk.Style(self)
+        style.theme_use("default") # Os temas nativos ignoram as cores de fundo configuradas
+        style.configure("Alerta.Treeview", background=bg_color, fieldbackground=bg_color,
+                        foreground=text_color, rowheight=24, borderwidth=0)
+        style.map("Alerta.Treeview", background=[("selected", selected_color)])
+        style.configure("Alerta.Treeview.Heading", background=header_color, foreground=text_color,
+                        relief="flat")
+        style.map("Alerta.Treeview.Heading", background=[("active", header_color)])
+
     def create_gerenciamento_section(self, parent_frame):
         """
         Cria os widgets para a seção de 'Gerenciamento de Dataset'.
@@ -347,6 +433,11 @@ class App(ctk.CTk):
         self.gerenciamento_feedback_label = ctk.CTkLabel(parent_frame, text="", text_color="orange")
         self.gerenciamento_feedback_label.grid(row=1, column=0, padx=20, pady=5, sticky="ew")
 
+        # Andamento do job em execução no backend
+        self.gerenciamento_progressbar = ctk.CTkProgressBar(parent_frame)
+        self.gerenciamento_progressbar.set(0)
+        self.gerenciamento_progressbar.grid(row=2, column=0, padx=20, pady=5, sticky="ew")
+
     def apply_access_restrictions(self):
         """
         Aplica restrições de acesso com base no cargo do usuário.
@@ -381,65 +472,82 @@ class App(ctk.CTk):
     def show_table_view(self):
         """Exibe a tabela de resultados e oculta o gráfico."""
         self.plot_frame.grid_forget()
-        if self.plot_canvas:
-            self.plot_canvas.get_tk_widget().destroy()
-            self.plot_canvas = None
-        if self.toolbar:
-            self.toolbar.destroy()
-            self.toolbar = None
-        self.table_scroll_frame.grid(row=0, column=0, padx=0, pady=0, sticky="nsew")
+        self.table_frame.grid(row=0, column=0, padx=0, pady=0, sticky="nsew")
 
 
     def show_plot_view(self):
         """Exibe o gráfico e oculta a tabela de resultados."""
-        self.table_scroll_frame.grid_forget()
+        self.table_frame.grid_forget()
         self.plot_frame.grid(row=0, column=0, padx=0, pady=0, sticky="nsew")
         self.plot_frame.grid_columnconfigure(0, weight=1)
         self.plot_frame.grid_rowconfigure(0, weight=1)
 
+    def _deliver(self, canal, geracao, callback):
+        """
+        Agenda `callback` na thread da interface, descartando-o se, até lá, outra requisição
+        do mesmo `canal` tiver substituído a de `geracao` (resposta obsoleta).
+        """
+        self.after(0, lambda: callback() if self.api.is_current(canal, geracao) else None)
+
+    def destroy(self):
+        """Encerra o pool de requisições e a sessão HTTP junto com a janela."""
+        self.api.close()
+        super().destroy()
+
     def load_states(self):
         """
-        Carrega a lista de estados do backend de forma assíncrona.
+        Carrega a lista de estados do backend de forma assíncrona. Se houver uma lista no
+        cache local (de uma execução anterior), ela é exibida na hora e revalidada depois.
         """
-        self.optionmenu_estado.set("Carregando Estados...")
-        self.states = ["Carregando..."] # Reset states
-        self.optionmenu_municipio.set("Selecione um Estado")
-        self.cities = ["Carregando..."] # Reset cities
-        threading.Thread(target=self._fetch_states_async).start()
+        cached = self.api.cached_json(API_STATES_URL)
+        if cached and cached.get("states"):
+            self._update_states_ui([""] + sorted(cached["states"]))
+        else:
+            cached = None
+            self.optionmenu_estado.set("Carregando Estados...")
+            self.states = ["Carregando..."] # Reset states
+            self.optionmenu_municipio.set("Selecione um Estado")
+            self.cities = ["Carregando..."] # Reset cities
+        self.api.submit_latest("estados", self._fetch_states_async, cached)
 
-    def _fetch_states_async(self):
+    def _fetch_states_async(self, geracao, cached=None):
         """
-        Função assíncrona para buscar estados.
+        Função assíncrona para buscar estados. Com a lista `cached` já exibida, a UI só é
+        atualizada se o backend devolver uma lista diferente (erros mantêm a lista exibida).
         """
+        states = ["Erro ao Carregar"]
+        update_ui = cached is None
         try:
-            response = requests.get(API_STATES_URL)
-            response.raise_for_status()
-            data = response.json()
+            data = self.api.get_json(API_STATES_URL, persist=True)
+            update_ui = update_ui or data is not cached
             if "states" in data and data["states"]:
-                self.states = [""] + sorted(data["states"]) # Adiciona opção vazia
+                states = [""] + sorted(data["states"]) # Adiciona opção vazia
             else:
-                self.states = ["Nenhum estado encontrado"]
+                states = ["Nenhum estado encontrado"]
                 print("DEBUG: Nenhuma lista de estados na resposta.")
 
         except requests.exceptions.ConnectionError:
-            self.states = ["Erro de Conexão"]
+            states = ["Erro de Conexão"]
             print(f"ERRO: Não foi possível conectar ao backend em {API_STATES_URL}")
         except requests.exceptions.Timeout:
-            self.states = ["Tempo Esgotado"]
+            states = ["Tempo Esgotado"]
             print("ERRO: Requisição de estados excedeu o tempo limite.")
         except requests.exceptions.RequestException as e:
-            self.states = ["Erro ao Carregar"]
+            states = ["Erro ao Carregar"]
             print(f"ERRO ao carregar estados: {e}")
         except json.JSONDecodeError:
-            self.states = ["Erro no JSON"]
+            states = ["Erro no JSON"]
             print("ERRO: Resposta não é um JSON válido ao carregar estados.")
         finally:
-            self.after(0, self._update_states_ui) # Atualiza a UI na thread principal
+            # Atualiza a UI na thread principal, se esta ainda é a carga de estados mais recente
+            if update_ui:
+                self._deliver("estados", geracao, lambda: self._update_states_ui(states))
 
-    def _update_states_ui(self):
+    def _update_states_ui(self, states):
         """
         Atualiza o OptionMenu de estados na UI.
         """
+        self.states = states
         self.optionmenu_estado.configure(values=self.states)
         if self.states and self.states[0] not in ["Carregando...", "Erro de Conexão", "Tempo Esgotado", "Erro ao Carregar", "Erro no JSON", "Nenhum estado encontrado"]:
             self.optionmenu_estado.set(self.states[0])
@@ -458,45 +566,55 @@ class App(ctk.CTk):
         self.optionmenu_municipio.set("Carregando Municípios...")
         self.cities = ["Carregando..."] # Reset cities
         if state_uf: # Só busca municípios se um estado válido for selecionado
-            threading.Thread(target=self._fetch_cities_async, args=(state_uf,)).start()
+            cached = self.api.cached_json(API_CITIES_URL, params={"estado": state_uf})
+            if cached and cached.get("cities"):
+                self._update_cities_ui([""] + sorted(cached["cities"]))
+            else:
+                cached = None
+            self.api.submit_latest("municipios", self._fetch_cities_async, state_uf, cached)
         else: # Se o estado for vazio (seleção "Nenhum")
-            self.cities = [""] # Opção vazia para municípios
-            self.after(0, self._update_cities_ui)
+            self.api.invalidate("municipios") # Descarta os municípios de um estado selecionado antes
+            self.after(0, lambda: self._update_cities_ui([""])) # Opção vazia para municípios
 
 
-    def _fetch_cities_async(self, state_uf):
+    def _fetch_cities_async(self, geracao, state_uf, cached=None):
         """
-        Função assíncrona para buscar municípios de um estado.
+        Função assíncrona para buscar municípios de um estado. Com a lista `cached` já
+        exibida, a UI só é atualizada se o backend devolver uma lista diferente.
         """
+        cities = ["Erro ao Carregar"]
+        update_ui = cached is None
         try:
-            response = requests.get(API_CITIES_URL, params={"estado": state_uf})
-            response.raise_for_status()
-            data = response.json()
+            data = self.api.get_json(API_CITIES_URL, params={"estado": state_uf}, persist=True)
+            update_ui = update_ui or data is not cached
             if "cities" in data and data["cities"]:
-                self.cities = [""] + sorted(data["cities"]) # Adiciona opção vazia
+                cities = [""] + sorted(data["cities"]) # Adiciona opção vazia
             else:
-                self.cities = ["Nenhum município encontrado"]
+                cities = ["Nenhum município encontrado"]
                 print(f"DEBUG: Nenhuma lista de municípios para {state_uf} na resposta.")
 
         except requests.exceptions.ConnectionError:
-            self.cities = ["Erro de Conexão"]
+            cities = ["Erro de Conexão"]
             print(f"ERRO: Não foi possível conectar ao backend em {API_CITIES_URL}")
         except requests.exceptions.Timeout:
-            self.cities = ["Tempo Esgotado"]
+            cities = ["Tempo Esgotado"]
             print("ERRO: Requisição de municípios excedeu o tempo limite.")
         except requests.exceptions.RequestException as e:
-            self.cities = ["Erro ao Carregar"]
+            cities = ["Erro ao Carregar"]
             print(f"ERRO ao carregar municípios: {e}")
         except json.JSONDecodeError:
-            self.cities = ["Erro no JSON"]
+            cities = ["Erro no JSON"]
             print("ERRO: Resposta não é um JSON válido ao carregar municípios.")
         finally:
-            self.after(0, self._update_cities_ui) # Atualiza a UI na thread principal
+            # Atualiza a UI na thread principal, se o estado ainda é o último selecionado
+            if update_ui:
+                self._deliver("municipios", geracao, lambda: self._update_cities_ui(cities))
 
-    def _update_cities_ui(self):
+    def _update_cities_ui(self, cities):
         """
         Atualiza o OptionMenu de municípios na UI.
         """
+        self.cities = cities
         self.optionmenu_municipio.configure(values=self.cities)
         if self.cities and self.cities[0] not in ["Carregando...", "Erro de Conexão", "Tempo Esgotado", "Erro ao Carregar", "Erro no JSON", "Nenhum município encontrado", "Selecione um Estado"]:
             self.optionmenu_municipio.set(self.cities[0])
@@ -543,8 +661,14 @@ class App(ctk.CTk):
         params["page"] = self.current_page
         params["per_page"] = self.records_per_page
 
-        self.consulta_feedback_label.configure(text="Carregando dados da tabela...", text_color="orange")
-        threading.Thread(target=self._fetch_covid_data_async, args=(params,)).start()
+        # Página já recebida (ou buscada antecipadamente): exibe na hora e só revalida em segundo plano
+        cached = self.api.cached_page(API_CONSULTA_URL, params)
+        if cached is not None and "data" in cached and "total_records" in cached:
+            self._show_table_data(cached["data"], cached["total_records"])
+            self.consulta_feedback_label.configure(text="Consulta de tabela concluída.", text_color="green")
+        else:
+            self.consulta_feedback_label.configure(text="Carregando dados da tabela...", text_color="orange")
+        self.api.submit_latest("resultados", self._fetch_covid_data_async, params, cached)
 
     def perform_plot_visualization(self):
         """
@@ -554,8 +678,21 @@ class App(ctk.CTk):
         if params is None:
             return
 
-        self.consulta_feedback_label.configure(text="Gerando gráfico...", text_color="orange")
-        threading.Thread(target=self._fetch_plot_data_async, args=(params,)).start()
+        # Limita os pontos por série: o tempo de desenho não cresce com o intervalo de datas
+        params["max_points"] = PLOT_MAX_POINTS
+        params["top_n"] = PLOT_TOP_N
+        # Séries como matrizes binárias, lidas direto com numpy (sem percorrer valor a valor)
+        params["formato"] = "colunar"
+
+        # Gráfico já consultado (nesta ou numa execução anterior): exibe na hora e revalida depois
+        cached = self.api.cached_json(API_VISUALIZACAO_URL, params)
+        if cached is not None and "dates" in cached and ("cases" in cached or "labels" in cached):
+            self._show_plot_data(self._decode_plot_data(cached))
+            self.consulta_feedback_label.configure(text="Gráfico gerado com sucesso.", text_color="green")
+        else:
+            cached = None
+            self.consulta_feedback_label.configure(text="Gerando gráfico...", text_color="orange")
+        self.api.submit_latest("resultados", self._fetch_plot_data_async, params, cached)
 
 
     def _is_valid_date(self, date_str):
@@ -566,215 +703,285 @@ class App(ctk.CTk):
         except ValueError:
             return False
 
-    def _fetch_covid_data_async(self, params):
+    def _consulta_feedback(self, geracao, text, text_color):
+        """Mostra `text` no feedback da consulta, se a requisição de `geracao` ainda é a mais recente."""
+        self._deliver("resultados", geracao, lambda: self.consulta_feedback_label.configure(text=text, text_color=text_color))
+
+    def _fetch_covid_data_async(self, geracao, params, cached=None):
         """
-        Função assíncrona para buscar dados da COVID-19 para a tabela.
+        Função assíncrona para buscar dados da COVID-19 para a tabela. Se a página `cached`
+        já está na tela, só a exibe de novo quando os dados mudaram no backend. Em seguida,
+        busca antecipadamente as páginas vizinhas.
         """
         try:
-            response = requests.get(API_CONSULTA_URL, params=params)
-            response.raise_for_status()
-            data = response.json()
+            data = self.api.get_page(API_CONSULTA_URL, params)
 
             if "data" in data and "total_records" in data:
-                self.records = data["data"]
-                self.total_records = data["total_records"]
-                self.total_pages = (self.total_records + self.records_per_page - 1) // self.records_per_page
-                self.after(0, self._render_table)
-                self.after(0, lambda: self.consulta_feedback_label.configure(text="Consulta de tabela concluída.", text_color="green"))
-                self.after(0, self.show_table_view) # Garante que a tabela é exibida
+                if data is not cached:
+                    self._deliver("resultados", geracao, lambda: self._show_table_data(data["data"], data["total_records"]))
+                    self._consulta_feedback(geracao, "Consulta de tabela concluída.", "green")
+                if self.api.is_current("resultados", geracao):
+                    self._prefetch_adjacent_pages(params, data["total_records"])
             else:
-                self.records = []
-                self.total_records = 0
-                self.total_pages = 1
-                self.after(0, self._render_table)
-                self.after(0, lambda: self.consulta_feedback_label.configure(text="Nenhum dado encontrado para a tabela.", text_color="red"))
-                self.after(0, self.show_table_view) # Garante que a tabela é exibida
+                self._deliver("resultados", geracao, lambda: self._show_table_data([], 0))
+                self._consulta_feedback(geracao, "Nenhum dado encontrado para a tabela.", "red")
                 print("DEBUG: Estrutura de resposta inesperada para dados da COVID-19 (tabela).")
 
         except requests.exceptions.ConnectionError:
-            self.after(0, lambda: self.consulta_feedback_label.configure(text="Erro de Conexão com o backend.", text_color="red"))
+            self._consulta_feedback(geracao, "Erro de Conexão com o backend.", "red")
             print(f"ERRO: Não foi possível conectar ao backend em {API_CONSULTA_URL}")
         except requests.exceptions.Timeout:
-            self.after(0, lambda: self.consulta_feedback_label.configure(text="Tempo esgotado na consulta da tabela.", text_color="red"))
+            self._consulta_feedback(geracao, "Tempo esgotado na consulta da tabela.", "red")
             print("ERRO: Requisição de dados da COVID-19 (tabela) excedeu o tempo limite.")
         except requests.exceptions.RequestException as e:
-            self.after(0, lambda: self.consulta_feedback_label.configure(text=f"Erro na consulta da tabela: {e}", text_color="red"))
+            self._consulta_feedback(geracao, f"Erro na consulta da tabela: {e}", "red")
             print(f"ERRO ao consultar dados da COVID-19 (tabela): {e}")
         except json.JSONDecodeError:
-            self.after(0, lambda: self.consulta_feedback_label.configure(text="Erro no formato de dados do backend (tabela).", text_color="red"))
+            self._consulta_feedback(geracao, "Erro no formato de dados do backend (tabela).", "red")
             print("ERRO: Resposta não é um JSON válido ao consultar dados da COVID-19 (tabela).")
 
-    def _fetch_plot_data_async(self, params):
+    def _prefetch_adjacent_pages(self, params, total_records):
+        """Busca em segundo plano a próxima e a anterior página da consulta, se existirem."""
+        total_pages = (total_records + self.records_per_page - 1) // self.records_per_page
+        for page in (params["page"] + 1, params["page"] - 1):
+            if 1 <= page <= total_pages:
+                self.api.prefetch_page(API_CONSULTA_URL, {**params, "page": page})
+
+    def _show_table_data(self, records, total_records):
+        """Guarda a página recebida e exibe a tabela (na thread da interface)."""
+        self.records = records
+        self.total_records = total_records
+        self.total_pages = max((self.total_records + self.records_per_page - 1) // self.records_per_page, 1)
+        self._render_table()
+        self.show_table_view() # Garante que a tabela é exibida
+
+    def _decode_plot_data(self, data):
+        """
+        Converte a resposta colunar do /api/covid_data_for_plot em arrays numpy: 'dates'
+        (datetime64) e 'cases'/'deaths' como matrizes rótulos × datas, com NaN nos valores
+        ausentes. Respostas no formato de listas são convertidas para a mesma estrutura.
+        """
+        dates = np.array(data["dates"], dtype='datetime64[D]')
+        labels = data.get("labels", [])
+        decoded = {"dates": dates, "labels": labels}
+        if data.get("format") == "colunar":
+            shape = tuple(data["shape"])
+            missing = None
+            if data["missing"]:
+                bits = np.frombuffer(base64.b64decode(data["missing"]), dtype=np.uint8)
+                missing = np.unpackbits(bits, count=shape[0] * shape[1], bitorder='little').reshape(shape).astype(bool)
+            for name in ("cases", "deaths"):
+                values = np.frombuffer(base64.b64decode(data[name]), dtype=data["dtype"]).reshape(shape).astype(float)
+                if missing is not None:
+                    values[missing] = np.nan
+                decoded[name] = values
+        elif labels:
+            decoded["cases"] = np.array([data[f"cases_{label}"] for label in labels], dtype=float)
+            decoded["deaths"] = np.array([data[f"deaths_{label}"] for label in labels], dtype=float)
+        else:
+            decoded["cases"] = np.array([data["cases"]], dtype=float)
+            decoded["deaths"] = np.array([data["deaths"]], dtype=float)
+        return decoded
+
+    def _fetch_plot_data_async(self, geracao, params, cached=None):
         """
-        Função assíncrona para buscar dados para o gráfico.
+        Função assíncrona para buscar dados para o gráfico. Se o gráfico `cached` já está na
+        tela, só o desenha de novo quando os dados mudaram no backend.
         """
         try:
-            response = requests.get(API_VISUALIZACAO_URL, params=params)
-            response.raise_for_status()
-            data = response.json()
+            data = self.api.get_json(API_VISUALIZACAO_URL, params=params, persist=True)
 
+            if data is cached:
+                pass # O gráfico exibido continua válido
             # Verifique se os dados de base (datas, casos, óbitos) estão presentes,
             # ou se a agregação é multi-série.
-            if "dates" in data and ("cases" in data or "labels" in data):
-                self.plot_data = data
-                self.after(0, self._render_plot)
-                self.after(0, lambda: self.consulta_feedback_label.configure(text="Gráfico gerado com sucesso.", text_color="green"))
-                self.after(0, self.show_plot_view)
+            elif "dates" in data and ("cases" in data or "labels" in data):
+                plot_data = self._decode_plot_data(data)
+                self._deliver("resultados", geracao, lambda: self._show_plot_data(plot_data))
+                self._consulta_feedback(geracao, "Gráfico gerado com sucesso.", "green")
             else:
-                self.plot_data = {}
-                self.after(0, self._render_plot)
-                self.after(0, lambda: self.consulta_feedback_label.configure(text="Nenhum dado encontrado para o gráfico.", text_color="red"))
-                self.after(0, self.show_plot_view)
+                self._deliver("resultados", geracao, lambda: self._show_plot_data({}))
+                self._consulta_feedback(geracao, "Nenhum dado encontrado para o gráfico.", "red")
                 print("DEBUG: Estrutura de resposta inesperada para dados de visualização.")
 
         except requests.exceptions.ConnectionError:
-            self.after(0, lambda: self.consulta_feedback_label.configure(text="Erro de Conexão com o backend (gráfico).", text_color="red"))
+            self._consulta_feedback(geracao, "Erro de Conexão com o backend (gráfico).", "red")
             print(f"ERRO: Não foi possível conectar ao backend em {API_VISUALIZACAO_URL}")
         except requests.exceptions.Timeout:
-            self.after(0, lambda: self.consulta_feedback_label.configure(text="Tempo esgotado na consulta do gráfico.", text_color="red"))
+            self._consulta_feedback(geracao, "Tempo esgotado na consulta do gráfico.", "red")
             print("ERRO: Requisição de dados para gráfico excedeu o tempo limite.")
         except requests.exceptions.RequestException as e:
-            self.after(0, lambda: self.consulta_feedback_label.configure(text=f"Erro na consulta do gráfico: {e}", text_color="red"))
+            self._consulta_feedback(geracao, f"Erro na consulta do gráfico: {e}", "red")
             print(f"ERRO ao consultar dados para gráfico: {e}")
         except json.JSONDecodeError:
-            self.after(0, lambda: self.consulta_feedback_label.configure(text="Erro no formato de dados do backend (gráfico).", text_color="red"))
+            self._consulta_feedback(geracao, "Erro no formato de dados do backend (gráfico).", "red")
             print("ERRO: Resposta não é um JSON válido ao consultar dados para gráfico.")
 
+    def _show_plot_data(self, plot_data):
+        """Guarda as séries recebidas e exibe o gráfico (na thread da interface)."""
+        self.plot_data = plot_data
+        self._render_plot()
+        self.show_plot_view()
+
 
     def _render_table(self):
         """
-        Renderiza os dados na tabela dinâmica.
+        Renderiza os dados na tabela. Os itens já existentes no Treeview recebem os valores
+        da nova página; só a diferença de tamanho entre as páginas é inserida ou removida.
         """
-        # Limpa a tabela existente
-        for widget in self.table_widgets:
-            widget.destroy()
-        self.table_widgets.clear()
-
-        # Configura as colunas da tabela
-        for i, header_text in enumerate(self.table_headers):
-            self.table_scroll_frame.grid_columnconfigure(i, weight=1)
-            header_label = ctk.CTkLabel(self.table_scroll_frame, text=header_text, font=ctk.CTkFont(weight="bold"))
-            header_label.grid(row=0, column=i, padx=5, pady=5, sticky="ew")
-            self.table_widgets.append(header_label)
+        values = [
+            [record.get(key, "N/A") for key, *_ in TABLE_COLUMNS]
+            for record in self.records
+        ]
+        for iid, row_values in zip(self.table_rows, values):
+            self.table_tree.item(iid, values=row_values)
+        if len(values) > len(self.table_rows):
+            self.table_rows.extend(self.table_tree.insert("", "end", values=row_values)
+                                   for row_values in values[len(self.table_rows):])
+        elif len(values) < len(self.table_rows):
+            self.table_tree.delete(*self.table_rows[len(values):])
+            del self.table_rows[len(values):]
+        # Nova página: volta ao topo
+        self.table_tree.yview_moveto(0)
 
         if not self.records:
-            no_data_label = ctk.CTkLabel(self.table_scroll_frame, text="Nenhum dado para exibir com os filtros selecionados.")
-            no_data_label.grid(row=1, column=0, columnspan=len(self.table_headers), padx=5, pady=20)
-            self.table_widgets.append(no_data_label)
+            self.table_empty_label.place(relx=0.5, rely=0.5, anchor="center")
         else:
-            for row_idx, record in enumerate(self.records):
-                data_values = [
-                    record.get("date", "N/A"),
-                    record.get("state", "N/A"),
-                    record.get("city", "N/A"),
-                    record.get("confirmed_cases", "N/A"),
-                    record.get("deaths", "N/A"),
-                    record.get("new_cases", "N/A"),
-                    record.get("new_deaths", "N/A")
-                ]
-                for col_idx, value in enumerate(data_values):
-                    cell_label = ctk.CTkLabel(self.table_scroll_frame, text=str(value))
-                    cell_label.grid(row=row_idx + 1, column=col_idx, padx=5, pady=2, sticky="ew")
-                    self.table_widgets.append(cell_label)
+            self.table_empty_label.place_forget()
 
         self._update_pagination_info()
 
-    def _render_plot(self):
+    def _get_theme_colors(self):
         """
-        Renderiza o gráfico Matplotlib na interface, suportando diferentes tipos e agregações.
+        Cores de fundo e do texto do tema atual no formato do Matplotlib (RGB 0.0-1.0),
+        convertidas uma única vez por modo de aparência.
         """
-        if self.plot_canvas:
-            self.plot_canvas.get_tk_widget().destroy()
-            self.plot_canvas = None
-        if self.toolbar:
-            self.toolbar.destroy()
-            self.toolbar = None
-        plt.close('all')
-
-        fig, ax = plt.subplots(figsize=(8, 6))
+        mode = ctk.get_appearance_mode()
+        if mode not in self._theme_colors:
+            # Converte o NOME da cor do tema (ex: 'gray14' ou 'gray86') em RGB (0-65535) e normaliza
+            bg_color_name = self._apply_appearance_mode(self.cget("fg_color"))
+            text_color_name = self._apply_appearance_mode(ctk.ThemeManager.theme["CTkLabel"]["text_color"])
+            self._theme_colors[mode] = (
+                tuple(c / 65535 for c in self.winfo_rgb(bg_color_name)),
+                tuple(c / 65535 for c in self.winfo_rgb(text_color_name)),
+            )
+        return mode, self._theme_colors[mode]
+
+    def _create_plot_canvas(self):
+        """
+        Cria, uma única vez, a figura, o canvas e a barra de ferramentas do gráfico, além do
+        texto exibido quando não há dados. Os gráficos seguintes só atualizam os artistas.
+        """
+        self.plot_figure = Figure(figsize=(8, 6))
+        self.plot_ax = self.plot_figure.add_subplot()
+        self.plot_empty_text = self.plot_ax.text(0.5, 0.5, "Nenhum dado para exibir o gráfico.",
+                                                 horizontalalignment='center', verticalalignment='center',
+                                                 transform=self.plot_ax.transAxes, fontsize=14, visible=False)
 
-         # 1. Pega o NOME da cor de fundo para o tema atual (ex: 'gray14' ou 'gray86')
-        bg_color_name = self._apply_appearance_mode(self.cget("fg_color"))
-        # 2. Usa o método winfo_rgb para converter o NOME para valores RGB (0-65535)
-        #    e depois normaliza para o formato do Matplotlib (0.0-1.0)
-        bg_color = [c / 65535 for c in self.winfo_rgb(bg_color_name)]
+        self.plot_canvas = FigureCanvasTkAgg(self.plot_figure, master=self.plot_frame)
+        self.plot_canvas_widget = self.plot_canvas.get_tk_widget()
+        self.toolbar = NavigationToolbar2Tk(self.plot_canvas, self.plot_frame)
+        self.toolbar.update()
+        self.plot_canvas_widget.pack(side=tk.TOP, fill=tk.BOTH, expand=1)
 
-        # 3. Faz o mesmo processo para a cor do texto
-        text_color_name = self._apply_appearance_mode(ctk.ThemeManager.theme["CTkLabel"]["text_color"])
-        text_color = [c / 65535 for c in self.winfo_rgb(text_color_name)]
+    def _apply_plot_colors(self):
+        """Aplica à figura as cores do tema, apenas quando o modo de aparência mudou."""
+        mode, (bg_color, text_color) = self._get_theme_colors()
+        if mode == self._plot_colors_mode:
+            return bg_color, text_color
+        self._plot_colors_mode = mode
 
-        # 4. Agora passa as cores no formato RGB para o Matplotlib
-        fig.patch.set_facecolor(bg_color)
+        ax = self.plot_ax
+        self.plot_figure.patch.set_facecolor(bg_color)
         ax.set_facecolor(bg_color)
-
-        line_color_cases = "blue"
-        line_color_deaths = "red"
-
         ax.tick_params(axis='x', colors=text_color)
         ax.tick_params(axis='y', colors=text_color)
-        ax.spines['bottom'].set_color(text_color)
-        ax.spines['top'].set_color(text_color)
-        ax.spines['left'].set_color(text_color)
-        ax.spines['right'].set_color(text_color)
+        for spine in ax.spines.values():
+            spine.set_color(text_color)
         ax.xaxis.label.set_color(text_color)
         ax.yaxis.label.set_color(text_color)
         ax.title.set_color(text_color)
-        ax.legend(labelcolor=text_color)
-
-        if self.plot_data and self.plot_data.get("dates"):
-            dates = [datetime.strptime(d, '%Y-%m-%d') for d in self.plot_data["dates"]]
-            chart_type = self.optionmenu_chart_type.get()
-            aggregation = self.optionmenu_aggregation.get()
-
-            if aggregation == 'Nenhum' or \
-               (aggregation == 'Estado' and self.get_filter_params().get("estado")) or \
-               (aggregation == 'Cidade' and self.get_filter_params().get("municipio")):
-                # Plotagem de série única
-                cases = self.plot_data["cases"]
-                deaths = self.plot_data["deaths"]
+        self.plot_empty_text.set_color(text_color)
+        return bg_color, text_color
 
-                ax.plot(dates, cases, label='Casos', color=line_color_cases)
-                ax.plot(dates, deaths, label='Óbitos', color=line_color_deaths)
-            else:
-                # Plotagem de múltiplas séries (por Estado ou Cidade)
-                labels = self.plot_data.get("labels", [])
-                for label in labels:
-                    cases_data = self.plot_data.get(f"cases_{label}", [])
-                    deaths_data = self.plot_data.get(f"deaths_{label}", [])
-                    
-                    # Filtra None values, pois podem vir de datas onde o dado não existe para aquele label
-                    valid_dates_cases = [dates[i] for i, val in enumerate(cases_data) if val is not None]
-                    valid_cases = [val for val in cases_data if val is not None]
-
-                    valid_dates_deaths = [dates[i] for i, val in enumerate(deaths_data) if val is not None]
-                    valid_deaths = [val for val in deaths_data if val is not None]
-
-                    if valid_cases:
-                        ax.plot(valid_dates_cases, valid_cases, label=f'Casos - {label}', linestyle='-')
-                    if valid_deaths:
-                        ax.plot(valid_dates_deaths, valid_deaths, label=f'Óbitos - {label}', linestyle='--')
+    def _plot_series(self):
+        """
+        Séries a desenhar como [(datas, valores, rótulo, estilo, cor)], conforme o tipo de
+        agregação. Nas séries múltiplas, as cores seguem o ciclo padrão do Matplotlib.
+        """
+        dates = self.plot_data["dates"]
+        aggregation = self.optionmenu_aggregation.get()
 
+        if aggregation == 'Nenhum' or \
+           (aggregation == 'Estado' and self.get_filter_params().get("estado")) or \
+           (aggregation == 'Cidade' and self.get_filter_params().get("municipio")):
+            # Plotagem de série única
+            return [
+                (dates, self.plot_data["cases"][0], 'Casos', '-', "blue"),
+                (dates, self.plot_data["deaths"][0], 'Óbitos', '-', "red"),
+            ]
+
+        # Plotagem de múltiplas séries (por Estado ou Cidade)
+        series = []
+        labels = self.plot_data.get("labels", [])
+        for label, cases_data, deaths_data in zip(labels, self.plot_data["cases"], self.plot_data["deaths"]):
+            # Filtra os NaN, pois podem vir de datas onde o dado não existe para aquele label
+            for values, name, linestyle in ((cases_data, 'Casos', '-'), (deaths_data, 'Óbitos', '--')):
+                valid = ~np.isnan(values)
+                if valid.any():
+                    series.append((dates[valid], values[valid], f'{name} - {label}', linestyle, f"C{len(series) % 10}"))
+        return series
 
+    def _render_plot(self):
+        """
+        Renderiza o gráfico Matplotlib na interface, suportando diferentes tipos e agregações.
+        A figura e as linhas são reaproveitadas: cada série atualiza uma linha existente
+        (set_data) e o canvas é redesenhado com draw_idle.
+        """
+        if self.plot_figure is None:
+            self._create_plot_canvas()
+        bg_color, text_color = self._apply_plot_colors()
+        ax = self.plot_ax
+
+        has_data = bool(self.plot_data and len(self.plot_data.get("dates", [])))
+        series = self._plot_series() if has_data else []
+
+        # Reaproveita as linhas existentes e cria só as que faltam
+        while len(self.plot_lines) < len(series):
+            dates, values, *_ = series[len(self.plot_lines)]
+            self.plot_lines.append(ax.plot(dates, values)[0])
+        for line, (dates, values, label, linestyle, color) in zip(self.plot_lines, series):
+            line.set_data(dates, values)
+            line.set(label=label, linestyle=linestyle, color=color, visible=True)
+        for line in self.plot_lines[len(series):]:
+            line.set_visible(False)
+
+        legend = ax.get_legend()
+        if legend:
+            legend.remove()
+        self.plot_empty_text.set_visible(not has_data)
+        ax.xaxis.set_visible(has_data)
+        ax.yaxis.set_visible(has_data)
+
+        if has_data:
+            chart_type = self.optionmenu_chart_type.get()
+            aggregation = self.optionmenu_aggregation.get()
             ax.set_xlabel("Data")
             ax.set_ylabel("Contagem")
             ax.set_title(f"Evolução de {chart_type} por {aggregation if aggregation != 'Nenhum' else 'Nacional'}")
-            ax.legend(facecolor=bg_color, labelcolor=text_color)
-            fig.autofmt_xdate()
+            ax.legend(handles=self.plot_lines[:len(series)], facecolor=bg_color, labelcolor=text_color)
+            # Reativa a escala automática, desligada se o usuário deu zoom no gráfico anterior
+            ax.relim(visible_only=True)
+            ax.autoscale(True)
+            self.plot_figure.autofmt_xdate()
         else:
-            ax.text(0.5, 0.5, "Nenhum dado para exibir o gráfico.",
-                    horizontalalignment='center', verticalalignment='center',
-                    transform=ax.transAxes, color=text_color, fontsize=14)
-            ax.set_xticks([])
-            ax.set_yticks([])
-
-        self.plot_canvas = FigureCanvasTkAgg(fig, master=self.plot_frame)
-        self.plot_canvas_widget = self.plot_canvas.get_tk_widget()
-        self.plot_canvas_widget.pack(side=tk.TOP, fill=tk.BOTH, expand=1)
+            ax.set_xlabel("")
+            ax.set_ylabel("")
+            ax.set_title("")
 
-        self.toolbar = NavigationToolbar2Tk(self.plot_canvas, self.plot_frame)
+        # Novo gráfico: a posição "início" da barra de ferramentas passa a ser a vista atual
         self.toolbar.update()
-        self.plot_canvas_widget.pack(side=tk.TOP, fill=tk.BOTH, expand=1)
-
+        self.plot_canvas.draw_idle()
 
     def _update_pagination_info(self):
         """Atualiza o texto do indicador de página e o estado dos botões de paginação."""
@@ -811,9 +1018,9 @@ class App(ctk.CTk):
             self.selected_file_path = file_path
             self.file_path_label.configure(text=f"Arquivo selecionado: {os.path.basename(file_path)}")
             self.gerenciamento_feedback_label.configure(text="Iniciando importação do dataset...", text_color="orange")
-            threading.Thread(target=self._send_management_request_async,
-                             args=(API_IMPORT_URL, "POST", {"file_path": self.selected_file_path},
-                                   "Dataset importado com sucesso!", "Erro ao importar dataset.")).start()
+            self.api.submit(self._send_management_request_async,
+                            API_IMPORT_URL, "POST", {"file_path": self.selected_file_path},
+                            "Dataset importado com sucesso!", "Erro ao importar dataset.")
         else:
             self.gerenciamento_feedback_label.configure(text="Importação cancelada.", text_color="blue")
             # Reabilitar botões
@@ -832,9 +1039,9 @@ class App(ctk.CTk):
         self.button_limpar.configure(state="disabled")
 
         self.gerenciamento_feedback_label.configure(text="Iniciando atualização dos dados...", text_color="orange")
-        threading.Thread(target=self._send_management_request_async,
-                         args=(API_UPDATE_URL, "PUT", {},
-                               "Dados atualizados com sucesso!", "Erro ao atualizar dados.")).start()
+        self.api.submit(self._send_management_request_async,
+                        API_UPDATE_URL, "PUT", {},
+                        "Dados atualizados com sucesso!", "Erro ao atualizar dados.")
 
     def clear_dataset(self):
         """
@@ -851,9 +1058,9 @@ class App(ctk.CTk):
 
         if user_input and user_input.upper() == "SIM":
             self.gerenciamento_feedback_label.configure(text="Limpando base de dados...", text_color="orange")
-            threading.Thread(target=self._send_management_request_async,
-                             args=(API_DELETE_URL, "DELETE", {},
-                                   "Base de dados limpa com sucesso!", "Erro ao limpar base de dados.")).start()
+            self.api.submit(self._send_management_request_async,
+                            API_DELETE_URL, "DELETE", {},
+                            "Base de dados limpa com sucesso!", "Erro ao limpar base de dados.")
         else:
             self.gerenciamento_feedback_label.configure(text="Limpeza cancelada.", text_color="blue")
             # Reabilitar botões
@@ -862,45 +1069,89 @@ class App(ctk.CTk):
             self.button_limpar.configure(state="normal")
 
 
+    def _wait_for_job(self, job_id):
+        """
+        Consulta /api/jobs/<id> até o job terminar, atualizando a barra de progresso e o texto
+        de andamento (fase, linhas, vazão e tempo restante). Retorna o estado final do job.
+        """
+        self.after(0, lambda: self.gerenciamento_progressbar.set(0))
+        while True:
+            response = self.api.request("GET", f"{API_JOBS_URL}/{job_id}", timeout=10)
+            response.raise_for_status()
+            job = response.json()
+            if job["status"] in ("concluido", "erro"):
+                return job
+            self.after(0, lambda job=job: self._show_job_progress(job))
+            time.sleep(JOB_POLL_INTERVAL)
+
+    def _show_job_progress(self, job):
+        """Mostra o andamento de um job na seção de gerenciamento."""
+        self.gerenciamento_progressbar.set(job["progresso"])
+        if job["status"] == "na_fila":
+            text = "Aguardando na fila do servidor..."
+        else:
+            text = f"{JOB_PHASE_NAMES.get(job['fase'], job['fase'] or 'Iniciando')}: {job['linhas']:,} linhas".replace(",", ".")
+            if job.get("linhas_por_segundo"):
+                text += f" ({job['linhas_por_segundo']:,.0f} linhas/s)".replace(",", ".")
+            if job.get("eta_segundos") is not None:
+                text += f" - cerca de {job['eta_segundos']:.0f}s restantes"
+        self.gerenciamento_feedback_label.configure(text=text, text_color="orange")
+
+    def _gerenciamento_feedback(self, text, text_color):
+        """Mostra `text` no feedback da seção de gerenciamento, na thread da interface."""
+        self.after(0, lambda: self.gerenciamento_feedback_label.configure(text=text, text_color=text_color))
+
     def _send_management_request_async(self, url, method, json_data, success_msg, error_msg):
         """
         Função assíncrona genérica para enviar requisições de gerenciamento.
         """
         try:
             if method == "POST":
-                response = requests.post(url, json=json_data)
+                response = self.api.request("POST", url, json=json_data)
             elif method == "PUT":
-                response = requests.put(url, json=json_data)
+                response = self.api.request("PUT", url, json=json_data)
             elif method == "DELETE":
-                response = requests.delete(url)
+                response = self.api.request("DELETE", url)
             else:
                 raise ValueError("Método HTTP inválido.")
 
             response.raise_for_status()
             data = response.json()
+            if data.get("status") == "accepted":
+                # A operação roda em segundo plano: acompanha o job até o fim
+                job = self._wait_for_job(data["job_id"])
+                if job["status"] == "concluido":
+                    data = {"status": "success", **(job.get("resultado") or {})}
+                else:
+                    data = {"status": "error", "message": job.get("erro")}
             if data.get("status") == "success":
-                self.after(0, lambda: self.gerenciamento_feedback_label.configure(text=success_msg, text_color="green"))
-                # Recarregar estados e consulta após operações de gerenciamento
+                self.after(0, lambda: self.gerenciamento_progressbar.set(1))
+                # Mostra o resumo da operação (linhas, tempo) quando o backend o informa
+                message = data.get("message") or success_msg
+                self.after(0, lambda: self.gerenciamento_feedback_label.configure(text=message, text_color="green"))
+                # Recarregar estados e consulta após operações de gerenciamento (sem as páginas guardadas)
+                self.api.clear_pages()
                 self.after(0, self.load_states)
                 self.after(0, self.perform_consulta)
             else:
                 self.after(0, lambda: self.gerenciamento_feedback_label.configure(text=f"{error_msg} Detalhes: {data.get('message', 'N/A')}", text_color="red"))
 
+        # JSONDecodeError vem antes: é subclasse de ValueError (e, no requests, de RequestException)
+        except json.JSONDecodeError:
+            self._gerenciamento_feedback(f"Erro no formato de dados do backend: {error_msg}", "red")
+            print(f"ERRO: Resposta não é um JSON válido para {url}.")
         except requests.exceptions.ConnectionError:
-            self.after(0, lambda: self.gerenciamento_feedback_label.configure(text=f"Erro de Conexão: {error_msg}", text_color="red"))
+            self._gerenciamento_feedback(f"Erro de Conexão: {error_msg}", "red")
             print(f"ERRO: Não foi possível conectar ao backend em {url}")
         except requests.exceptions.Timeout:
-            self.after(0, lambda: self.gerenciamento_feedback_label.configure(text=f"Tempo esgotado: {error_msg}", text_color="red"))
+            self._gerenciamento_feedback(f"Tempo esgotado: {error_msg}", "red")
             print(f"ERRO: Requisição para {url} excedeu o tempo limite.")
         except requests.exceptions.RequestException as e:
-            self.after(0, lambda: self.gerenciamento_feedback_label.configure(text=f"Erro na operação: {error_msg} ({e})", text_color="red"))
+            self._gerenciamento_feedback(f"Erro na operação: {error_msg} ({e})", "red")
             print(f"ERRO na requisição para {url}: {e}")
         except ValueError as e:
-            self.after(0, lambda: self.gerenciamento_feedback_label.configure(text=f"Erro interno: {e}", text_color="red"))
+            self._gerenciamento_feedback(f"Erro interno: {e}", "red")
             print(f"ERRO interno: {e}")
-        except json.JSONDecodeError:
-            self.after(0, lambda: self.gerenciamento_feedback_label.configure(text=f"Erro no formato de dados do backend: {error_msg}", text_color="red"))
-            print(f"ERRO: Resposta não é um JSON válido para {url}.")
         finally:
             # Reabilitar botões após a conclusão (sucesso ou falha)
             self.after(0, lambda: self.button_importar.configure(state="normal"))
@@ -0,0 +1,94 @@
+"""
+Cache em disco do cliente desktop do ALERTA-19 (~/.alerta19/cache.db).
+
+Guarda, entre uma execução e outra, as respostas GET que quase nunca mudam (listas de
+estados e municípios) e os gráficos consultados recentemente, cada uma com a sua ETag e a
+versão dos dados (X-Data-Version) em que foi gerada. Ao abrir, o cliente exibe essas
+respostas na hora e as revalida em segundo plano com If-None-Match: se os dados não mudaram,
+o backend responde 304, sem corpo.
+
+Quando o backend informa uma nova versão dos dados, as respostas das versões anteriores são
+apagadas (purge_versions). O cache é só uma otimização: qualquer erro do SQLite é ignorado e
+a resposta é pedida ao backend normalmente.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DISK_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.alerta19', 'cache.db')
+# Respostas mantidas no disco; as usadas há mais tempo são apagadas primeiro
+DISK_CACHE_MAX_ENTRIES = 200
+
+CREATE_RESPOSTAS_SQL = '''
+    CREATE TABLE IF NOT EXISTS respostas (
+        chave TEXT PRIMARY KEY,
+        etag TEXT NOT NULL,
+        versao TEXT,
+        corpo TEXT NOT NULL,
+        usado REAL NOT NULL
+    )
+'''
+
+
+class DiskCache:
+    """Respostas JSON (com ETag e versão dos dados) guardadas num SQLite local."""
+
+    def __init__(self, caminho=DISK_CACHE_PATH, max_entries=DISK_CACHE_MAX_ENTRIES):
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # Compartilhada pelas threads do pool do ApiClient, sempre sob o lock
+        self._conn = sqlite3.connect(caminho, timeout=5, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(CREATE_RESPOSTAS_SQL)
+        self._conn.commit()
+
+    def get(self, chave):
+        """(etag, dados) guardados para `chave`, ou None."""
+        try:
+            with self._lock, self._conn:
+                row = self._conn.execute('SELECT etag, corpo FROM respostas WHERE chave = ?', (chave,)).fetchone()
+                if row is None:
+                    return None
+                self._conn.execute('UPDATE respostas SET usado = ? WHERE chave = ?', (time.time(), chave))
+            return row[0], json.loads(row[1])
+        except (sqlite3.Error, ValueError):
+            return None
+
+    def put(self, chave, etag, versao, dados):
+        """Guarda a resposta de `chave`, apagando as mais antigas além de max_entries."""
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO respostas (chave, etag, versao, corpo, usado) VALUES (?, ?, ?, ?, ?)',
+                    (chave, etag, versao, json.dumps(dados), time.time()),
+                )
+                self._conn.execute(
+                    'DELETE FROM respostas WHERE chave NOT IN (SELECT chave FROM respostas ORDER BY usado DESC LIMIT ?)',
+                    (self.max_entries,),
+                )
+        except sqlite3.Error:
+            pass
+
+    def purge_versions(self, versao):
+        """Apaga as respostas geradas em versões dos dados diferentes de `versao`."""
+        try:
+            with self._lock, self._conn:
+                self._conn.execute('DELETE FROM respostas WHERE versao IS NOT ?', (versao,))
+        except sqlite3.Error:
+            pass
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_disk_cache(caminho=DISK_CACHE_PATH):
+    """Abre o cache em disco; retorna None se não for possível (ex.: diretório sem permissão)."""
+    try:
+        return DiskCache(caminho)
+    except (OSError, sqlite3.Error) as e:
+        print(f"AVISO: Cache local indisponível em {caminho}: {e}")
+        return None
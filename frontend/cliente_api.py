@@ -0,0 +1,224 @@
+"""
+Camada de acesso ao backend do cliente desktop do ALERTA-19.
+
+Todas as requisições da interface passam por um ApiClient:
+
+- uma única requests.Session, que mantém as conexões abertas (keep-alive) entre as
+  requisições em vez de abrir uma conexão TCP a cada uma;
+- um pool pequeno de threads (ThreadPoolExecutor) no lugar de uma thread nova por clique;
+- tempo limite em todas as requisições, para que uma resposta que não chega não prenda
+  uma thread do pool indefinidamente;
+- gerações por canal ('estados', 'resultados', ...): cada nova tarefa de um canal invalida
+  as anteriores, que são canceladas se ainda estão na fila e, se já estão em andamento,
+  têm o resultado descartado antes de chegar à interface (ver is_current);
+- um cache LRU das páginas da tabela já recebidas, preenchido também pela busca antecipada
+  das páginas vizinhas (prefetch_page) e esvaziado sempre que a versão dos dados informada
+  pelo backend (X-Data-Version) muda;
+- um cache em disco (cache_local.py) para as respostas pedidas com persist=True, que
+  sobrevivem ao fechamento do cliente e são exibidas já na abertura (ver cached_json).
+"""
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from cache_local import DISK_CACHE_PATH, open_disk_cache
+
+# Threads do pool (e conexões mantidas abertas com o backend)
+CLIENT_WORKERS = 4
+# Tempo limite das requisições em segundos: (conexão, leitura da resposta)
+REQUEST_TIMEOUT = (5, 30)
+# Respostas GET guardadas localmente (com a ETag) para revalidação via If-None-Match
+LOCAL_RESPONSE_CACHE_SIZE = 32
+# Páginas da tabela guardadas no cliente, exibidas sem esperar o backend
+PAGE_CACHE_SIZE = 64
+
+
+def _request_key(url, params):
+    return (url, tuple(sorted((params or {}).items())))
+
+
+class ApiClient:
+    """Sessão HTTP e pool de threads compartilhados pelas janelas do cliente."""
+
+    def __init__(self, workers=CLIENT_WORKERS, disk_cache_path=DISK_CACHE_PATH):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='alerta19-api')
+        self._lock = threading.Lock()
+        self._generations = {} # canal -> geração atual
+        self._pending = {} # canal -> futuro da tarefa mais recente
+        self._local_responses = {} # (url, params) -> (etag, dados), ver get_json
+        self._pages = OrderedDict() # (url, params) -> (versão, dados), da página usada há mais tempo à mais recente
+        self._prefetching = set() # Páginas com busca antecipada em andamento
+        self.data_version = None # Último X-Data-Version recebido do backend
+        self._disk = open_disk_cache(disk_cache_path) if disk_cache_path else None
+
+    def request(self, method, url, timeout=REQUEST_TIMEOUT, **kwargs):
+        """Requisição pela sessão compartilhada, sempre com tempo limite."""
+        return self.session.request(method, url, timeout=timeout, **kwargs)
+
+    def get_json(self, url, params=None, timeout=REQUEST_TIMEOUT, persist=False):
+        """
+        GET condicional: envia a ETag da última resposta guardada para a mesma URL e parâmetros
+        e, se o backend responder 304 (dados inalterados), reaproveita a cópia local.
+        Com `persist`, a resposta também é guardada no (e procurada no) cache em disco.
+        """
+        return self._get_json(url, params, timeout, persist)[0]
+
+    def cached_json(self, url, params=None):
+        """
+        Resposta guardada para `url` e `params` (na memória ou no disco), sem consultar o
+        backend, ou None. Pode estar desatualizada: serve para exibir algo na hora enquanto
+        get_json revalida; se nada mudou, get_json retorna este mesmo objeto.
+        """
+        guardada = self._lookup(_request_key(url, params), persist=True)
+        return guardada[1] if guardada else None
+
+    def _lookup(self, chave, persist):
+        with self._lock:
+            guardada = self._local_responses.get(chave)
+        if guardada is None and persist and self._disk:
+            guardada = self._disk.get(json.dumps(chave))
+            if guardada:
+                self._remember(chave, *guardada)
+        return guardada
+
+    def _remember(self, chave, etag, data):
+        with self._lock:
+            self._local_responses.pop(chave, None)
+            if len(self._local_responses) >= LOCAL_RESPONSE_CACHE_SIZE:
+                self._local_responses.pop(next(iter(self._local_responses)))
+            self._local_responses[chave] = (etag, data)
+
+    def _get_json(self, url, params, timeout, persist=False):
+        """Como get_json, mas retorna também a versão dos dados da resposta (ou None)."""
+        chave = _request_key(url, params)
+        guardada = self._lookup(chave, persist)
+        headers = {'If-None-Match': guardada[0]} if guardada else {}
+        response = self.request('GET', url, params=params, headers=headers, timeout=timeout)
+        versao = self._track_version(response)
+        if response.status_code == 304 and guardada:
+            return guardada[1], versao
+        response.raise_for_status()
+        data = response.json()
+        etag = response.headers.get('ETag')
+        if etag:
+            self._remember(chave, etag, data)
+            if persist and self._disk:
+                self._disk.put(json.dumps(chave), etag, versao, data)
+        return data, versao
+
+    def _track_version(self, response):
+        """
+        Registra a versão dos dados informada na resposta; se ela mudou, esvazia o cache de
+        páginas e apaga do disco as respostas das versões anteriores.
+        """
+        versao = response.headers.get('X-Data-Version')
+        if not versao:
+            return versao
+        with self._lock:
+            mudou = versao != self.data_version
+            if mudou:
+                self._pages.clear()
+                self.data_version = versao
+        if mudou and self._disk:
+            self._disk.purge_versions(versao)
+        return versao
+
+    def cached_page(self, url, params):
+        """Página guardada para `url` e `params` (marcada como a usada mais recentemente), ou None."""
+        chave = _request_key(url, params)
+        with self._lock:
+            if chave not in self._pages:
+                return None
+            self._pages.move_to_end(chave)
+            return self._pages[chave][1]
+
+    def get_page(self, url, params, timeout=REQUEST_TIMEOUT):
+        """
+        GET de uma página da tabela, guardada no cache de páginas. Se a página já estava
+        guardada na mesma versão dos dados, retorna o mesmo objeto da cópia guardada.
+        """
+        chave = _request_key(url, params)
+        data, versao = self._get_json(url, params, timeout)
+        with self._lock:
+            guardada = self._pages.get(chave)
+            if guardada and versao and guardada[0] == versao:
+                self._pages.move_to_end(chave)
+                return guardada[1]
+            # Não guarda a resposta de uma versão que já foi substituída durante a requisição
+            if versao and versao == self.data_version:
+                self._pages[chave] = (versao, data)
+                self._pages.move_to_end(chave)
+                while len(self._pages) > PAGE_CACHE_SIZE:
+                    self._pages.popitem(last=False)
+        return data
+
+    def prefetch_page(self, url, params):
+        """Busca em segundo plano uma página que ainda não está no cache (ex.: a próxima da tabela)."""
+        chave = _request_key(url, params)
+        with self._lock:
+            if chave in self._pages or chave in self._prefetching:
+                return
+            self._prefetching.add(chave)
+        self._executor.submit(self._prefetch, chave, url, params)
+
+    def _prefetch(self, chave, url, params):
+        try:
+            self.get_page(url, params)
+        except (requests.exceptions.RequestException, ValueError):
+            pass # A busca antecipada é só uma otimização: a página será pedida de novo se for exibida
+        finally:
+            with self._lock:
+                self._prefetching.discard(chave)
+
+    def clear_pages(self):
+        """Esvazia o cache de páginas (ex.: após uma operação que altera os dados)."""
+        with self._lock:
+            self._pages.clear()
+
+    def submit(self, funcao, *args):
+        """Executa funcao(*args) no pool, sem geração (ex.: operações de gerenciamento)."""
+        return self._executor.submit(funcao, *args)
+
+    def submit_latest(self, canal, funcao, *args):
+        """
+        Executa funcao(geracao, *args) no pool como a tarefa mais recente do `canal`: a tarefa
+        anterior do canal é cancelada se ainda não começou. A função deve entregar o resultado
+        à interface apenas se is_current(canal, geracao). Retorna a geração.
+        """
+        with self._lock:
+            geracao = self._invalidate(canal)
+            self._pending[canal] = self._executor.submit(funcao, geracao, *args)
+        return geracao
+
+    def invalidate(self, canal):
+        """Descarta as tarefas em andamento do `canal` (ex.: o resultado deixou de interessar)."""
+        with self._lock:
+            self._invalidate(canal)
+
+    def _invalidate(self, canal):
+        anterior = self._pending.pop(canal, None)
+        if anterior is not None:
+            anterior.cancel()
+        geracao = self._generations.get(canal, 0) + 1
+        self._generations[canal] = geracao
+        return geracao
+
+    def is_current(self, canal, geracao):
+        """Indica se `geracao` ainda é a tarefa mais recente do `canal`."""
+        with self._lock:
+            return self._generations.get(canal) == geracao
+
+    def close(self):
+        """Cancela as tarefas na fila e fecha as conexões da sessão e o cache em disco."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+        if self._disk:
+            self._disk.close()